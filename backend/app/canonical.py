@@ -0,0 +1,85 @@
+"""
+Suit-isomorphism canonicalization for (hole cards, board) spots.
+
+Two spots that differ only by a relabelling of suits are strategically identical, so
+results computed for the canonical form can be shared by every member of the class
+(22,100 raw flops collapse to 1,755). Cards are the ints from `eval` (rank * 4 + suit).
+The flop is treated as a set; turn and river keep their position.
+"""
+from functools import lru_cache, wraps
+from itertools import permutations
+from typing import Callable, Sequence, Tuple, TypeVar
+
+from .eval import CARD_STRINGS, cards_to_ints
+
+
+T = TypeVar("T")
+Cards = Tuple[int, ...]
+SUIT_PERMUTATIONS: Tuple[Tuple[int, ...], ...] = tuple(permutations(range(4)))
+
+
+def apply_suits(cards: Sequence[int], perm: Sequence[int]) -> Cards:
+    """Relabel suits: suit s becomes perm[s]."""
+    return tuple((c & ~3) | perm[c & 3] for c in cards)
+
+
+def invert(perm: Sequence[int]) -> Tuple[int, ...]:
+    out = [0] * 4
+    for src, dst in enumerate(perm):
+        out[dst] = src
+    return tuple(out)
+
+
+def _form(hole: Sequence[int], board: Sequence[int], perm: Sequence[int]) -> Tuple[Cards, Cards]:
+    mapped_board = apply_suits(board, perm)
+    flop = tuple(sorted(mapped_board[:3], reverse=True))
+    return tuple(sorted(apply_suits(hole, perm), reverse=True)), flop + mapped_board[3:]
+
+
+def canonicalize(hole: Sequence[int], board: Sequence[int] = ()) -> Tuple[Cards, Cards, Tuple[int, ...]]:
+    """
+    Canonical (hole, board) plus the suit permutation that produced it.
+    `apply_suits(x, invert(perm))` maps canonical cards back to the original suits.
+    """
+    best = None
+    best_perm = SUIT_PERMUTATIONS[0]
+    for perm in SUIT_PERMUTATIONS:
+        hole_form, board_form = _form(hole, board, perm)
+        key = (board_form, hole_form)
+        if best is None or key < best:
+            best, best_perm = key, perm
+    board_form, hole_form = best  # type: ignore[misc]
+    return hole_form, board_form, best_perm
+
+
+def canonical_key(hole: Sequence[str], board: Sequence[str] = ()) -> Tuple[Cards, Cards]:
+    hole_form, board_form, _ = canonicalize(cards_to_ints(hole), cards_to_ints(board))
+    return hole_form, board_form
+
+
+def to_strings(cards: Sequence[int]) -> list:
+    return [CARD_STRINGS[c] for c in cards]
+
+
+def iso_cached(maxsize: int = 65_536) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """
+    Cache a suit-invariant function of (hole, board, *args) once per isomorphism class.
+
+    The wrapped function takes card strings and is called with canonical cards, so its
+    result must not depend on suit labels (equities, categories, bucket ids).
+    """
+
+    def decorator(fn: Callable[..., T]) -> Callable[..., T]:
+        @lru_cache(maxsize=maxsize)
+        def cached(hole: Cards, board: Cards, *args) -> T:
+            return fn(to_strings(hole), to_strings(board), *args)
+
+        @wraps(fn)
+        def wrapper(hole: Sequence[str], board: Sequence[str] = (), *args) -> T:
+            return cached(*canonical_key(hole, board), *args)
+
+        wrapper.cache_info = cached.cache_info  # type: ignore[attr-defined]
+        wrapper.cache_clear = cached.cache_clear  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
@@ -0,0 +1,436 @@
+"""
+Heads-up strategy tables solved with Monte Carlo CFR over an abstracted game.
+
+The abstraction follows the table's rules (1/2 blinds, 200-chip stacks, hero is the
+button and acts first on every street, a preflop limp closes the street):
+
+- bets: fold, check/call, half pot (preflop and flop), pot, all-in; MAX_RAISES bets per street
+- cards: BUCKETS strength buckets per street; preflop by equity vs a random hand,
+  postflop by hand strength against every unseen combo on the current board
+- stacks: the tree is solved at STACK chips. Live stacks drift between hands, so every
+  hand is played on the tree as if the effective stack were STACK: bets map to the
+  nearest pot fraction (which does not depend on stack depth) and any bet covering the
+  live effective stack maps to all-in. Bot bets are sized against the live pot and
+  capped by the live stack.
+
+Training runs external-sampling MCCFR with regret matching+ in synchronous rounds:
+each worker process plays a share of the round's iterations from the shared regrets
+and the deltas are summed. The average strategy is written as uint8 probabilities
+(decision nodes x buckets x actions) next to the preflop bucket of every combo, so a
+bot decision is one tree walk over the hand's action log and a 5-byte row lookup.
+
+    cd backend
+    python -m app.cfr train --iterations 200000 --workers 8
+"""
+import argparse
+import logging
+import math
+import random
+import struct
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .canonical import iso_cached
+from .config import settings
+from .eval import cards_to_ints, evaluate_batch
+from .preflop import COMBO_CARDS, COMBO_CLASS, COMBO_INDEX, NUM_COMBOS
+
+if TYPE_CHECKING:
+    from .table import TableManager
+
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"CFRS0001"
+HEADER = struct.Struct("<8sIIII")
+DEFAULT_PATH = Path(__file__).resolve().parent / "data" / "cfr_strategy.bin"
+
+STACK = 200
+SMALL_BLIND = 1
+BIG_BLIND = 2
+BUCKETS = 8
+
+FOLD, CALL, HALF_POT, POT, ALL_IN = range(5)
+NUM_ACTIONS = 5
+ACTION_LABELS = ("fold", "call", "half_pot", "pot", "all_in")
+POT_FRACTIONS = {HALF_POT: 0.5, POT: 1.0}
+# Per street (preflop, flop, turn, river): bets allowed and the pot-fraction sizes besides all-in.
+MAX_RAISES = (3, 2, 2, 2)
+STREET_SIZES = ((HALF_POT, POT), (HALF_POT, POT), (POT,), (POT,))
+STREETS = ("preflop", "flop", "turn", "river")
+BOARD_SIZES = (0, 3, 4, 5)
+HERO, BOT = 0, 1
+
+
+def _raise_to(current: int, to_call: int, pot: int, fraction: float) -> int:
+    return max(current + int(round(fraction * (pot + to_call))), current + BIG_BLIND)
+
+
+class GameTree:
+    """
+    The abstract betting tree. Decision nodes are numbered 0..n-1; a child id >= 0 is a
+    decision node, ~t (negative) is terminal t. Terminal values are hero's chip result:
+    fixed for folds (the folder loses what they put in), `stake` won or lost for showdowns.
+    """
+
+    def __init__(self, stack: int = STACK) -> None:
+        self.stack = stack
+        self.player: List[int] = []
+        self.street: List[int] = []
+        self.children: List[List[int]] = []
+        self.fractions: List[List[float]] = []  # raise size as a fraction of pot-after-call, per action
+        # Terminal 0 is a placeholder: its id ~0 == -1 is the "illegal action" marker in `children`.
+        self.terminal_showdown: List[bool] = [False]
+        self.terminal_value: List[int] = [0]
+        self._build(0, [SMALL_BLIND, BIG_BLIND], [SMALL_BLIND, BIG_BLIND], HERO, 0)
+
+    def __len__(self) -> int:
+        return len(self.player)
+
+    def _terminal(self, showdown: bool, value: int) -> int:
+        self.terminal_showdown.append(showdown)
+        self.terminal_value.append(value)
+        return ~(len(self.terminal_value) - 1)
+
+    def _build(self, street: int, contrib: List[int], bets: List[int], actor: int, raises: int) -> int:
+        node = len(self.player)
+        self.player.append(actor)
+        self.street.append(street)
+        children = [-1] * NUM_ACTIONS
+        fractions = [0.0] * NUM_ACTIONS
+        self.children.append(children)
+        self.fractions.append(fractions)
+
+        other = 1 - actor
+        current = max(bets)
+        to_call = current - bets[actor]
+        stack = self.stack - contrib[actor]
+        pot = contrib[0] + contrib[1]
+
+        if to_call > 0:
+            children[FOLD] = self._terminal(False, contrib[BOT] if actor == BOT else -contrib[HERO])
+
+        # Check/call: a call (including the preflop limp) or the second check closes the street.
+        pay = min(to_call, stack)
+        called = list(contrib)
+        called[actor] += pay
+        if to_call > 0 or actor == BOT:
+            if called[actor] == self.stack or street == 3:
+                children[CALL] = self._terminal(True, called[HERO])
+            else:
+                children[CALL] = self._build(street + 1, called, [0, 0], HERO, 0)
+        else:
+            children[CALL] = self._build(street, called, list(bets), other, raises)
+
+        if raises < MAX_RAISES[street] and stack > to_call:
+            all_in = bets[actor] + stack
+            for action in STREET_SIZES[street]:
+                fraction = POT_FRACTIONS[action]
+                target = _raise_to(current, to_call, pot, fraction)
+                if target < all_in:
+                    children[action] = self._raise(street, contrib, bets, actor, target, raises)
+                    fractions[action] = fraction
+            children[ALL_IN] = self._raise(street, contrib, bets, actor, all_in, raises)
+            fractions[ALL_IN] = (all_in - current) / (pot + to_call)
+        return node
+
+    def _raise(self, street: int, contrib: List[int], bets: List[int], actor: int, target: int, raises: int) -> int:
+        contrib, bets = list(contrib), list(bets)
+        contrib[actor] += target - bets[actor]
+        bets[actor] = target
+        return self._build(street, contrib, bets, 1 - actor, raises + 1)
+
+    def signature(self) -> int:
+        """Checksum of the tree shape, stored in the strategy file to catch abstraction changes."""
+        return zlib.crc32(repr((self.player, self.children, self.fractions, self.terminal_value, BUCKETS)).encode())
+
+    def terminal(self, path: Sequence[int]) -> Tuple[bool, int]:
+        """(showdown, value) of the terminal reached by following `path` (action ids) from the root."""
+        node = 0
+        for action in path:
+            if node < 0:
+                raise ValueError("path continues past a terminal")
+            node = self.children[node][action]
+            if node == -1:
+                raise ValueError(f"action {ACTION_LABELS[action]} is not legal here")
+        if node >= 0:
+            raise ValueError("path ends at a decision node")
+        return self.terminal_showdown[~node], self.terminal_value[~node]
+
+
+@lru_cache(maxsize=1)
+def game_tree() -> GameTree:
+    return GameTree()
+
+
+def _strength_to_bucket(strength: np.ndarray) -> np.ndarray:
+    return np.minimum((strength * BUCKETS).astype(np.int64), BUCKETS - 1)
+
+
+def _board_strengths(board: Sequence[int], holes: np.ndarray) -> np.ndarray:
+    """Fraction of unseen combos each hole pair beats on `board` (ties count half, blockers ignored)."""
+    live = ~np.isin(COMBO_CARDS, list(board)).any(axis=1)
+    board_rows = np.broadcast_to(np.array(board, dtype=np.int64), (int(live.sum()), len(board)))
+    field = np.sort(evaluate_batch(np.hstack([COMBO_CARDS[live], board_rows])))
+    mine = evaluate_batch(np.hstack([holes, np.broadcast_to(np.array(board, dtype=np.int64), (len(holes), len(board)))]))
+    below = np.searchsorted(field, mine, side="left")
+    upto = np.searchsorted(field, mine, side="right")
+    return (below + upto) / (2 * len(field))
+
+
+def preflop_buckets(boards: int = 3_000, seed: int = 0) -> np.ndarray:
+    """Preflop bucket of every combo: quantiles of river strength vs a random hand, pooled per class."""
+    rng = np.random.default_rng(seed)
+    total = np.zeros(NUM_COMBOS)
+    count = np.zeros(NUM_COMBOS)
+    for _ in range(boards):
+        board = rng.choice(52, 5, replace=False)
+        live = ~np.isin(COMBO_CARDS, board).any(axis=1)
+        total[live] += _board_strengths(board, COMBO_CARDS[live])
+        count[live] += 1
+    per_class = np.bincount(COMBO_CLASS, weights=total, minlength=169) / np.bincount(COMBO_CLASS, weights=count, minlength=169)
+    strength = per_class[COMBO_CLASS]
+    edges = np.quantile(strength, np.arange(1, BUCKETS) / BUCKETS)
+    return np.searchsorted(edges, strength, side="right").astype(np.uint8)
+
+
+@iso_cached(maxsize=100_000)
+def postflop_bucket(hole: Sequence[str], board: Sequence[str]) -> int:
+    strength = _board_strengths(cards_to_ints(board), np.array([cards_to_ints(hole)], dtype=np.int64))
+    return int(_strength_to_bucket(strength)[0])
+
+
+def _deal_buckets(cards: Sequence[int], pre: np.ndarray) -> List[List[int]]:
+    """[player][street] buckets for hero cards[0:2], bot cards[2:4] and board cards[4:9]."""
+    holes = np.array([cards[0:2], cards[2:4]], dtype=np.int64)
+    out = [[int(pre[COMBO_INDEX[cards[0], cards[1]]])], [int(pre[COMBO_INDEX[cards[2], cards[3]]])]]
+    for size in BOARD_SIZES[1:]:
+        hero, bot = _strength_to_bucket(_board_strengths(cards[4 : 4 + size], holes))
+        out[HERO].append(int(hero))
+        out[BOT].append(int(bot))
+    return out
+
+
+def _strategy(regret: List[float], base: int, legal: List[int]) -> List[float]:
+    positive = [max(regret[base + a], 0.0) for a in legal]
+    total = sum(positive)
+    if total > 0:
+        return [p / total for p in positive]
+    return [1.0 / len(legal)] * len(legal)
+
+
+def _train_shard(regret_in: np.ndarray, iterations: int, seed: int, pre: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Run `iterations` MCCFR iterations from `regret_in`; return (regret delta, strategy-sum delta)."""
+    tree = game_tree()
+    player, street, children = tree.player, tree.street, tree.children
+    showdown, values = tree.terminal_showdown, tree.terminal_value
+    legal = [[a for a in range(NUM_ACTIONS) if kids[a] != -1] for kids in children]
+    regret = regret_in.ravel().tolist()
+    strategy_sum = [0.0] * len(regret)
+    rng = random.Random(seed)
+    deck = list(range(52))
+
+    def walk(node: int, traverser: int, buckets: List[List[int]], result: int) -> float:
+        if node < 0:
+            t = ~node
+            value = values[t] * result if showdown[t] else values[t]
+            return value if traverser == HERO else -value
+        actor = player[node]
+        base = (node * BUCKETS + buckets[actor][street[node]]) * NUM_ACTIONS
+        actions = legal[node]
+        probs = _strategy(regret, base, actions)
+        if actor == traverser:
+            utils = [walk(children[node][a], traverser, buckets, result) for a in actions]
+            node_util = sum(p * u for p, u in zip(probs, utils))
+            for a, u in zip(actions, utils):
+                regret[base + a] = max(regret[base + a] + u - node_util, 0.0)
+            return node_util
+        for a, p in zip(actions, probs):
+            strategy_sum[base + a] += p
+        choice = rng.choices(actions, probs)[0]
+        return walk(children[node][choice], traverser, buckets, result)
+
+    for i in range(iterations):
+        cards = rng.sample(deck, 9)
+        buckets = _deal_buckets(cards, pre)
+        board = np.array([cards[4:9]], dtype=np.int64)
+        hero_value, bot_value = evaluate_batch(np.hstack([np.array([cards[0:2], cards[2:4]]), np.repeat(board, 2, axis=0)]))
+        result = int(hero_value > bot_value) - int(hero_value < bot_value)
+        walk(0, i & 1, buckets, result)
+
+    shape = regret_in.shape
+    return np.array(regret).reshape(shape) - regret_in, np.array(strategy_sum).reshape(shape)
+
+
+def train(path: Path, iterations: int, workers: int, rounds: int, seed: int) -> None:
+    start = time.perf_counter()
+    tree = game_tree()
+    pre = preflop_buckets(seed=seed)
+    print(f"{len(tree):,} decision nodes x {BUCKETS} buckets; preflop buckets in {time.perf_counter() - start:.1f}s")
+
+    shape = (len(tree), BUCKETS, NUM_ACTIONS)
+    regret = np.zeros(shape)
+    strategy_sum = np.zeros(shape)
+    per_round = max(1, iterations // rounds)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for r in range(rounds):
+            shares = [per_round // workers + (1 if i < per_round % workers else 0) for i in range(workers)]
+            seeds = [seed + r * workers + i for i in range(workers)]
+            for regret_delta, sum_delta in pool.map(_train_shard, [regret] * workers, shares, seeds, [pre] * workers):
+                regret += regret_delta
+                strategy_sum += sum_delta
+            np.maximum(regret, 0.0, out=regret)
+            print(f"round {r + 1}/{rounds}: {(r + 1) * per_round:,} iterations, {time.perf_counter() - start:.0f}s")
+
+    legal = np.array([[kid != -1 for kid in kids] for kids in tree.children])[:, None, :]
+    totals = strategy_sum.sum(axis=2, keepdims=True)
+    average = np.where(totals > 0, strategy_sum / np.where(totals > 0, totals, 1), legal / legal.sum(axis=2, keepdims=True))
+    encoded = np.rint(np.where(legal, average, 0.0) * 255).astype(np.uint8)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as fh:
+        fh.write(HEADER.pack(MAGIC, len(tree), BUCKETS, NUM_ACTIONS, tree.signature()))
+        fh.write(pre.astype(np.uint8).tobytes())
+        fh.write(encoded.tobytes())
+    print(f"wrote {path} ({iterations:,} iterations) in {time.perf_counter() - start:.1f}s")
+
+
+class StrategyTable:
+    """Memory-mapped average strategy; rows are uint8 action weights."""
+
+    def __init__(self, path: Path) -> None:
+        tree = game_tree()
+        with open(path, "rb") as fh:
+            magic, nodes, buckets, actions, signature = HEADER.unpack(fh.read(HEADER.size))
+        if magic != MAGIC or (nodes, buckets, actions) != (len(tree), BUCKETS, NUM_ACTIONS) or signature != tree.signature():
+            raise ValueError(f"{path} does not match the current game abstraction; retrain it")
+        self.tree = tree
+        self.preflop = np.memmap(path, dtype=np.uint8, mode="r", offset=HEADER.size, shape=(NUM_COMBOS,))
+        self.strategy = np.memmap(path, dtype=np.uint8, mode="r", offset=HEADER.size + NUM_COMBOS, shape=(nodes, buckets, actions))
+
+    def bucket(self, hole: Sequence[int], board: Sequence[int], hole_strings: Sequence[str], board_strings: Sequence[str]) -> int:
+        if not board:
+            return int(self.preflop[COMBO_INDEX[hole[0], hole[1]]])
+        return postflop_bucket(hole_strings, board_strings)
+
+    def weights(self, node: int, bucket: int) -> List[int]:
+        return self.strategy[node, bucket].tolist()
+
+
+_strategy_table: List[Optional[StrategyTable]] = []
+
+
+def get_strategy() -> Optional[StrategyTable]:
+    """The shared strategy table, or None if none has been trained."""
+    if not _strategy_table:
+        path = Path(settings.bot_strategy_path) if settings.bot_strategy_path else DEFAULT_PATH
+        table = None
+        if path.exists():
+            try:
+                table = StrategyTable(path)
+            except ValueError as exc:
+                log.warning("Ignoring CFR strategy: %s", exc)
+        _strategy_table.append(table)
+    return _strategy_table[0]
+
+
+def _nearest_raise(tree: GameTree, node: int, fraction: float, all_in: bool) -> int:
+    kids = tree.children[node]
+    if all_in and kids[ALL_IN] != -1:
+        return ALL_IN
+    options = [a for a in (HALF_POT, POT, ALL_IN) if kids[a] != -1]
+    if not options:
+        return CALL
+    return min(options, key=lambda a: abs(math.log(max(fraction, 1e-3) / max(tree.fractions[node][a], 1e-3))))
+
+
+def locate(table: "TableManager") -> Optional[int]:
+    """Decision node for the current hand, mapping each logged action to the nearest abstract one."""
+    from .table import decode_action
+
+    tree = game_tree()
+    stacks = {"hero": table.hero_start_stack - SMALL_BLIND, "bot": table.bot_start_stack - BIG_BLIND}
+    bets = {"hero": SMALL_BLIND, "bot": BIG_BLIND}
+    pot = SMALL_BLIND + BIG_BLIND
+    node = 0
+    for token in table.action_log:
+        if node < 0:
+            return None
+        actor, action, amount = decode_action(token)
+        if tree.player[node] != (HERO if actor == "hero" else BOT):
+            return None
+        current = max(bets.values())
+        to_call = current - bets[actor]
+        if action == "fold":
+            return None
+        if action in ("bet", "raise"):
+            target = min(max(amount if amount is not None else current + BIG_BLIND, current + BIG_BLIND), bets[actor] + stacks[actor])
+            add = target - bets[actor]
+            # A bet covering the effective stack is the tree's all-in, whoever has more behind.
+            other = "bot" if actor == "hero" else "hero"
+            covers = target >= min(bets[actor] + stacks[actor], bets[other] + stacks[other])
+            choice = _nearest_raise(tree, node, (target - current) / (pot + to_call), covers)
+        else:
+            add = min(to_call, stacks[actor])
+            choice = CALL
+        stacks[actor] -= add
+        bets[actor] += add
+        pot += add
+        node = tree.children[node][choice]
+        if choice == CALL and (to_call > 0 or actor == "bot"):
+            bets = {"hero": 0, "bot": 0}
+    if node < 0 or STREETS[tree.street[node]] != table.street:
+        return None
+    return node
+
+
+def cfr_policy(table: "TableManager", actor: str) -> Tuple[str, Optional[int]]:
+    """Sample an action from the trained strategy; falls back to the rule-based bot off the tree."""
+    from .table import rule_based_policy
+
+    if table.hero_stack == 0 or table.bot_stack == 0:
+        # Someone is all-in: the tree ended at the shove; the hand only runs out.
+        return "call", None
+    strategy = get_strategy()
+    node = locate(table) if strategy is not None else None
+    if strategy is None or node is None:
+        return rule_based_policy(table, actor)
+    hole = table.hero_cards if actor == "hero" else table.bot_cards
+    hole_strings = table.hero_hand if actor == "hero" else table.bot_hand
+    bucket = strategy.bucket(hole, table.board_cards, hole_strings, table.board)
+    weights = strategy.weights(node, bucket)
+    if not any(weights):
+        return "call", None
+    choice = table.rng.choices(range(NUM_ACTIONS), weights)[0]
+    if choice == FOLD:
+        return "fold", None
+    if choice == CALL:
+        return "call", None
+    bet = table.hero_bet if actor == "hero" else table.bot_bet
+    stack = table.hero_stack if actor == "hero" else table.bot_stack
+    if choice == ALL_IN:
+        return "raise", bet + stack
+    to_call = table.current_bet - bet
+    return "raise", _raise_to(table.current_bet, to_call, table.pot, POT_FRACTIONS[choice])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Train the heads-up CFR strategy tables.")
+    parser.add_argument("command", choices=["train"])
+    parser.add_argument("--path", type=Path, default=DEFAULT_PATH)
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=20, help="synchronisation rounds between workers")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    train(args.path, args.iterations, args.workers, args.rounds, args.seed)
+
+
+if __name__ == "__main__":
+    main()
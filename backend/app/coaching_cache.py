@@ -0,0 +1,208 @@
+"""
+Coaching responses cached per canonical decision spot.
+
+Two decisions that differ only in exact chip counts or suits get the same advice, so
+`spot` reduces a decision to what the coach actually reasons about: street, hero's
+position and the preflop line, SPR and facing-bet buckets, the board texture flags
+from `build_fact_block`, hero's hand class and equity margin, and the action taken
+(with its size bucketed against the pot). The prompt is built from that spot alone,
+never from the exact cards or chips, so a cached answer is valid for every decision
+sharing its key. `CoachingCache` is an LRU of those keys with a TTL, checkpointed to
+a JSON file like the opponent model so it survives restarts.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import settings
+from .eval import RANKS
+from .facts import FACTS_VERSION
+
+
+log = logging.getLogger(__name__)
+
+# Bump when the spot fields change so checkpointed answers for the old fields are dropped.
+SPOT_VERSION = "2"
+
+# Upper bounds of each bucket; anything larger falls in the last one.
+SPR_BUCKETS = (1, 2, 4, 8, 13)
+BET_BUCKETS = (0.25, 0.4, 0.6, 0.8, 1.1, 1.6, 2.5)  # fraction of the pot
+_TEXTURE_FLAGS = (
+    "paired_board",
+    "trips_board",
+    "flush_draw_possible",
+    "straight_draw_possible",
+    "straight_possible",
+    "monotone_board",
+    "two_tone_board",
+)
+
+
+def _bucket(value: Optional[float], bounds: Tuple[float, ...]) -> str:
+    """Range label such as '2-4' or '>13'."""
+    if value is None:
+        return "-"
+    for i, bound in enumerate(bounds):
+        if value <= bound:
+            return f"<={bound}" if i == 0 else f"{bounds[i - 1]}-{bound}"
+    return f">{bounds[-1]}"
+
+
+def hero_position(state: Dict[str, Any]) -> str:
+    """BTN / SB / BB / CO / HJ / EP; heads-up tables seat the hero on the button."""
+    seats = state.get("seats")
+    if not seats or state.get("button") is None:
+        return "BTN"
+    hero = next((s["seat"] for s in seats if s.get("name") == "hero"), None)
+    if hero is None:
+        return "-"
+    n = len(seats)
+    offset = (hero - state["button"]) % n
+    if n == 2:
+        return "BTN" if offset == 0 else "BB"
+    if offset < 3:
+        return ("BTN", "SB", "BB")[offset]
+    return {n - 1: "CO", n - 2: "HJ"}.get(offset, "EP")
+
+
+def _preflop_class(hole: Any) -> str:
+    """'AKs', 'T9o', '77': the 169 starting-hand classes."""
+    if not hole or len(hole) != 2 or "X" in "".join(hole):
+        return "-"
+    (r1, s1), (r2, s2) = sorted(((c[0], c[1]) for c in hole), key=lambda c: RANKS.index(c[0]), reverse=True)
+    if r1 == r2:
+        return r1 + r2
+    return r1 + r2 + ("s" if s1 == s2 else "o")
+
+
+def spot(state: Dict[str, Any], facts: Dict[str, Any], action: Dict[str, Any]) -> Dict[str, str]:
+    """The canonical decision: everything the cache key and the coaching prompt are built from."""
+    f = facts.get("facts", facts) if isinstance(facts, dict) else {}
+    street = f.get("street") or state.get("street") or "-"
+    pot = f.get("pot") or state.get("pot") or 0
+    flags = f.get("board_flags") or {}
+    hand = f.get("hero_hand_features") or {}
+    margin = f.get("equity_margin")
+
+    if street == "preflop":
+        holding = _preflop_class(state.get("hero_hand"))
+        draws: List[str] = []
+    else:
+        holding = (hand.get("made_hand") or "-") + (" (nuts)" if hand.get("has_nuts") else "")
+        draws = ["flush_draw"] if hand.get("flush_draw") else []
+        if hand.get("straight_draw"):
+            draws.append(hand["straight_draw"])
+    amount = action.get("amount")
+    return {
+        "street": street,
+        "position": hero_position(state),
+        "preflop_line": state.get("preflop_line") or "-",
+        "spr": _bucket(f.get("spr"), SPR_BUCKETS),
+        "facing_bet_pot_fraction": _bucket((f.get("bet_pct_pot") or 0) / 100, BET_BUCKETS),
+        "board_texture": ",".join(name for name in _TEXTURE_FLAGS if flags.get(name)) or "-",
+        "board_high_card": str(flags.get("high_card") or "-"),
+        "hero_hand": holding,
+        "hero_draws": ",".join(draws) or "-",
+        "equity_margin": f"{round(margin * 10) / 10:+.1f}" if margin is not None else "-",
+        "action": str(action.get("action") or "-"),
+        "size_pot_fraction": _bucket(amount / pot, BET_BUCKETS) if amount and pot else "-",
+    }
+
+
+def spot_key(decision: Dict[str, str]) -> str:
+    """Cache key of a `spot` (stable across processes)."""
+    return "|".join((SPOT_VERSION, FACTS_VERSION, *decision.values()))
+
+
+class CoachingCache:
+    def __init__(self, max_entries: int = 5000, ttl_seconds: float = 86400.0, path: Optional[Path] = None) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        # key -> (expires_at wall-clock seconds, coaching payload)
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, coaching: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, coaching)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+    def checkpoint(self, path: Optional[Path] = None) -> int:
+        """Write the unexpired entries as JSON (atomically via a temp file)."""
+        path = path or self.path
+        if path is None:
+            return 0
+        now = time.time()
+        with self._lock:
+            data = [[key, expires, coaching] for key, (expires, coaching) in self._entries.items() if expires >= now]
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "w") as fh:
+            json.dump({"spot_version": SPOT_VERSION, "facts_version": FACTS_VERSION, "model": settings.openai_model, "entries": data}, fh, separators=(",", ":"))
+        os.replace(tmp, path)
+        return len(data)
+
+    def load(self, path: Optional[Path] = None) -> int:
+        path = path or self.path
+        if path is None or not path.exists():
+            return 0
+        try:
+            with open(path) as fh:
+                data = json.load(fh)
+        except (OSError, ValueError) as exc:
+            log.warning("Could not load coaching cache %s: %s", path, exc)
+            return 0
+        header = (data.get("spot_version"), data.get("facts_version"), data.get("model"))
+        if header != (SPOT_VERSION, FACTS_VERSION, settings.openai_model):
+            log.warning("Ignoring coaching cache %s built for another spot or facts version or model", path)
+            return 0
+        now = time.time()
+        loaded = 0
+        with self._lock:
+            for key, expires, coaching in data.get("entries", [])[-self.max_entries :]:
+                if expires >= now:
+                    self._entries[key] = (expires, coaching)
+                    loaded += 1
+        return loaded
+
+
+coaching_cache = CoachingCache(
+    max_entries=settings.coaching_cache_size,
+    ttl_seconds=settings.coaching_cache_ttl_seconds,
+    path=Path(settings.coaching_cache_path) if settings.coaching_cache_path else None,
+)
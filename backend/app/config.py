@@ -13,12 +13,56 @@ class Settings(BaseSettings):
     session_cookie_name: str = "poker_session"
     allowed_origin: str = "http://localhost:8000"
     db_url: str = ""
+    # Embedded SQLite (used when db_url is empty), e.g. /data/poker.db on a fly.io volume.
+    sqlite_path: str = ""
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_cache_mb: int = 32
+    sqlite_mmap_mb: int = 128
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_readers: int = 4  # read connections; writes always go through one connection
+    # Connection pool for db_url (Postgres).
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_statement_cache_size: int = 100  # asyncpg prepared statements per connection
+    db_query_cache_size: int = 500  # SQLAlchemy compiled statement cache
     environment: str = "dev"
     openai_api_key: str = ""
     openai_model: str = "gpt-4o-2024-08-06"
     openai_max_input_tokens: int = 400
     openai_max_output_tokens: int = 200
     openai_daily_token_cap: int = 2000
+    coaching_cache_size: int = 5000  # coached spots kept in memory (LRU)
+    coaching_cache_ttl_seconds: float = 86400.0
+    coaching_cache_path: str = ""  # JSON checkpoint of the cache; memory only when unset
+    coaching_cache_checkpoint_seconds: float = 300.0
+    equity_samples: int = 2000
+    equity_time_budget_ms: float = 3.0
+    preflop_table_path: str = ""
+    bot_strategy_path: str = ""
+    bot_mode: str = "cfr"  # cfr | search | rule
+    bot_search_budget_ms: float = 50.0
+    max_tables_per_connection: int = 12
+    table_idle_seconds: float = 300.0  # released tables idle this long are hibernated
+    table_spill_dir: str = ""  # hibernate to files here instead of memory (survives restarts)
+    opponent_model_max_users: int = 10_000
+    opponent_model_path: str = ""
+    opponent_checkpoint_seconds: float = 60.0
+    store_action_rows: bool = False  # hands carry a compact history blob with every action
+    store_action_state: bool = False
+    store_facts: bool = False
+    memory_hands_per_user: int = 200  # in-process history kept per user before spilling
+    memory_actions_per_user: int = 2000
+    memory_facts_per_user: int = 200
+    memory_max_users: int = 1000
+    memory_spill_dir: str = ""  # evicted records are appended here; dropped when unset
+    export_batch_size: int = 500  # hands per keyset page in /history/export
+    db_batch_rows: int = 500  # write-behind: rows per multi-row INSERT
+    db_flush_ms: float = 250.0  # write-behind: max time a row waits before a flush
+    db_queue_max_rows: int = 50_000  # write-behind: pending rows before new ones are dropped
+    db_write_retries: int = 3
+    known_users_cache_size: int = 100_000  # users whose row this process has already upserted
 
     class Config:
         env_file = ".env"
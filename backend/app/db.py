@@ -1,15 +1,85 @@
+from pathlib import Path
 from typing import AsyncGenerator, Optional
 
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from .config import settings
 from .orm import Base
 
 
+def database_url() -> str:
+    """`POKER_DB_URL` if set, else the embedded SQLite file at `POKER_SQLITE_PATH`, else '' (memory only)."""
+    if settings.db_url:
+        return settings.db_url
+    if settings.sqlite_path:
+        return f"sqlite+aiosqlite:///{settings.sqlite_path}"
+    return ""
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers run alongside the single writer; NORMAL sync is durable across app crashes
+    # and only risks the last transactions on power loss.
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA cache_size=-{settings.sqlite_cache_mb * 1024}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_mb << 20}")
+    cursor.close()
+
+
+def _sqlite_engine(url: str, connections: int) -> AsyncEngine:
+    path = url.split(":///", 1)[1]
+    if path and path != ":memory:":
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+    # The dialect default for file databases is NullPool (reconnect + pragmas per session); keep them open.
+    engine = create_async_engine(
+        url,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=connections,
+        max_overflow=0,
+        pool_timeout=settings.db_pool_timeout,
+        query_cache_size=settings.db_query_cache_size,
+    )
+    event.listen(engine.sync_engine, "connect", _sqlite_pragmas)
+    return engine
+
+
 def get_engine() -> Optional[AsyncEngine]:
-    if not settings.db_url:
+    url = database_url()
+    if not url:
         return None
-    return create_async_engine(settings.db_url, future=True, echo=False)
+    if url.startswith("sqlite"):
+        return _sqlite_engine(url, settings.sqlite_readers)
+    connect_args = {}
+    if "+asyncpg" in url:
+        connect_args["prepared_statement_cache_size"] = settings.db_statement_cache_size
+    return create_async_engine(
+        url,
+        future=True,
+        echo=False,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=True,
+        query_cache_size=settings.db_query_cache_size,
+        connect_args=connect_args,
+    )
+
+
+def get_writer_engine(engine: AsyncEngine) -> AsyncEngine:
+    """
+    Engine for the write path. SQLite allows one writer at a time, so writes get their own
+    single-connection pool and queue up in-process instead of contending on the file lock;
+    other databases share `engine`.
+    """
+    if engine.dialect.name != "sqlite":
+        return engine
+    return _sqlite_engine(str(engine.url), 1)
 
 
 def get_session_factory(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
@@ -0,0 +1,155 @@
+import time
+from itertools import combinations
+from math import comb
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .canonical import iso_cached
+from .eval import RANKS, cards_to_ints, evaluate_batch
+from .preflop import COMBO_INDEX, get_table
+
+
+ALL_COMBOS = np.array(list(combinations(range(52), 2)), dtype=np.int64)
+
+# Exact enumeration is used when villain combos x runouts fit in this many rows
+# (always on the river, on the turn for narrow ranges).
+EXACT_MAX_ROWS = 20_000
+BATCH_SIZE = 2_000
+
+
+def _class_combos(label: str) -> List[Tuple[int, int]]:
+    """Combos for a hand class like 'AA', 'AKs', 'AKo' or 'AK' (suited and offsuit)."""
+    label = label.strip()
+    if len(label) < 2 or label[0].upper() not in RANKS or label[1].upper() not in RANKS:
+        raise ValueError(f"Unknown hand class {label}")
+    hi, lo = RANKS.index(label[0].upper()), RANKS.index(label[1].upper())
+    kind = label[2:].lower()
+    out: List[Tuple[int, int]] = []
+    for s1 in range(4):
+        for s2 in range(4):
+            a, b = hi * 4 + s1, lo * 4 + s2
+            if a >= b and hi == lo:
+                continue
+            suited = s1 == s2
+            if hi != lo and ((kind == "s" and not suited) or (kind == "o" and suited)):
+                continue
+            out.append((min(a, b), max(a, b)))
+    return out
+
+
+def expand_range(spec: Dict[str, float]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Turn a weighted range into (combos (m, 2), weights (m,)).
+    Keys are exact combos ('AsKd') or hand classes ('QQ', 'AKs', 'T9o', 'AK').
+    """
+    weights: Dict[Tuple[int, int], float] = {}
+    for label, weight in spec.items():
+        cards = cards_to_ints([label[:2], label[2:]]) if len(label) == 4 else []
+        if len(cards) == 2 and cards[0] != cards[1]:
+            combos = [(min(cards), max(cards))]
+        else:
+            combos = _class_combos(label)
+        for combo in combos:
+            weights[combo] = float(weight)
+    combos_arr = np.array(list(weights), dtype=np.int64).reshape(-1, 2)
+    return combos_arr, np.array(list(weights.values()), dtype=np.float64)
+
+
+def _live_range(
+    dead: Sequence[int], villain_range: Optional[Dict[str, float]]
+) -> Tuple[np.ndarray, np.ndarray]:
+    if villain_range is None:
+        combos, weights = ALL_COMBOS, np.ones(len(ALL_COMBOS))
+    else:
+        combos, weights = expand_range(villain_range)
+    live = ~np.isin(combos, list(dead)).any(axis=1) & (weights > 0)
+    return combos[live], weights[live]
+
+
+def _score(hero: Sequence[int], villain: np.ndarray, boards: np.ndarray, weights: np.ndarray) -> Tuple[float, float, float]:
+    hero_cards = np.broadcast_to(np.array(hero, dtype=np.int64), (len(boards), len(hero)))
+    hero_values = evaluate_batch(np.hstack([hero_cards, boards]))
+    villain_values = evaluate_batch(np.hstack([villain, boards]))
+    win = float(weights[hero_values > villain_values].sum())
+    tie = float(weights[hero_values == villain_values].sum())
+    return win, tie, float(weights.sum())
+
+
+def hero_equity(
+    hero: Sequence[str],
+    board: Sequence[str] = (),
+    villain_range: Optional[Dict[str, float]] = None,
+    samples: int = 20_000,
+    time_budget: Optional[float] = None,
+    rng: Optional[np.random.Generator] = None,
+    exact_max_rows: int = EXACT_MAX_ROWS,
+) -> Optional[Dict[str, Any]]:
+    """
+    Hero's all-in equity against a random hand (or a weighted `villain_range`).
+
+    Preflop spots are read from the precomputed table when it has been built.
+    Otherwise enumerates exactly when few cards remain, or samples in batches until
+    `samples` runouts are scored or `time_budget` seconds elapse.
+
+    Every result has equity, win, tie, samples, exact and source. The preflop table
+    stores only equity (win + tie / 2), so its results carry win and tie as None.
+    """
+    hero_cards = cards_to_ints(hero)
+    board_cards = cards_to_ints(board)
+    if len(hero_cards) != 2 or len(board_cards) > 5 or len(set(hero_cards + board_cards)) != len(hero_cards) + len(board_cards):
+        return None
+    dead = hero_cards + board_cards
+    combos, weights = _live_range(dead, villain_range)
+    if not len(combos):
+        return None
+    need = 5 - len(board_cards)
+    table = get_table() if need == 5 else None
+    if table is not None:
+        hero_index = int(COMBO_INDEX[hero_cards[0], hero_cards[1]])
+        equity = table.range_equity(hero_index, COMBO_INDEX[combos[:, 0], combos[:, 1]], weights)
+        if equity is not None:
+            return {"equity": equity, "win": None, "tie": None, "samples": 0, "exact": False, "source": "preflop_table"}
+    deck = np.array([c for c in range(52) if c not in dead], dtype=np.int64)
+    deck_pos = np.zeros(52, dtype=np.int64)
+    deck_pos[deck] = np.arange(len(deck))
+    known = np.array(board_cards, dtype=np.int64)
+
+    if len(combos) * comb(len(deck) - 2, need) <= exact_max_rows:
+        runouts = list(combinations(deck.tolist(), need))
+        runouts_arr = np.array(runouts, dtype=np.int64).reshape(len(runouts), need)
+        villain = np.repeat(combos, len(runouts), axis=0)
+        rows = np.tile(runouts_arr, (len(combos), 1))
+        row_weights = np.repeat(weights, len(runouts))
+        live = np.ones(len(rows), dtype=bool)
+        for i in range(need):
+            live &= (rows[:, i] != villain[:, 0]) & (rows[:, i] != villain[:, 1])
+        villain, rows, row_weights = villain[live], rows[live], row_weights[live]
+        boards = np.hstack([np.broadcast_to(known, (len(rows), len(known))), rows])
+        win, tie, total = _score(hero_cards, villain, boards, row_weights)
+        return {"equity": (win + tie / 2) / total, "win": win / total, "tie": tie / total, "samples": int(live.sum()), "exact": True, "source": "enumeration"}
+
+    rng = rng or np.random.default_rng()
+    probs = weights / weights.sum()
+    deadline = time.perf_counter() + time_budget if time_budget else None
+    win = tie = total = 0.0
+    done = 0
+    while done < samples:
+        n = min(BATCH_SIZE, samples - done)
+        villain = combos[rng.choice(len(combos), size=n, p=probs)]
+        keys = rng.random((n, len(deck)))
+        keys[np.arange(n)[:, None], deck_pos[villain]] = 2.0  # never deal the villain's cards
+        picks = np.argpartition(keys, need, axis=1)[:, :need]
+        boards = np.hstack([np.broadcast_to(known, (n, len(known))), deck[picks]])
+        w, t, tot = _score(hero_cards, villain, boards, np.ones(n))
+        win, tie, total, done = win + w, tie + t, total + tot, done + n
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+    return {"equity": (win + tie / 2) / total, "win": win / total, "tie": tie / total, "samples": done, "exact": False, "source": "monte_carlo"}
+
+
+@iso_cached(maxsize=100_000)
+def equity_vs_random(hole: Sequence[str], board: Sequence[str], samples: int, time_budget: Optional[float]) -> Optional[float]:
+    """`hero_equity` against a random hand, computed once per suit-isomorphism class."""
+    result = hero_equity(hole, board, samples=samples, time_budget=time_budget)
+    return result["equity"] if result else None
@@ -1,62 +1,282 @@
 import logging
 import random
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations, combinations_with_replacement
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
+import numpy as np
 
 log = logging.getLogger(__name__)
 
+# Cards are ints 0..51: rank * 4 + suit, rank 0..12 = 2..A, suit 0..3 = c, d, h, s.
+RANKS = "23456789TJQKA"
+SUITS = "cdhs"
+CARD_INDEX: Dict[str, int] = {r + s: i * 4 + j for i, r in enumerate(RANKS) for j, s in enumerate(SUITS)}
+CARD_STRINGS: List[str] = [RANKS[c >> 2] + SUITS[c & 3] for c in range(52)]
 
-def _parse_card(card: str) -> Optional[str]:
+HAND_LABELS = (
+    "High card",
+    "One pair",
+    "Two pair",
+    "Three of a kind",
+    "Straight",
+    "Flush",
+    "Full house",
+    "Four of a kind",
+    "Straight flush",
+)
+
+# Hand values are ints, higher is better: category << 20 followed by up to five 4-bit rank nibbles.
+CATEGORY_SHIFT = 20
+
+# Each card adds 5**rank to a hand's rank key; at most four cards share a rank, so the key
+# identifies the rank multiset exactly and is independent of suits.
+RANK_KEYS: List[int] = [5 ** (c >> 2) for c in range(52)]
+
+
+def _pack(category: int, ranks: Sequence[int]) -> int:
+    value = category << CATEGORY_SHIFT
+    shift = 16
+    for rank in ranks:
+        value |= rank << shift
+        shift -= 4
+    return value
+
+
+def straight_high(mask: int) -> int:
+    for high in range(12, 3, -1):
+        if (mask >> (high - 4)) & 0x1F == 0x1F:
+            return high
+    if mask & 0x100F == 0x100F:  # A-2-3-4-5
+        return 3
+    return -1
+
+
+def _flush_value(mask: int) -> int:
+    high = straight_high(mask)
+    if high >= 0:
+        return _pack(8, [high])
+    return _pack(5, [r for r in range(12, -1, -1) if mask >> r & 1][:5])
+
+
+def _rank_value(counts: Sequence[int]) -> int:
+    ranks = [r for r in range(12, -1, -1) if counts[r]]
+    quads = [r for r in ranks if counts[r] == 4]
+    trips = [r for r in ranks if counts[r] == 3]
+    pairs = [r for r in ranks if counts[r] == 2]
+    if quads:
+        return _pack(7, [quads[0]] + [r for r in ranks if r != quads[0]][:1])
+    if trips and (len(trips) > 1 or pairs):
+        return _pack(6, [trips[0], max(trips[1:] + pairs)])
+    mask = 0
+    for r in ranks:
+        mask |= 1 << r
+    high = straight_high(mask)
+    if high >= 0:
+        return _pack(4, [high])
+    if trips:
+        return _pack(3, [trips[0]] + [r for r in ranks if r != trips[0]][:2])
+    if len(pairs) > 1:
+        return _pack(2, pairs[:2] + [r for r in ranks if r not in pairs[:2]][:1])
+    if pairs:
+        return _pack(1, [pairs[0]] + [r for r in ranks if r != pairs[0]][:3])
+    return _pack(0, ranks[:5])
+
+
+_FLUSH_TABLE: List[int] = []
+_RANK_TABLE: Dict[int, int] = {}
+
+
+def _build_tables() -> None:
+    flush = [0] * 8192
+    for mask in range(8192):
+        if bin(mask).count("1") >= 5:
+            flush[mask] = _flush_value(mask)
+    pow5 = [5**r for r in range(13)]
+    smaller: Dict[int, int] = {}
+    for size in (5, 6, 7):
+        table: Dict[int, int] = {}
+        for ranks in combinations_with_replacement(range(13), size):
+            if any(ranks[i] == ranks[i + 4] for i in range(size - 4)):
+                continue  # five of a rank
+            key = sum(pow5[r] for r in ranks)
+            if size == 5:
+                counts = [0] * 13
+                for r in ranks:
+                    counts[r] += 1
+                table[key] = _rank_value(counts)
+            else:
+                # Best five of n ranks is the best over dropping any one of them.
+                table[key] = max(smaller[key - pow5[r]] for r in set(ranks))
+        _RANK_TABLE.update(table)
+        smaller = table
+    _FLUSH_TABLE[:] = flush
+
+
+def lookup_tables() -> Tuple[List[int], Dict[int, int]]:
+    """Flush table (13-bit suit mask -> value, 0 if < 5 cards) and rank table (rank key -> value)."""
+    if not _FLUSH_TABLE:
+        _build_tables()
+    return _FLUSH_TABLE, _RANK_TABLE
+
+
+_NP_TABLES: List[np.ndarray] = []
+
+
+def _np_tables() -> List[np.ndarray]:
+    if not _NP_TABLES:
+        flush_table, rank_table = lookup_tables()
+        keys = np.array(sorted(rank_table), dtype=np.int64)
+        values = np.array([rank_table[k] for k in keys.tolist()], dtype=np.int32)
+        # One bit per card, 13 bits per suit, so a row sum holds all four suit masks.
+        suit_bits = np.array([1 << ((c & 3) * 13 + (c >> 2)) for c in range(52)], dtype=np.int64)
+        _NP_TABLES[:] = [np.array(flush_table, dtype=np.int32), keys, values, np.array(RANK_KEYS, dtype=np.int64), suit_bits]
+    return _NP_TABLES
+
+
+def evaluate_batch(cards: np.ndarray) -> np.ndarray:
+    """Vectorized `evaluate` over an (n, 5..7) int array of distinct cards per row."""
+    flush_table, keys, values, rank_keys, suit_bits = _np_tables()
+    cards = np.asarray(cards, dtype=np.int64)
+    masks = suit_bits[cards].sum(axis=1)
+    flush = flush_table[masks & 0x1FFF]
+    for suit in range(1, 4):
+        np.maximum(flush, flush_table[(masks >> (13 * suit)) & 0x1FFF], out=flush)
+    ranked = values[np.searchsorted(keys, rank_keys[cards].sum(axis=1))]
+    return np.where(flush > 0, flush, ranked)
+
+
+def _as_card_array(cards, width: int) -> np.ndarray:
+    arr = np.asarray(cards)
+    if arr.dtype.kind in "iu":
+        out = arr.astype(np.int64)
+    else:
+        out = np.array([CARD_INDEX.get(str(c)[:1].upper() + str(c)[1:].lower(), -1) for c in arr.ravel()], dtype=np.int64)
+        if (out < 0).any():
+            raise ValueError("unrecognised card in batch")
+    out = out.reshape(-1, width)
+    if ((out < 0) | (out > 51)).any():
+        raise ValueError("card index out of range")
+    return out
+
+
+def _score_chunk(hero: np.ndarray, bot: np.ndarray, board: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    hero_values = evaluate_batch(np.hstack([hero, board]))
+    bot_values = evaluate_batch(np.hstack([bot, board]))
+    winner = np.sign(hero_values - bot_values).astype(np.int8)
+    return winner, (hero_values >> CATEGORY_SHIFT).astype(np.int8), (bot_values >> CATEGORY_SHIFT).astype(np.int8)
+
+
+def decide_winners_batch(hero, bot, board, workers: int = 1, chunk_size: int = 250_000) -> Dict[str, np.ndarray]:
+    """
+    Score many showdowns at once. Inputs are (n, 2), (n, 2) and (n, 5) arrays of int cards
+    or card strings. Returns int8 arrays: winner (1 hero, -1 bot, 0 split; ties are left to
+    the caller) and hero/bot hand categories (indexes into HAND_LABELS). Inputs larger than
+    `chunk_size` are split across a process pool when `workers` > 1.
+    """
+    hero_arr = _as_card_array(hero, 2)
+    bot_arr = _as_card_array(bot, 2)
+    board_arr = _as_card_array(board, 5)
+    if not len(hero_arr) == len(bot_arr) == len(board_arr):
+        raise ValueError("hero, bot and board must have the same number of rows")
+
+    n = len(hero_arr)
+    if workers > 1 and n > chunk_size:
+        bounds = list(range(0, n, chunk_size))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(
+                pool.map(
+                    _score_chunk,
+                    [hero_arr[i : i + chunk_size] for i in bounds],
+                    [bot_arr[i : i + chunk_size] for i in bounds],
+                    [board_arr[i : i + chunk_size] for i in bounds],
+                )
+            )
+        winner, hero_cat, bot_cat = (np.concatenate(col) for col in zip(*parts))
+    else:
+        winner, hero_cat, bot_cat = _score_chunk(hero_arr, bot_arr, board_arr)
+    return {"winner": winner, "hero_category": hero_cat, "bot_category": bot_cat}
+
+
+def card_to_int(card: str) -> Optional[int]:
     if not card or len(card) != 2:
         return None
-    rank, suit = card[0].upper(), card[1].lower()
-    return f"{rank}{suit}"
+    return CARD_INDEX.get(card[0].upper() + card[1].lower())
 
 
-def evaluate_with_pokerkit(hero: List[str], bot: List[str], board: List[str]) -> Optional[Dict[str, Any]]:
-    try:
-        from pokerkit import Card, StandardHighHand
-    except Exception:
-        log.exception("pokerkit import failed")
-        return None
-    try:
-        hero_cards = tuple(Card.parse("".join(hero)))
-        bot_cards = tuple(Card.parse("".join(bot)))
-        board_cards = tuple(Card.parse("".join(board)))
-        hero_hand = StandardHighHand.from_game(hero_cards, board_cards)
-        bot_hand = StandardHighHand.from_game(bot_cards, board_cards)
-        if hero_hand > bot_hand:
-            winner = "hero"
-        elif bot_hand > hero_hand:
-            winner = "bot"
-        else:
-            winner = "split"
-        return {"winner": winner, "hero_hand": hero_hand, "bot_hand": bot_hand}
-    except Exception:
-        log.exception("pokerkit evaluation failed")
-        return None
+def cards_to_ints(cards: Iterable[str]) -> List[int]:
+    out: List[int] = []
+    for card in cards:
+        c = card_to_int(card)
+        if c is not None:
+            out.append(c)
+    return out
 
 
-def decide_winner(hero: List[str], bot: List[str], board: List[str], rng: random.Random) -> Dict[str, str]:
-    hero_cards = [_parse_card(c) for c in hero if _parse_card(c)]
-    bot_cards = [_parse_card(c) for c in bot if _parse_card(c)]
-    board_cards = [_parse_card(c) for c in board if _parse_card(c)]
+def evaluate(cards: Sequence[int]) -> int:
+    """Value of the best five-card hand among 5-7 int cards; higher is better."""
+    flush_table, rank_table = lookup_tables()
+    masks = [0, 0, 0, 0]
+    key = 0
+    for c in cards:
+        masks[c & 3] |= 1 << (c >> 2)
+        key += RANK_KEYS[c]
+    for mask in masks:
+        value = flush_table[mask]
+        if value:
+            return value
+    return rank_table[key]
 
-    result = evaluate_with_pokerkit(hero_cards, bot_cards, board_cards)
-    if result is None:
+
+def hand_category(value: int) -> int:
+    return value >> CATEGORY_SHIFT
+
+
+def hand_label(value: int) -> str:
+    return HAND_LABELS[value >> CATEGORY_SHIFT]
+
+
+def best_five(cards: Sequence[int], value: Optional[int] = None) -> Tuple[int, ...]:
+    """First five-card combination (in input order) that makes the hand's value."""
+    if value is None:
+        value = evaluate(cards)
+    for combo in combinations(cards, 5):
+        if evaluate(combo) == value:
+            return combo
+    return tuple(cards[:5])
+
+
+def describe_hand(cards: Sequence[int], value: Optional[int] = None) -> str:
+    if value is None:
+        value = evaluate(cards)
+    shown = "".join(CARD_STRINGS[c] for c in best_five(cards, value))
+    return f"{hand_label(value)} ({shown})"
+
+
+def showdown(hero_cards: Sequence[int], bot_cards: Sequence[int], board_cards: Sequence[int], rng: random.Random) -> Dict[str, str]:
+    """`decide_winner` for int cards."""
+    if not (5 <= len(hero_cards) + len(board_cards) <= 7 and 5 <= len(bot_cards) + len(board_cards) <= 7):
+        log.warning("cannot evaluate showdown hero=%s bot=%s board=%s", hero_cards, bot_cards, board_cards)
         winner = "hero" if rng.random() < 0.5 else "bot"
         return {"winner": winner, "reason": "fallback_random"}
 
-    winner = result["winner"]
-    hero_hand = result["hero_hand"]
-    bot_hand = result["bot_hand"]
+    hero_all = [*hero_cards, *board_cards]
+    bot_all = [*bot_cards, *board_cards]
+    hero_value = evaluate(hero_all)
+    bot_value = evaluate(bot_all)
 
-    if winner == "hero":
-        reason = str(hero_hand)
-    elif winner == "bot":
-        reason = str(bot_hand)
+    if hero_value > bot_value:
+        winner = "hero"
+        reason = describe_hand(hero_all, hero_value)
+    elif bot_value > hero_value:
+        winner = "bot"
+        reason = describe_hand(bot_all, bot_value)
     else:
         winner = "hero" if rng.random() < 0.5 else "bot"
-        reason = f"Tie ({hero_hand.entry.label.value}) — coin flip to {winner}"
+        reason = f"Tie ({hand_label(hero_value)}) — coin flip to {winner}"
 
     return {"winner": winner, "reason": reason}
+
+
+def decide_winner(hero: List[str], bot: List[str], board: List[str], rng: random.Random) -> Dict[str, str]:
+    return showdown(cards_to_ints(hero), cards_to_ints(bot), cards_to_ints(board), rng)
@@ -0,0 +1,163 @@
+"""
+Hand-history export, streamed straight from the database.
+
+Hands are read in keyset batches (`user_id = ? AND id > last_id ORDER BY id LIMIT n`, served by
+the `(user_id, id)` index), each with its own
+short session, so memory stays at one batch however long the history is and no
+transaction is held open between batches. Formatting runs in a worker thread so a
+large export does not stall the event loop. Two formats: a PokerStars-style text
+hand history of the heads-up hands and NDJSON (one decoded hand per line, ring hands
+included). Ring rows do not store the seat count, button or the bots' cards, so they
+have no faithful text rendering and the text format skips them. Neither contains the hand seed or
+deck fingerprint (see `render`). A row whose history blob does not decode is exported
+from its readable columns instead, so one bad row never truncates a stream whose
+headers are already sent.
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from .handhistory import FormatError, decode_hand
+from .orm import Hand as HandORM
+from .replay import HandReplay, ReplayError
+from .table import decode_action
+
+
+log = logging.getLogger(__name__)
+
+FORMATS = {"text": "text/plain; charset=utf-8", "ndjson": "application/x-ndjson"}
+_VERBS = {"fold": "folds", "check": "checks", "call": "calls", "bet": "bets", "raise": "raises to"}
+_COLUMNS = (
+    HandORM.id,
+    HandORM.created_at,
+    HandORM.history,
+    HandORM.hand_number,
+    HandORM.table_id,
+    HandORM.board,
+    HandORM.hero_hand,
+    HandORM.bot_hand,
+    HandORM.winner,
+    HandORM.reason,
+    HandORM.hero_stack,
+    HandORM.bot_stack,
+    HandORM.actions,
+)
+
+
+def _row_hand(row: Any) -> Dict[str, Any]:
+    """Decoded hand for a DB row; rows without a usable history blob fall back to the readable columns."""
+    hand = None
+    if row.history:
+        try:
+            hand = decode_hand(row.history)
+        except FormatError as exc:
+            log.warning("Exporting hand %s from its columns; history blob does not decode: %s", row.id, exc)
+    if hand is None:
+        hand = {
+            "hand_id": row.hand_number,
+            "table_id": row.table_id,
+            "winner": row.winner,
+            "reason": row.reason,
+            "board": (row.board or "").split(),
+            "hero_hand": (row.hero_hand or "").split(),
+            "bot_hand": (row.bot_hand or "").split(),
+            "hero_stack": row.hero_stack,
+            "bot_stack": row.bot_stack,
+            "actions": row.actions or "",
+        }
+    hand["id"] = row.id
+    hand["created_at"] = row.created_at.isoformat() if row.created_at else None
+    return hand
+
+
+def _is_ring(hand: Dict[str, Any]) -> bool:
+    # Ring tables log the seat number where heads-up tables log 'h' / 'b'.
+    return (hand.get("actions") or "")[:1].isdigit()
+
+
+def hand_to_text(hand: Dict[str, Any]) -> str:
+    """PokerStars-style text for a heads-up hand."""
+    tokens = (hand.get("actions") or "").split()
+    streets: Optional[List[str]] = None
+    if hand.get("hand_seed") is not None:
+        try:
+            streets = HandReplay(hand).streets()
+        except ReplayError:
+            streets = None
+    when = hand.get("created_at") or datetime.utcnow().isoformat()
+    board = hand.get("board") or []
+    lines = [
+        f"Poker Coach Hand #{hand['id']}: Hold'em No Limit (1/2) - {when[:19].replace('T', ' ')} UTC",
+        f"Table '{hand.get('table_id') or 'main'}' 2-max Seat #1 is the button",
+    ]
+    if hand.get("hero_start_stack") is not None:
+        lines.append(f"Seat 1: hero ({hand['hero_start_stack']} in chips)")
+        lines.append(f"Seat 2: bot ({hand['bot_start_stack']} in chips)")
+    lines += ["hero: posts small blind 1", "bot: posts big blind 2", "*** HOLE CARDS ***"]
+    lines.append(f"Dealt to hero [{' '.join(hand.get('hero_hand') or [])}]")
+    shown = {"flop": 3, "turn": 4, "river": 5}
+    street = "preflop"
+    for i, token in enumerate(tokens):
+        if streets is not None and streets[i] != street:
+            street = streets[i]
+            lines.append(f"*** {street.upper()} *** [{' '.join(board[: shown[street]])}]")
+        actor, action, amount = decode_action(token)
+        verb = _VERBS[action]
+        lines.append(f"{actor}: {verb} {amount}" if amount is not None and action in ("bet", "raise") else f"{actor}: {verb}")
+    if tokens and not tokens[-1][1] == "f":
+        lines.append("*** SHOWDOWN ***")
+        lines.append(f"bot: shows [{' '.join(hand.get('bot_hand') or [])}]")
+    lines.append("*** SUMMARY ***")
+    if hand.get("payout") is not None:
+        lines.append(f"Total pot {hand['payout']}")
+    if board:
+        lines.append(f"Board [{' '.join(board)}]")
+    lines.append(f"{hand.get('winner')} won: {hand.get('reason') or ''}".rstrip(": "))
+    return "\n".join(lines) + "\n\n"
+
+
+def format_batch(rows: Sequence[Any], fmt: str) -> str:
+    return render([_row_hand(row) for row in rows], fmt)
+
+
+# Hand seeds come from the table's Mersenne Twister; enough of them would let a client
+# reconstruct its state and predict future decks, so they never leave the server.
+_PRIVATE = ("hand_seed", "deck_fingerprint")
+
+
+def render(hands: Sequence[Dict[str, Any]], fmt: str) -> str:
+    """
+    Format decoded hands. NDJSON is every decoded field except `_PRIVATE`; the text
+    format never prints them and leaves out ring hands (see the module docstring).
+    """
+    if fmt == "ndjson":
+        hands = [{k: v for k, v in hand.items() if k not in _PRIVATE} for hand in hands]
+        return "".join(json.dumps(hand, separators=(",", ":"), default=str) + "\n" for hand in hands)
+    return "".join(hand_to_text(hand) for hand in hands if not _is_ring(hand))
+
+
+async def stream_export(
+    session_factory: async_sessionmaker[AsyncSession], user_id: str, fmt: str, batch_size: int = 500
+) -> AsyncIterator[str]:
+    loop = asyncio.get_running_loop()
+    last_id = 0
+    while True:
+        async with session_factory() as session:
+            result = await session.execute(
+                select(*_COLUMNS)
+                .where(HandORM.user_id == user_id, HandORM.id > last_id)
+                .order_by(HandORM.id)
+                .limit(batch_size)
+            )
+            rows = result.all()
+        if not rows:
+            return
+        last_id = rows[-1].id
+        yield await loop.run_in_executor(None, format_batch, rows, fmt)
+        if len(rows) < batch_size:
+            return
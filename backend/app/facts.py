@@ -1,55 +1,40 @@
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
+from typing import Dict, Optional
 
+from .config import settings
+from .equity import equity_vs_random
+from .opponent import MIN_HANDS
+from .texture import board_texture, hand_features, summarize
 
-FACTS_VERSION = "0.1.0"
 
-RANK_ORDER = {"2": 2, "3": 3, "4": 4, "5": 5, "6": 6, "7": 7, "8": 8, "9": 9, "T": 10, "J": 11, "Q": 12, "K": 13, "A": 14}
+FACTS_VERSION = "0.4.1"
 
 
-def _parse_board(board: List[str]) -> Tuple[List[int], List[str]]:
-    ranks: List[int] = []
-    suits: List[str] = []
-    for card in board:
-        if not card or len(card) != 2:
-            continue
-        rank = RANK_ORDER.get(card[0].upper())
-        suit = card[1].lower()
-        if rank:
-            ranks.append(rank)
-        suits.append(suit)
-    return ranks, suits
+def _hero_equity(state: Dict) -> Optional[float]:
+    hole = state.get("hero_hand") or []
+    if len(hole) != 2:
+        return None
+    equity = equity_vs_random(
+        tuple(hole),
+        tuple(state.get("board") or []),
+        settings.equity_samples,
+        settings.equity_time_budget_ms / 1000,
+    )
+    return round(equity, 3) if equity is not None else None
 
 
-def _board_flags(board: List[str]) -> Dict[str, bool]:
-    ranks, suits = _parse_board(board)
-    paired = len(ranks) != len(set(ranks))
-    suit_counts: Dict[str, int] = {}
-    for s in suits:
-        suit_counts[s] = suit_counts.get(s, 0) + 1
-    max_suit = max(suit_counts.values()) if suit_counts else 0
-    flush_draw_possible = max_suit >= 3  # 3+ to one suit on board
-    monotone = max_suit == len(board) and len(board) > 0
+def is_decision(state: Dict) -> bool:
+    """Hero is to act in a live hand: the only states that get an equity estimate."""
+    return state.get("to_act") == "hero" and not state.get("hand_over")
 
-    straight_draw_possible = False
-    if len(ranks) >= 3:
-        unique = sorted(set(ranks))
-        for i in range(len(unique)):
-            window = unique[i : i + 3]
-            if len(window) == 3 and max(window) - min(window) <= 4:
-                straight_draw_possible = True
-                break
 
-    return {
-        "paired_board": paired,
-        "flush_draw_possible": flush_draw_possible,
-        "straight_draw_possible": straight_draw_possible,
-        "monotone_board": monotone,
-    }
-
-
-def build_fact_block(state: Dict) -> Dict:
+def build_fact_block(state: Dict, tendencies: Optional[Dict] = None, with_equity: bool = True) -> Dict:
+    """
+    Facts for a table state. The equity estimate is Monte Carlo (up to
+    `equity_time_budget_ms` on a cold class), so callers on the event loop pass
+    `with_equity=False` for states hero does not act on, or run this in an executor.
+    """
     pot = state.get("pot", 0) or 0
     hero_bet = state.get("hero_bet", 0) or 0
     bot_bet = state.get("bot_bet", 0) or 0
@@ -62,7 +47,11 @@ def build_fact_block(state: Dict) -> Dict:
     required_equity = round(to_call / (pot + to_call), 3) if to_call > 0 else 0.0
     bet_pct_pot = round((to_call / pot) * 100, 1) if pot > 0 and to_call > 0 else 0.0
 
-    flags = _board_flags(state.get("board") or [])
+    board = state.get("board") or []
+    flags = board_texture(board)
+    hand = hand_features(state.get("hero_hand") or [], board)
+    equity = _hero_equity(state) if with_equity else None
+    equity_margin = round(equity - required_equity, 3) if equity is not None else None
     position = "Button (IP)" if state.get("street") == "preflop" else "Button (acts first here)"
 
     facts = {
@@ -75,15 +64,25 @@ def build_fact_block(state: Dict) -> Dict:
         "spr": spr,
         "bet_pct_pot": bet_pct_pot,
         "required_equity": required_equity,
+        "hero_equity": equity,
+        "equity_margin": equity_margin,
         "position": position,
         "board_flags": flags,
+        "hero_hand_features": hand,
     }
+    if tendencies and tendencies.get("hands", 0) >= MIN_HANDS:
+        facts["hero_tendencies"] = tendencies
 
     summary_lines = [
         f"Pot: {pot} | To call: {to_call} | Required equity: {required_equity:.3f}",
+        f"Equity vs random hand: {equity if equity is not None else 'n/a'} | Margin over required: {equity_margin if equity_margin is not None else 'n/a'}",
         f"SPR: {spr if spr is not None else 'inf'} | Bet % pot: {bet_pct_pot}%",
-        f"Position: {position} | Board: paired={flags['paired_board']}, flush_draw={flags['flush_draw_possible']}, straight_draw={flags['straight_draw_possible']}",
+        f"Position: {position} | Board: {summarize(flags, hand)}",
     ]
+    if "hero_tendencies" in facts:
+        summary_lines.append(
+            f"Hero tendencies ({tendencies['hands']} hands): VPIP {tendencies['vpip']} | PFR {tendencies['pfr']} | Fold to c-bet {tendencies['fold_to_cbet']}"
+        )
 
     return {
         "type": "facts_update",
@@ -0,0 +1,203 @@
+"""
+Compact binary encoding of a heads-up hand (summary + replay record).
+
+Layout, version 1 (all integers unsigned LEB128 varints unless noted; "z" = zigzag):
+
+    b"H" version
+    hand_id  hand_seed:u64le  deck_fingerprint:8 bytes
+    hero_start  bot_start  z(hero_end - hero_start)  z(bot_end - bot_start)  payout
+    winner:u8 (0 none, 1 hero, 2 bot)
+    hero cards:2 bytes  bot cards:2 bytes  board count:u8  board cards
+    action count, then per action one byte (bit 7: amount follows, bit 3: bot,
+        bits 0-2: fold/check/call/bet/raise) and, if flagged, z(amount - previous amount)
+    table_id length + utf-8
+
+Cards are eval ints. Each action is stored as a delta on the hand so far; full
+per-action states are not stored at all, they are rebuilt on demand with
+`replay.HandReplay` from the seed, stacks and action list. The reason string is
+recomputed from the cards on decode. A typical hand is ~50 bytes, against ~400 bytes for
+the JSON summary alone and several KB once per-action state rows are stored.
+"""
+import struct
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .eval import CARD_STRINGS, cards_to_ints, describe_hand, evaluate, hand_label
+from .table import ACTION_CODES, DEFAULT_TABLE_ID
+
+
+FORMAT_VERSION = 1
+MAGIC = b"H"
+_CODES = tuple(ACTION_CODES.values())  # "fkcbr"
+_WINNERS = (None, "hero", "bot")
+_U64 = struct.Struct("<Q")
+
+
+class FormatError(ValueError):
+    pass
+
+
+def _put_varint(out: bytearray, value: int) -> None:
+    if value < 0:
+        raise FormatError(f"negative varint {value}")
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+class _Reader:
+    __slots__ = ("data", "pos")
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.pos = 0
+
+    def varint(self) -> int:
+        result = shift = 0
+        data = self.data
+        while True:
+            try:
+                byte = data[self.pos]
+            except IndexError:
+                raise FormatError("truncated hand history") from None
+            self.pos += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    def take(self, n: int) -> bytes:
+        chunk = self.data[self.pos : self.pos + n]
+        if len(chunk) != n:
+            raise FormatError("truncated hand history")
+        self.pos += n
+        return chunk
+
+
+def _cards(cards: Iterable[Any]) -> List[int]:
+    cards = list(cards or [])
+    if cards and isinstance(cards[0], str):
+        return cards_to_ints(cards)
+    return [int(c) for c in cards]
+
+
+def encode_hand(record: Dict[str, Any]) -> bytes:
+    """Encode a `log_hand` payload (`TableManager` summary merged with `hand_record()`)."""
+    out = bytearray(MAGIC)
+    out.append(FORMAT_VERSION)
+    _put_varint(out, int(record.get("hand_id") or 0))
+    out += _U64.pack(int(record.get("hand_seed") or 0))
+    out += bytes.fromhex(record.get("deck_fingerprint") or "00" * 8)
+    hero_start = int(record.get("hero_start_stack") or 0)
+    bot_start = int(record.get("bot_start_stack") or 0)
+    _put_varint(out, hero_start)
+    _put_varint(out, bot_start)
+    _put_varint(out, _zigzag(int(record.get("hero_stack") or 0) - hero_start))
+    _put_varint(out, _zigzag(int(record.get("bot_stack") or 0) - bot_start))
+    _put_varint(out, int(record.get("payout") or 0))
+    out.append(_WINNERS.index(record.get("winner")) if record.get("winner") in _WINNERS else 0)
+
+    hero, bot, board = _cards(record.get("hero_hand")), _cards(record.get("bot_hand")), _cards(record.get("board"))
+    if len(hero) != 2 or len(bot) != 2 or len(board) > 5:
+        raise FormatError("a heads-up hand needs two hole cards per player and at most five board cards")
+    out += bytes(hero) + bytes(bot)
+    out.append(len(board))
+    out += bytes(board)
+
+    tokens = (record.get("actions") or "").split()
+    _put_varint(out, len(tokens))
+    previous = 0
+    for token in tokens:
+        head = _CODES.index(token[1]) | (8 if token[0] == "b" else 0)
+        if len(token) > 2:
+            amount = int(token[2:])
+            out.append(head | 0x80)
+            _put_varint(out, _zigzag(amount - previous))
+            previous = amount
+        else:
+            out.append(head)
+
+    table_id = (record.get("table_id") or DEFAULT_TABLE_ID).encode()
+    _put_varint(out, len(table_id))
+    out += table_id
+    return bytes(out)
+
+
+def _reason(winner: Optional[str], tokens: List[str], hero: List[int], bot: List[int], board: List[int]) -> str:
+    if tokens and tokens[-1][1] == "f":
+        return f"{'hero' if tokens[-1][0] == 'h' else 'bot'} folded"
+    if len(board) < 5:
+        return ""
+    hero_value, bot_value = evaluate([*hero, *board]), evaluate([*bot, *board])
+    if hero_value == bot_value:
+        return f"Tie ({hand_label(hero_value)}) — coin flip to {winner}"
+    return describe_hand([*(hero if winner == "hero" else bot), *board])
+
+
+def decode_hand(data: bytes, with_reason: bool = True) -> Dict[str, Any]:
+    """Inverse of `encode_hand`: the summary fields plus the replay record.
+
+    The reason is re-derived by evaluating the showdown, about half the decode time;
+    bulk readers that don't need it can skip it.
+    """
+    if data[:1] != MAGIC:
+        raise FormatError("not a hand history record")
+    if len(data) < 2 or data[1] != FORMAT_VERSION:
+        raise FormatError(f"unsupported hand history version {data[1] if len(data) > 1 else None}")
+    r = _Reader(data)
+    r.pos = 2
+    hand_id = r.varint()
+    hand_seed = _U64.unpack(r.take(8))[0]
+    fingerprint = r.take(8).hex()
+    hero_start, bot_start = r.varint(), r.varint()
+    hero_end = hero_start + _unzigzag(r.varint())
+    bot_end = bot_start + _unzigzag(r.varint())
+    payout = r.varint()
+    winner = _WINNERS[r.take(1)[0]]
+    hole = r.take(4)
+    hero, bot = list(hole[:2]), list(hole[2:])
+    board = list(r.take(r.take(1)[0]))
+
+    tokens: List[str] = []
+    previous = 0
+    for _ in range(r.varint()):
+        head = r.take(1)[0]
+        token = ("b" if head & 8 else "h") + _CODES[head & 7]
+        if head & 0x80:
+            previous += _unzigzag(r.varint())
+            token += str(previous)
+        tokens.append(token)
+    table_id = r.take(r.varint()).decode()
+
+    return {
+        "hand_id": hand_id,
+        "table_id": table_id,
+        "winner": winner,
+        "reason": _reason(winner, tokens, hero, bot, board) if with_reason else None,
+        "payout": payout,
+        "board": [CARD_STRINGS[c] for c in board],
+        "hero_hand": [CARD_STRINGS[c] for c in hero],
+        "bot_hand": [CARD_STRINGS[c] for c in bot],
+        "hero_stack": hero_end,
+        "bot_stack": bot_end,
+        "hand_seed": hand_seed,
+        "deck_fingerprint": fingerprint,
+        "hero_start_stack": hero_start,
+        "bot_start_stack": bot_start,
+        "actions": " ".join(tokens),
+    }
+
+
+def decode_many(blobs: Iterable[Optional[bytes]], with_reason: bool = False) -> Iterator[Dict[str, Any]]:
+    """Decode a batch of stored records, skipping rows written before the format existed."""
+    for blob in blobs:
+        if blob:
+            yield decode_hand(blob, with_reason)
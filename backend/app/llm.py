@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from typing import Any, Dict, Optional
 
@@ -6,13 +7,17 @@ try:
 except Exception:  # pragma: no cover - client may be absent in dev
     AsyncOpenAI = None  # type: ignore
 
+from .coaching_cache import CoachingCache, coaching_cache, spot, spot_key
 from .config import settings
 
 logger = logging.getLogger(__name__)
 
 
 class CoachingService:
-    def __init__(self) -> None:
+    def __init__(self, cache: Optional[CoachingCache] = None) -> None:
+        self.cache = cache
+        # Spot key -> in-flight request, so identical spots coached at once share one API call.
+        self._pending: Dict[str, "asyncio.Future[Optional[Dict[str, Any]]]"] = {}
         self.enabled = bool(settings.openai_api_key) and AsyncOpenAI is not None
         self.client = AsyncOpenAI(api_key=settings.openai_api_key) if self.enabled else None
         if not self.enabled:
@@ -28,7 +33,39 @@ class CoachingService:
                 },
             }
 
-        prompt = self._build_prompt(state, facts, action)
+        decision = spot(state, facts, action)
+        if self.cache is None:
+            coaching = await self._request(decision)
+        else:
+            key = spot_key(decision)
+            coaching = self.cache.get(key)
+            if coaching is None:
+                pending = self._pending.get(key)
+                if pending is not None:
+                    coaching = await asyncio.shield(pending)
+                else:
+                    future = self._pending[key] = asyncio.get_running_loop().create_future()
+                    try:
+                        coaching = await self._request(decision)
+                    finally:
+                        del self._pending[key]
+                        if not future.done():
+                            future.set_result(coaching)
+                    if coaching is not None:
+                        self.cache.put(key, coaching)
+        if coaching is None:
+            return {
+                "type": "coaching_update",
+                "coaching": {
+                    "assessment": "Coaching unavailable right now.",
+                    "advice": "Check network access and API key; try again later.",
+                },
+            }
+        return {"type": "coaching_update", "coaching": coaching}
+
+    async def _request(self, decision: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """One completion for the canonical decision; None if the API call fails (failures are not cached)."""
+        prompt = self._build_prompt(decision)
         try:
             resp = await self.client.chat.completions.create(
                 model=settings.openai_model,
@@ -43,27 +80,23 @@ class CoachingService:
             coaching.pop("risk", None)
             coaching.pop("confidence", None)
             coaching.pop("token_usage", None)
-            return {"type": "coaching_update", "coaching": coaching}
+            return coaching
         except Exception as exc:
             logger.warning("LLM coaching failed: %s", exc)
-            return {
-                "type": "coaching_update",
-                "coaching": {
-                    "assessment": "Coaching unavailable right now.",
-                    "advice": "Check network access and API key; try again later.",
-                },
-            }
+            return None
 
-    def _build_prompt(self, state: Dict[str, Any], facts: Dict[str, Any], action: Dict[str, Any]) -> list:
+    def _build_prompt(self, decision: Dict[str, str]) -> list:
+        # Only the canonical spot goes to the model: the answer is cached for every decision with the same key.
         system = (
             "You are a GTO poker coach. Evaluate my last decision with ONLY the information available at that moment. "
-            "Do NOT speculate about future streets or unseen cards. Return JSON with keys: "
+            "Do NOT speculate about future streets or unseen cards. "
+            "The spot is abstracted: spr and bet sizes are ranges (sizes as fractions of the pot), preflop_line lists "
+            "calls (c) and raises (r) by hero (H) and villains (V), and equity_margin is my equity against a random hand "
+            "minus the equity needed to call. Return JSON with keys: "
             "assessment (short), advice (actionable). Do NOT include suggested_next_action."
         )
         user = {
-            "state": state,
-            "facts": facts.get("facts") if isinstance(facts, dict) else facts,
-            "action": action,
+            "spot": decision,
             "instructions": "Return JSON with assessment and advice only. Avoid future info.",
         }
         return [
@@ -82,4 +115,4 @@ class CoachingService:
             return {"assessment": content[:200], "advice": content[:200]}
 
 
-coaching_service = CoachingService()
+coaching_service = CoachingService(coaching_cache)
@@ -1,6 +1,8 @@
-from datetime import timedelta
+import asyncio
+import secrets
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional, Set, Union
 
 import httpx
 from fastapi import (
@@ -15,18 +17,29 @@ from fastapi import (
     status,
 )
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse, RedirectResponse
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
+from .cfr import cfr_policy
 from .config import settings
-from .db import get_engine, get_session_factory, init_models
-from .facts import build_fact_block
+from .db import get_engine, get_session_factory, get_writer_engine, init_models
+from .export import FORMATS, render, stream_export
+from .facts import build_fact_block, is_decision
 from .models import ClientAction, parse_client_message
+from .opponent import exploit_policy, opponent_model
+from .coaching_cache import coaching_cache
 from .llm import coaching_service
+from .orm import DailyRollup, SessionRollup, UserRollup
+from .registry import TableRegistry
+from .review import ReviewError, hand_timeline, list_session_hands, list_sessions
+from .rollups import summarize
+from .search import SearchBot
 from .security import issue_ws_token, session_signer, verify_ws_token
-from .storage import DbStore, MemoryStore, StoreWrapper
-from .table import TableManager
+from .storage import DbStore, MemoryStore, StoreWrapper, WriteBehindQueue
+from .ring import RingTable
+from .table import DEFAULT_TABLE_ID, Policy, TableManager, rule_based_policy
+from .texture import warm_flops
 
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -211,17 +224,203 @@ async def ws_token(session: SessionData = Depends(require_session)) -> dict:
 
 
 engine = get_engine()
-store = StoreWrapper(db_store=DbStore(get_session_factory(engine)) if engine else None, memory_store=MemoryStore())
+session_factory = get_session_factory(engine) if engine else None
+writer_engine = get_writer_engine(engine) if engine else None
+db_store: Optional[DbStore] = None
+if engine:
+    write_session_factory = get_session_factory(writer_engine)
+    writer = WriteBehindQueue(
+        write_session_factory,
+        batch_rows=settings.db_batch_rows,
+        flush_ms=settings.db_flush_ms,
+        max_rows=settings.db_queue_max_rows,
+        retries=settings.db_write_retries,
+    )
+    db_store = DbStore(write_session_factory, writer)
+store = StoreWrapper(
+    db_store=db_store,
+    memory_store=MemoryStore(
+        caps={
+            "hands": settings.memory_hands_per_user,
+            "actions": settings.memory_actions_per_user,
+            "facts": settings.memory_facts_per_user,
+        },
+        max_users=settings.memory_max_users,
+        spill_dir=Path(settings.memory_spill_dir) if settings.memory_spill_dir else None,
+    ),
+    opponent_model=opponent_model,
+)
+search_bot = SearchBot(budget_ms=settings.bot_search_budget_ms)
+
+
+def bot_policy() -> Policy:
+    if settings.bot_mode == "search":
+        return exploit_policy(search_bot, opponent_model)
+    if settings.bot_mode == "rule":
+        return rule_based_policy
+    return exploit_policy(cfr_policy, opponent_model)
+
+
+registry = TableRegistry(
+    store=store,
+    bot_policy=bot_policy,
+    idle_seconds=settings.table_idle_seconds,
+    spill_dir=Path(settings.table_spill_dir) if settings.table_spill_dir else None,
+)
+
+
+async def sweep_tables() -> None:
+    while True:
+        await asyncio.sleep(min(60.0, settings.table_idle_seconds))
+        registry.sweep()
+
+
+async def checkpoint_opponents() -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(settings.opponent_checkpoint_seconds)
+        await loop.run_in_executor(None, opponent_model.checkpoint)
+
+
+async def checkpoint_coaching() -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(settings.coaching_cache_checkpoint_seconds)
+        await loop.run_in_executor(None, coaching_cache.checkpoint)
+
+
+@app.get("/stats/coaching")
+async def coaching_stats() -> dict:
+    return {"enabled": coaching_service.enabled, "cache": coaching_cache.stats()}
+
+
+@app.get("/stats/bot-search")
+async def bot_search_stats() -> dict:
+    return {"bot_mode": settings.bot_mode, **search_bot.stats()}
+
+
+@app.get("/history/export")
+async def export_history(fmt: str = Query("text", alias="format"), session: SessionData = Depends(require_session)) -> Response:
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"format must be one of {', '.join(FORMATS)}")
+    filename = f"hands-{session.user_id}.{'txt' if fmt == 'text' else 'ndjson'}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if session_factory is None:
+        # Memory-only deployments can export what is still resident.
+        hands = [{"id": i + 1, **hand} for i, hand in enumerate(store.memory_store.recent("hands", session.user_id))]
+        return Response(render(hands, fmt), media_type=FORMATS[fmt], headers=headers)
+    chunks = stream_export(session_factory, session.user_id, fmt, settings.export_batch_size)
+    return StreamingResponse(chunks, media_type=FORMATS[fmt], headers=headers)
+
+
+@app.get("/stats/me")
+async def my_stats(
+    day: Optional[date] = None, session_id: Optional[int] = None, session: SessionData = Depends(require_session)
+) -> dict:
+    """Results from the rollup tables: lifetime, one day (default today) and optionally one session."""
+    if session_factory is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="No database configured")
+    day = day or datetime.utcnow().date()
+    async with session_factory() as db:
+        lifetime = await db.get(UserRollup, session.user_id)
+        daily = await db.get(DailyRollup, (session.user_id, day))
+        by_session = await db.get(SessionRollup, session_id) if session_id is not None else None
+    out = {"user_id": session.user_id, "lifetime": summarize(lifetime), "day": {"date": day.isoformat(), **summarize(daily)}}
+    if session_id is not None:
+        out["session"] = summarize(by_session if by_session is not None and by_session.user_id == session.user_id else None)
+    return out
+
+
+def _require_db() -> None:
+    if session_factory is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="No database configured")
+
+
+@app.get("/review/sessions")
+async def review_sessions(
+    limit: int = Query(20, ge=1, le=100), cursor: Optional[str] = None, session: SessionData = Depends(require_session)
+) -> dict:
+    _require_db()
+    try:
+        return await list_sessions(session_factory, session.user_id, limit, cursor)
+    except ReviewError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+
+@app.get("/review/sessions/{session_id}/hands")
+async def review_session_hands(
+    session_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    after: int = Query(0, ge=0),
+    session: SessionData = Depends(require_session),
+) -> dict:
+    _require_db()
+    page = await list_session_hands(session_factory, session.user_id, session_id, limit, after)
+    if page is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
+    return page
+
+
+@app.get("/review/hands/{hand_id}")
+async def review_hand(hand_id: int, session: SessionData = Depends(require_session)) -> dict:
+    _require_db()
+    hand = await hand_timeline(session_factory, session.user_id, hand_id)
+    if hand is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Hand not found")
+    return hand
+
+
+@app.get("/stats/store")
+async def store_stats() -> dict:
+    return store.stats()
+
+
+@app.get("/stats/tables")
+async def table_stats() -> dict:
+    return registry.stats()
 
 
 @app.on_event("startup")
 async def startup_event() -> None:
-    if engine:
-        await init_models(engine)
+    if writer_engine:
+        await init_models(writer_engine)
+    store.start()
+    # Fill the flop texture cache off the event loop.
+    loop = asyncio.get_running_loop()
+    loop.run_in_executor(None, warm_flops)
+    loop.create_task(sweep_tables())
+    if opponent_model.path is not None:
+        await loop.run_in_executor(None, opponent_model.load)
+        loop.create_task(checkpoint_opponents())
+    if coaching_cache.path is not None:
+        await loop.run_in_executor(None, coaching_cache.load)
+        loop.create_task(checkpoint_coaching())
+
+
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    loop = asyncio.get_running_loop()
+    try:
+        await store.drain()
+        if writer_engine is not None:
+            await writer_engine.dispose()
+            await engine.dispose()
+    finally:
+        # In-memory state survives the restart even if the database teardown fails.
+        await loop.run_in_executor(None, opponent_model.checkpoint)
+        await loop.run_in_executor(None, coaching_cache.checkpoint)
+        if registry.spill_dir is not None:
+            registry.hibernate_all()
 
 
 @app.websocket("/ws/table")
 async def table_socket(websocket: WebSocket, token: str = Query(...)) -> None:
+    """
+    One authenticated socket drives any number of tables (up to `max_tables_per_connection`).
+    Client messages may carry a `table_id` (default "main"); every event sent back is tagged
+    with the table it belongs to. Tables live in the process registry, so on connect every
+    table the user still has is resumed mid-hand (or "main" is opened for a new user).
+    """
     claims = verify_ws_token(token)
     if not claims or claims.get("scope") != "ws":
         await websocket.close(code=4401)
@@ -232,60 +431,129 @@ async def table_socket(websocket: WebSocket, token: str = Query(...)) -> None:
         return
 
     await websocket.accept()
-    table = TableManager(seed=hash(user_id), store=store, hero_id=user_id)
-    store.log_session(user_id)
-    initial_state = table.snapshot()
-    await websocket.send_json({"type": "session_joined", "state": initial_state})
-    fact_payload = build_fact_block(initial_state)
-    store.log_fact({"user_id": user_id, **fact_payload})
-    await websocket.send_json(fact_payload)
-
+    session_id = await store.start_session(user_id)
+    tables: Dict[str, Union[TableManager, RingTable]] = {}
+    # Other connections of this user may share a table; hold its lock while changing it.
+    table_locks: Dict[str, asyncio.Lock] = {}
+    send_lock = asyncio.Lock()
+    coaching_tasks: Set[asyncio.Task] = set()
+
+    async def send(table_id: Optional[str], payload: dict) -> None:
+        async with send_lock:
+            await websocket.send_json({**payload, "table_id": table_id} if table_id else payload)
+
+    async def facts_for(state: dict) -> dict:
+        # Only decision states get the Monte Carlo equity, and it runs off the event loop;
+        # its per-class cache makes the decision-time recomputation a lookup.
+        profile = opponent_model.profile(user_id)
+        if is_decision(state):
+            return await asyncio.get_running_loop().run_in_executor(None, build_fact_block, state, profile)
+        return build_fact_block(state, profile, with_equity=False)
+
+    async def send_facts(table_id: str, state: dict) -> dict:
+        fact_payload = await facts_for(state)
+        store.log_fact({"user_id": user_id, "table_id": table_id, **fact_payload})
+        await send(table_id, fact_payload)
+        return fact_payload
+
+    async def open_table(table_id: str, seats: Optional[int] = None) -> None:
+        table = tables.get(table_id)
+        if table is None:
+            if len(tables) >= settings.max_tables_per_connection:
+                await send(table_id, {"type": "error", "message": f"At most {settings.max_tables_per_connection} tables per connection."})
+                return
+
+            def create() -> Union[TableManager, RingTable]:
+                seed = secrets.randbits(63)
+                if seats and seats > 2:
+                    # Multiway tables use the rule-based seat bots; the CFR/search bots are heads-up only.
+                    return RingTable(seats=seats, seed=seed, store=store, hero_id=user_id, table_id=table_id)
+                return TableManager(seed=seed, store=store, hero_id=user_id, bot_policy=bot_policy(), table_id=table_id)
+
+            table = tables[table_id] = registry.acquire(user_id, table_id, create)
+            table_locks[table_id] = registry.lock(user_id, table_id)
+            table.session_id = session_id
+        state = table.snapshot()
+        await send(table_id, {"type": "session_joined", "state": state})
+        await send_facts(table_id, state)
+
+    async def coach(table_id: str, state: dict, facts: dict, action: dict) -> None:
+        coaching = await coaching_service.get_coaching(state, facts, action)
+        await send(table_id, coaching)
+
+    for resumed_id in registry.table_ids(user_id)[: settings.max_tables_per_connection] or [DEFAULT_TABLE_ID]:
+        await open_table(resumed_id)
     try:
         while True:
             raw = await websocket.receive_text()
             msg = parse_client_message(raw)
             if not msg:
-                await websocket.send_json({"type": "error", "message": "Invalid message"})
+                await send(None, {"type": "error", "message": "Invalid message"})
                 continue
 
             action = msg.action
             amount = msg.amount
+            table_id = msg.table_id or DEFAULT_TABLE_ID
 
             if action == "ping":
-                await websocket.send_json({"type": "pong"})
+                await send(None, {"type": "pong"})
+                continue
+            if action == "open_table":
+                await open_table(table_id, msg.seats)
+                continue
+            table = tables.get(table_id)
+            if table is None:
+                await send(table_id, {"type": "error", "message": "Unknown table; send open_table first."})
+                continue
+            if action == "close_table":
+                del tables[table_id]
+                async with table_locks.pop(table_id):
+                    registry.drop(user_id, table_id)
+                await send(table_id, {"type": "table_closed"})
                 continue
             if action == "next_hand":
-                next_state = table.next_hand()
-                await websocket.send_json(next_state)
-                fact_payload = build_fact_block(next_state["state"])
-                store.log_fact({"user_id": user_id, **fact_payload})
-                await websocket.send_json(fact_payload)
+                async with table_locks[table_id]:
+                    next_state = table.next_hand()
+                summary = next_state.pop("summary", None)
+                await send(table_id, next_state)
+                await send_facts(table_id, next_state["state"])
+                if summary is not None:
+                    # A ring hand can end before the hero acts (folded round to the big blind).
+                    await send(table_id, {**summary, "can_start_next_hand": True})
                 continue
 
-            decision_state = table.snapshot()
-            decision_facts = build_fact_block(decision_state)
-            coaching_state = decision_state
-            coaching_facts = decision_facts
+            async with table_locks[table_id]:
+                decision_state = table.snapshot()
+                decision_facts = await facts_for(decision_state)
 
-            events = table.player_action(action=action, amount=amount)
+                if settings.bot_mode == "search":
+                    # The search holds the CPU for up to its budget; keep it off the event loop.
+                    events = await asyncio.get_running_loop().run_in_executor(None, table.player_action, action, amount)
+                else:
+                    events = table.player_action(action=action, amount=amount)
             has_error = False
             for event in events:
-                await websocket.send_json(event)
+                await send(table_id, event)
                 if event.get("type") == "state_update":
-                    latest_state = event["state"]
-                    fact_payload = build_fact_block(latest_state)
-                    store.log_fact({"user_id": user_id, **fact_payload})
-                    await websocket.send_json(fact_payload)
+                    await send_facts(table_id, event["state"])
                 if event.get("type") == "hand_summary":
                     # Auto-start next hand after summary.
-                    await websocket.send_json({**event, "can_start_next_hand": True})
+                    await send(table_id, {**event, "can_start_next_hand": True})
                 if event.get("type") == "error":
                     has_error = True
-            if coaching_state and not has_error:
-                coaching = await coaching_service.get_coaching(coaching_state, coaching_facts, {"action": action, "amount": amount})
-                await websocket.send_json(coaching)
+            if not has_error:
+                # Coaching can wait on the LLM; run it alongside so other tables stay responsive.
+                task = asyncio.create_task(coach(table_id, decision_state, decision_facts, {"action": action, "amount": amount}))
+                coaching_tasks.add(task)
+                task.add_done_callback(coaching_tasks.discard)
     except WebSocketDisconnect:
         return
+    finally:
+        for task in coaching_tasks:
+            task.cancel()
+        for table_id in tables:
+            registry.release(user_id, table_id)
+        store.end_session(session_id)
 
 
 if __name__ == "__main__":
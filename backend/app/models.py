@@ -1,15 +1,19 @@
+import re
 from typing import Optional
 
 from pydantic import BaseModel, validator
 
 
-ALLOWED_ACTIONS = {"fold", "call", "check", "bet", "raise", "next_hand", "ping"}
+ALLOWED_ACTIONS = {"fold", "call", "check", "bet", "raise", "next_hand", "ping", "open_table", "close_table"}
+TABLE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
 
 
 class ClientAction(BaseModel):
     action: str
     amount: Optional[int] = None
     ts: Optional[str] = None
+    table_id: Optional[str] = None
+    seats: Optional[int] = None  # open_table only: 3-9 opens a ring table, default heads-up
 
     @validator("action")
     def validate_action(cls, v: str) -> str:
@@ -27,6 +31,18 @@ class ClientAction(BaseModel):
             raise ValueError("amount must be non-negative")
         return v
 
+    @validator("table_id")
+    def validate_table_id(cls, v: Optional[str]) -> Optional[str]:
+        if v is not None and not TABLE_ID_PATTERN.match(v):
+            raise ValueError("table_id must be 1-32 letters, digits, '_' or '-'")
+        return v
+
+    @validator("seats")
+    def validate_seats(cls, v: Optional[int]) -> Optional[int]:
+        if v is not None and not 2 <= v <= 9:
+            raise ValueError("seats must be between 2 and 9")
+        return v
+
 
 def parse_client_message(raw: str) -> Optional[ClientAction]:
     try:
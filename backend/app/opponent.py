@@ -0,0 +1,221 @@
+"""
+Per-user opponent model built from the action log stream.
+
+`StoreWrapper.log_action` feeds every logged action to `OpponentModel.observe`, which
+bumps a handful of integer counters for the human at that table: O(1) per action, no
+re-scans of the actions table. Users live in an LRU-bounded map; the least recently
+seen are dropped past `max_users`. The map is checkpointed to JSON on a timer and
+reloaded at startup.
+"""
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import settings
+from .table import DEFAULT_TABLE_ID, Policy, TableManager
+
+
+log = logging.getLogger(__name__)
+
+STREET_INDEX = {"preflop": 0, "flop": 1, "turn": 2, "river": 3}
+STREET_NAMES = tuple(STREET_INDEX)
+MIN_HANDS = 20  # below this the profile is too noisy to quote or exploit
+MIN_CBETS = 10
+MAX_TABLES = 16  # per-hand flags kept per user; the oldest table is dropped beyond this
+EXPLOIT_FOLD_TO_CBET = 0.6
+
+
+class HandFlags:
+    """Per-hand state for one of the user's tables."""
+
+    __slots__ = ("hand_id", "vpip", "pfr", "bot_aggressor", "flop_bet", "facing_cbet")
+
+    def __init__(self, hand_id: Optional[int]) -> None:
+        self.hand_id = hand_id
+        self.vpip = self.pfr = False
+        self.bot_aggressor = False  # bot made the last preflop raise
+        self.flop_bet = False
+        self.facing_cbet = False
+
+
+class PlayerStats:
+    __slots__ = (
+        "hands",
+        "vpip",
+        "pfr",
+        "cbet_faced",
+        "cbet_folded",
+        "aggressive",
+        "passive",
+        "folds",
+        "tables",
+    )
+
+    COUNTERS = ("hands", "vpip", "pfr", "cbet_faced", "cbet_folded", "aggressive", "passive", "folds")
+
+    def __init__(self) -> None:
+        self.hands = self.vpip = self.pfr = self.cbet_faced = self.cbet_folded = 0
+        self.aggressive = [0, 0, 0, 0]  # bets + raises per street
+        self.passive = [0, 0, 0, 0]  # checks + calls per street
+        self.folds = [0, 0, 0, 0]
+        self.tables: Dict[str, HandFlags] = {}  # table_id -> current hand (a user may multi-table)
+
+    def observe(self, table_id: str, hand_id: Optional[int], street: int, token: str) -> None:
+        hand = self.tables.get(table_id)
+        if hand is None or hand.hand_id != hand_id:
+            hand = self.tables[table_id] = HandFlags(hand_id)
+            self.hands += 1
+            if len(self.tables) > MAX_TABLES:
+                del self.tables[next(iter(self.tables))]
+        hero, code = token[0] == "h", token[1]
+        raised = code in "br"
+        if not hero:
+            if street == 0:
+                hand.bot_aggressor = raised
+            elif street == 1 and raised:
+                hand.facing_cbet = hand.bot_aggressor and not hand.flop_bet
+                hand.flop_bet = True
+            return
+
+        if raised:
+            self.aggressive[street] += 1
+        elif code == "f":
+            self.folds[street] += 1
+        else:
+            self.passive[street] += 1
+        if street == 0:
+            if code != "f" and not hand.vpip:
+                self.vpip += 1
+                hand.vpip = True
+            if raised:
+                hand.bot_aggressor = False
+                if not hand.pfr:
+                    self.pfr += 1
+                    hand.pfr = True
+        elif street == 1 and raised:
+            hand.flop_bet = True
+        if hand.facing_cbet:
+            hand.facing_cbet = False
+            self.cbet_faced += 1
+            self.cbet_folded += code == "f"
+
+    def profile(self) -> Dict[str, Any]:
+        def rate(num: int, den: int) -> Optional[float]:
+            return round(num / den, 3) if den else None
+
+        aggression = {}
+        for i, name in enumerate(STREET_NAMES):
+            total = self.aggressive[i] + self.passive[i] + self.folds[i]
+            aggression[name] = rate(self.aggressive[i], total)
+        return {
+            "hands": self.hands,
+            "vpip": rate(self.vpip, self.hands),
+            "pfr": rate(self.pfr, self.hands),
+            "fold_to_cbet": rate(self.cbet_folded, self.cbet_faced),
+            "cbets_faced": self.cbet_faced,
+            "aggression_frequency": aggression,
+        }
+
+    def counters(self) -> List[Any]:
+        return [getattr(self, name) for name in self.COUNTERS]
+
+    @classmethod
+    def from_counters(cls, values: List[Any]) -> "PlayerStats":
+        stats = cls()
+        for name, value in zip(cls.COUNTERS, values):
+            setattr(stats, name, list(value) if isinstance(value, list) else value)
+        return stats
+
+
+class OpponentModel:
+    def __init__(self, max_users: int = 10_000, path: Optional[Path] = None) -> None:
+        self.max_users = max_users
+        self.path = path
+        self._users: "OrderedDict[str, PlayerStats]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def observe(self, payload: Dict[str, Any]) -> None:
+        """Fold one `log_action` payload into the counters of the table's human player."""
+        token, user_id = payload.get("token"), payload.get("hero_id")
+        street = STREET_INDEX.get(payload.get("street") or "")
+        if not token or not user_id or street is None:
+            return
+        with self._lock:
+            stats = self._users.get(user_id)
+            if stats is None:
+                stats = self._users[user_id] = PlayerStats()
+                if len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+            else:
+                self._users.move_to_end(user_id)
+            stats.observe(payload.get("table_id") or DEFAULT_TABLE_ID, payload.get("hand_id"), street, token)
+
+    def get(self, user_id: str) -> Optional[PlayerStats]:
+        return self._users.get(user_id)
+
+    def profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        stats = self._users.get(user_id)
+        return stats.profile() if stats is not None else None
+
+    def checkpoint(self, path: Optional[Path] = None) -> int:
+        """Write every resident user's counters as JSON (atomically via a temp file)."""
+        path = path or self.path
+        if path is None:
+            return 0
+        with self._lock:
+            data = {user_id: stats.counters() for user_id, stats in self._users.items()}
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "w") as fh:
+            json.dump({"counters": list(PlayerStats.COUNTERS), "users": data}, fh, separators=(",", ":"))
+        os.replace(tmp, path)
+        return len(data)
+
+    def load(self, path: Optional[Path] = None) -> int:
+        path = path or self.path
+        if path is None or not path.exists():
+            return 0
+        try:
+            with open(path) as fh:
+                data = json.load(fh)
+        except (OSError, ValueError) as exc:
+            log.warning("Could not load opponent model checkpoint %s: %s", path, exc)
+            return 0
+        if data.get("counters") != list(PlayerStats.COUNTERS):
+            log.warning("Ignoring opponent model checkpoint %s with a different layout", path)
+            return 0
+        with self._lock:
+            for user_id, values in list(data.get("users", {}).items())[-self.max_users :]:
+                self._users[user_id] = PlayerStats.from_counters(values)
+        return len(self._users)
+
+
+def exploit_policy(base: Policy, model: OpponentModel) -> Policy:
+    """Wrap `base` so the bot continuation-bets every flop against users who over-fold to c-bets."""
+
+    def policy(table: TableManager, actor: str) -> Tuple[str, Optional[int]]:
+        action, amount = base(table, actor)
+        if actor != "bot" or table.street != "flop" or action not in ("check", "call") or table.current_bet > table.bot_bet:
+            return action, amount
+        stats = model.get(table.hero_id)
+        hand = stats.tables.get(table.table_id) if stats is not None else None
+        if stats is None or hand is None or hand.hand_id != table.hand_id or not hand.bot_aggressor or hand.flop_bet:
+            return action, amount
+        if stats.hands >= MIN_HANDS and stats.cbet_faced >= MIN_CBETS and stats.cbet_folded >= EXPLOIT_FOLD_TO_CBET * stats.cbet_faced:
+            return "bet", max(table.big_blind, table.pot // 2)
+        return action, amount
+
+    return policy
+
+
+opponent_model = OpponentModel(
+    max_users=settings.opponent_model_max_users,
+    path=Path(settings.opponent_model_path) if settings.opponent_model_path else None,
+)
@@ -1,7 +1,7 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
-from sqlalchemy import Column, DateTime, Float, Integer, JSON, String, Text
+from sqlalchemy import BigInteger, Column, Date, DateTime, Float, Index, Integer, JSON, LargeBinary, String, Text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -20,20 +20,28 @@ class User(Base):
 
 class Session(Base):
     __tablename__ = "sessions"
+    # Review: a user's sessions newest first, keyset on (started_at, id).
+    __table_args__ = (Index("ix_sessions_user_id_started_at", "user_id", "started_at", "id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    user_id: Mapped[str] = mapped_column(String, index=True)
+    user_id: Mapped[str] = mapped_column(String)
     started_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     ended_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
 
 class Hand(Base):
     __tablename__ = "hands"
+    __table_args__ = (
+        Index("ix_hands_user_id_id", "user_id", "id"),  # export keyset
+        Index("ix_hands_user_id_created_at", "user_id", "created_at"),
+        Index("ix_hands_session_id_id", "session_id", "id"),  # review: hands in a session
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    session_id: Mapped[Optional[int]] = mapped_column(Integer, index=True, nullable=True)
-    user_id: Mapped[str] = mapped_column(String, index=True)
+    session_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    user_id: Mapped[str] = mapped_column(String)
     hand_number: Mapped[int] = mapped_column(Integer, default=0)
+    table_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     board: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     hero_hand: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     bot_hand: Mapped[Optional[str]] = mapped_column(String, nullable=True)
@@ -41,19 +49,29 @@ class Hand(Base):
     reason: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     hero_stack: Mapped[int] = mapped_column(Integer, default=0)
     bot_stack: Mapped[int] = mapped_column(Integer, default=0)
+    # Random per hand, so it doubles as the unique key that actions join on.
+    hand_seed: Mapped[Optional[int]] = mapped_column(BigInteger, index=True, nullable=True)
+    deck_fingerprint: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    hero_start_stack: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    bot_start_stack: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    actions: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    history: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True)  # handhistory.encode_hand
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
 
 class Action(Base):
     __tablename__ = "actions"
+    __table_args__ = (Index("ix_actions_hand_seed_action_index", "hand_seed", "action_index"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    hand_id: Mapped[Optional[int]] = mapped_column(Integer, index=True, nullable=True)
+    hand_id: Mapped[Optional[int]] = mapped_column(Integer, index=True, nullable=True)  # per-table hand counter
+    hand_seed: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)  # joins hands.hand_seed
     user_id: Mapped[str] = mapped_column(String, index=True)
     actor: Mapped[str] = mapped_column(String)
     action: Mapped[str] = mapped_column(String)
     amount: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     street: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    action_index: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     state: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
@@ -67,3 +85,38 @@ class Fact(Base):
     facts: Mapped[dict] = mapped_column(JSON)
     summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class RollupMixin:
+    """Counters summed per hand by `rollups.hand_deltas`; chip amounts are from the hero's side."""
+
+    hands: Mapped[int] = mapped_column(Integer, default=0)
+    hands_won: Mapped[int] = mapped_column(Integer, default=0)
+    net_chips: Mapped[int] = mapped_column(Integer, default=0)
+    showdown_chips: Mapped[int] = mapped_column(Integer, default=0)
+    non_showdown_chips: Mapped[int] = mapped_column(Integer, default=0)
+    showdowns: Mapped[int] = mapped_column(Integer, default=0)
+    saw_flop: Mapped[int] = mapped_column(Integer, default=0)
+    saw_turn: Mapped[int] = mapped_column(Integer, default=0)
+    saw_river: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class UserRollup(RollupMixin, Base):
+    __tablename__ = "user_rollups"
+
+    user_id: Mapped[str] = mapped_column(String, primary_key=True)
+
+
+class SessionRollup(RollupMixin, Base):
+    __tablename__ = "session_rollups"
+
+    session_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[str] = mapped_column(String, index=True)
+
+
+class DailyRollup(RollupMixin, Base):
+    __tablename__ = "daily_rollups"
+
+    user_id: Mapped[str] = mapped_column(String, primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
@@ -0,0 +1,245 @@
+"""
+Precomputed heads-up preflop equities.
+
+The table file holds the 169x169 hand-class matrix followed by the full 1326x1326
+combo matrix as little-endian uint16 (equity * 65534; 65535 where the hands share a
+card). It is memory-mapped on first use so uvicorn workers share the same pages.
+
+Build it offline with:
+
+    cd backend
+    python -m app.preflop build --boards 50000 --workers 4
+"""
+import argparse
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import permutations
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import settings
+from .eval import RANKS, cards_to_ints, evaluate_batch
+
+
+MAGIC = b"PFEQ0001"
+HEADER = struct.Struct("<8sII")
+NUM_CLASSES = 169
+NUM_COMBOS = 1326
+INVALID = 65535
+SCALE = 65534
+
+DEFAULT_PATH = Path(__file__).resolve().parent / "data" / "preflop_equity.bin"
+
+# Combo index of (a, b) for a < b in combinations(range(52), 2) order, mirrored for b < a.
+COMBO_INDEX = np.full((52, 52), -1, dtype=np.int64)
+COMBO_CARDS = np.zeros((NUM_COMBOS, 2), dtype=np.int64)
+_i = 0
+for _a in range(52):
+    for _b in range(_a + 1, 52):
+        COMBO_INDEX[_a, _b] = COMBO_INDEX[_b, _a] = _i
+        COMBO_CARDS[_i] = (_a, _b)
+        _i += 1
+
+
+def _class_of(a: int, b: int) -> int:
+    """13x13 grid index: pairs on the diagonal, suited as (hi, lo), offsuit as (lo, hi)."""
+    hi, lo = max(a >> 2, b >> 2), min(a >> 2, b >> 2)
+    if hi == lo or (a & 3) != (b & 3):
+        return lo * 13 + hi
+    return hi * 13 + lo
+
+
+COMBO_CLASS = np.array([_class_of(a, b) for a, b in COMBO_CARDS.tolist()], dtype=np.int64)
+
+
+def class_label(index: int) -> str:
+    row, col = divmod(index, 13)
+    if row == col:
+        return RANKS[row] * 2
+    if row > col:
+        return f"{RANKS[row]}{RANKS[col]}s"
+    return f"{RANKS[col]}{RANKS[row]}o"
+
+
+def class_index(label: str) -> Optional[int]:
+    label = label.strip()
+    if len(label) < 2 or label[0].upper() not in RANKS or label[1].upper() not in RANKS:
+        return None
+    hi, lo = sorted((RANKS.index(label[0].upper()), RANKS.index(label[1].upper())), reverse=True)
+    if hi == lo:
+        return hi * 13 + hi
+    kind = label[2:].lower()
+    if kind == "s":
+        return hi * 13 + lo
+    if kind == "o":
+        return lo * 13 + hi
+    return None
+
+
+def combo_index(cards: Sequence[str]) -> Optional[int]:
+    ints = cards_to_ints(cards)
+    if len(ints) != 2 or ints[0] == ints[1]:
+        return None
+    return int(COMBO_INDEX[ints[0], ints[1]])
+
+
+def _accumulate(boards: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Sum of sign(hero - villain) and number of live boards for every combo pair."""
+    rng = np.random.default_rng(seed)
+    score = np.zeros((NUM_COMBOS, NUM_COMBOS), dtype=np.int32)
+    count = np.zeros((NUM_COMBOS, NUM_COMBOS), dtype=np.int32)
+    for _ in range(boards):
+        board = rng.choice(52, 5, replace=False)
+        live = (~np.isin(COMBO_CARDS, board).any(axis=1)).astype(np.int8)
+        # Evaluate combos that collide with the board as some live combo; they are masked out below.
+        hole = np.where(live[:, None] > 0, COMBO_CARDS, COMBO_CARDS[np.argmax(live)])
+        values = evaluate_batch(np.hstack([hole, np.broadcast_to(board, (NUM_COMBOS, 5))]))
+        pair_live = live[:, None] * live[None, :]
+        score += np.sign(values[:, None] - values[None, :]).astype(np.int8) * pair_live
+        count += pair_live
+    return score, count
+
+
+def _suit_symmetrize(score: np.ndarray, count: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Pool every combo pair with its suit-permuted images to cut sampling noise."""
+    total_score = np.zeros(score.shape, dtype=np.int64)
+    total_count = np.zeros(count.shape, dtype=np.int64)
+    for perm in permutations(range(4)):
+        mapped = (COMBO_CARDS >> 2) * 4 + np.array(perm)[COMBO_CARDS & 3]
+        image = COMBO_INDEX[mapped[:, 0], mapped[:, 1]]
+        total_score += score[np.ix_(image, image)]
+        total_count += count[np.ix_(image, image)]
+    return total_score, total_count
+
+
+def build(path: Path, boards: int, workers: int, seed: int) -> None:
+    start = time.perf_counter()
+    shares = [boards // workers + (1 if i < boards % workers else 0) for i in range(workers)]
+    score = np.zeros((NUM_COMBOS, NUM_COMBOS), dtype=np.int64)
+    count = np.zeros((NUM_COMBOS, NUM_COMBOS), dtype=np.int64)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for part_score, part_count in pool.map(_accumulate, shares, [seed + i for i in range(workers)]):
+            score += part_score
+            count += part_count
+    score, count = _suit_symmetrize(score, count)
+
+    shared = (COMBO_CARDS[:, None, :, None] == COMBO_CARDS[None, :, None, :]).any(axis=(2, 3))
+    valid = (count > 0) & ~shared
+    combo_eq = np.where(valid, 0.5 + score / (2 * np.maximum(count, 1)), 0.0)
+
+    # Class equity weights every non-conflicting combo pair equally.
+    members = np.zeros((NUM_CLASSES, NUM_COMBOS))
+    members[COMBO_CLASS, np.arange(NUM_COMBOS)] = 1.0
+    pairs = members @ valid.astype(np.float64) @ members.T
+    class_eq = (members @ combo_eq @ members.T) / np.maximum(pairs, 1)
+
+    def encode(eq: np.ndarray, ok: np.ndarray) -> np.ndarray:
+        return np.where(ok, np.rint(eq * SCALE), INVALID).astype("<u2")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as fh:
+        fh.write(HEADER.pack(MAGIC, NUM_CLASSES, NUM_COMBOS))
+        fh.write(encode(class_eq, pairs > 0).tobytes())
+        fh.write(encode(combo_eq, valid).tobytes())
+    print(f"wrote {path} from {boards:,} boards in {time.perf_counter() - start:.1f}s")
+
+
+class PreflopTable:
+    """Lazily memory-mapped view over the preflop equity file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._classes: Optional[np.ndarray] = None
+        self._combos: Optional[np.ndarray] = None
+        self._vs_random: Optional[np.ndarray] = None
+
+    def _load(self) -> None:
+        with open(self.path, "rb") as fh:
+            magic, n_classes, n_combos = HEADER.unpack(fh.read(HEADER.size))
+        if magic != MAGIC or n_classes != NUM_CLASSES or n_combos != NUM_COMBOS:
+            raise ValueError(f"{self.path} is not a preflop equity table")
+        offset = HEADER.size
+        self._classes = np.memmap(self.path, dtype="<u2", mode="r", offset=offset, shape=(NUM_CLASSES, NUM_CLASSES))
+        offset += NUM_CLASSES * NUM_CLASSES * 2
+        self._combos = np.memmap(self.path, dtype="<u2", mode="r", offset=offset, shape=(NUM_COMBOS, NUM_COMBOS))
+
+    @property
+    def classes(self) -> np.ndarray:
+        if self._classes is None:
+            self._load()
+        return self._classes  # type: ignore[return-value]
+
+    @property
+    def combos(self) -> np.ndarray:
+        if self._combos is None:
+            self._load()
+        return self._combos  # type: ignore[return-value]
+
+    def class_equity(self, hero: int, villain: int) -> Optional[float]:
+        raw = int(self.classes[hero, villain])
+        return None if raw == INVALID else raw / SCALE
+
+    def combo_equity(self, hero: int, villain: int) -> Optional[float]:
+        raw = int(self.combos[hero, villain])
+        return None if raw == INVALID else raw / SCALE
+
+    def range_equity(self, hero: int, villains: np.ndarray, weights: np.ndarray) -> Optional[float]:
+        """Weighted equity of one combo against many; conflicting villain combos are dropped."""
+        raw = self.combos[hero, villains].astype(np.float64)
+        ok = (raw != INVALID) & (weights > 0)
+        total = float(weights[ok].sum())
+        if total <= 0:
+            return None
+        return float((raw[ok] * weights[ok]).sum() / SCALE / total)
+
+    def vs_random(self, hero: int) -> float:
+        if self._vs_random is None:
+            raw = np.asarray(self.combos, dtype=np.float64)
+            ok = raw != INVALID
+            self._vs_random = (raw * ok).sum(axis=1) / ok.sum(axis=1) / SCALE
+        return float(self._vs_random[hero])
+
+
+_table: List[Optional[PreflopTable]] = []
+
+
+def get_table() -> Optional[PreflopTable]:
+    """The shared table, or None if no file has been built."""
+    if not _table:
+        path = Path(settings.preflop_table_path) if settings.preflop_table_path else DEFAULT_PATH
+        _table.append(PreflopTable(path) if path.exists() else None)
+    return _table[0]
+
+
+def preflop_equity(hero: Sequence[str], villain: Sequence[str]) -> Optional[float]:
+    """Hero's all-in equity preflop: exact combos ('As', 'Kd') or hand classes ('AKs', 'QQ')."""
+    table = get_table()
+    if table is None:
+        return None
+    if len(hero) == 2 and len(villain) == 2:
+        h, v = combo_index(hero), combo_index(villain)
+        if h is not None and v is not None:
+            return table.combo_equity(h, v)
+    if len(hero) == 1 and len(villain) == 1:
+        h, v = class_index(hero[0]), class_index(villain[0])
+        if h is not None and v is not None:
+            return table.class_equity(h, v)
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the preflop equity table.")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--path", type=Path, default=DEFAULT_PATH)
+    parser.add_argument("--boards", type=int, default=50_000, help="random boards to sample")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    build(args.path, args.boards, args.workers, args.seed)
+
+
+if __name__ == "__main__":
+    main()
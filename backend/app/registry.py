@@ -0,0 +1,209 @@
+"""
+Process-wide table registry keyed by (user_id, table_id).
+
+Tables outlive websocket connections: a reconnect picks up the same table object, hand
+in progress included. A table is pinned while a connection uses it; once released and
+idle past `table_idle_seconds`, `sweep` hibernates it to a few hundred compressed bytes
+(`TableManager.hibernate`) kept in memory or, with `table_spill_dir` set, written to
+disk. Spilled tables are indexed again at startup, so they also survive restarts. The
+next `acquire` thaws it transparently.
+
+Several connections of one user may pin the same table (two browser tabs). Each live
+table carries an asyncio lock that callers hold while changing it, including calls
+they hand to executor threads, so two sockets never mutate one hand at once.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import pickle
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .ring import RingTable
+from .table import Policy, TableManager
+
+
+log = logging.getLogger(__name__)
+
+Key = Tuple[str, str]
+Table = Union[TableManager, RingTable]
+_KINDS = {"hu": TableManager, "ring": RingTable}
+
+
+class LiveTable:
+    __slots__ = ("table", "pins", "last_seen", "lock")
+
+    def __init__(self, table: Table) -> None:
+        self.table = table
+        self.pins = 0
+        self.last_seen = time.monotonic()
+        self.lock = asyncio.Lock()
+
+
+class TableRegistry:
+    def __init__(
+        self,
+        store: Optional[Any] = None,
+        bot_policy: Optional[Callable[[], Policy]] = None,
+        idle_seconds: float = 300.0,
+        spill_dir: Optional[Path] = None,
+    ) -> None:
+        self.store = store
+        self.bot_policy = bot_policy
+        self.idle_seconds = idle_seconds
+        self.spill_dir = spill_dir
+        self._live: "OrderedDict[Key, LiveTable]" = OrderedDict()  # least recently released first
+        self._frozen: Dict[Key, Tuple[str, bytes]] = {}
+        self._spilled: Dict[Key, Path] = {}
+        self._user_tables: Dict[str, List[str]] = {}
+        if spill_dir is not None:
+            self._index_spill_dir()
+
+    def __len__(self) -> int:
+        return len(self._live) + len(self._frozen) + len(self._spilled)
+
+    def _remember(self, key: Key) -> None:
+        ids = self._user_tables.setdefault(key[0], [])
+        if key[1] not in ids:
+            ids.append(key[1])
+
+    def _forget(self, key: Key) -> None:
+        ids = self._user_tables.get(key[0])
+        if ids and key[1] in ids:
+            ids.remove(key[1])
+            if not ids:
+                del self._user_tables[key[0]]
+
+    def _exists(self, key: Key) -> bool:
+        return key in self._live or key in self._frozen or key in self._spilled
+
+    def table_ids(self, user_id: str) -> List[str]:
+        """Every table the user still has (live or hibernated), in the order they were opened."""
+        ids = self._user_tables.get(user_id, [])
+        for table_id in [t for t in ids if not self._exists((user_id, t))]:
+            self._forget((user_id, table_id))
+        return list(self._user_tables.get(user_id, ()))
+
+    def get(self, user_id: str, table_id: str) -> Optional[Table]:
+        key = (user_id, table_id)
+        entry = self._live.get(key)
+        if entry is None:
+            table = self._thaw(key)
+            if table is None:
+                self._forget(key)  # never existed, or its spill file was unreadable
+                return None
+            entry = self._live[key] = LiveTable(table)
+        return entry.table
+
+    def acquire(self, user_id: str, table_id: str, factory: Optional[Callable[[], Table]] = None) -> Optional[Table]:
+        """Pin and return the table, thawing it or building it with `factory` when missing."""
+        key = (user_id, table_id)
+        table = self.get(user_id, table_id)
+        if table is None:
+            if factory is None:
+                return None
+            table = factory()
+            self._live[key] = LiveTable(table)
+            self._remember(key)
+        self._live[key].pins += 1
+        return table
+
+    def lock(self, user_id: str, table_id: str) -> asyncio.Lock:
+        """The lock serializing changes to a pinned table (pinned tables are never frozen, so it is stable)."""
+        return self._live[(user_id, table_id)].lock
+
+    def release(self, user_id: str, table_id: str) -> None:
+        entry = self._live.get((user_id, table_id))
+        if entry is not None:
+            entry.pins = max(0, entry.pins - 1)
+            entry.last_seen = time.monotonic()
+            self._live.move_to_end((user_id, table_id))
+
+    def drop(self, user_id: str, table_id: str) -> None:
+        key = (user_id, table_id)
+        self._live.pop(key, None)
+        self._frozen.pop(key, None)
+        path = self._spilled.pop(key, None)
+        if path is not None:
+            path.unlink(missing_ok=True)
+        self._forget(key)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Hibernate every unpinned table idle past the TTL; returns how many were evicted."""
+        now = time.monotonic() if now is None else now
+        cutoff = now - self.idle_seconds
+        idle = [key for key, entry in self._live.items() if entry.pins == 0 and entry.last_seen <= cutoff]
+        for key in idle:
+            self._freeze(key, self._live.pop(key).table)
+        return len(idle)
+
+    def hibernate_all(self) -> int:
+        """Freeze every table (pinned or not), e.g. at shutdown so spilled tables survive a restart."""
+        keys = list(self._live)
+        for key in keys:
+            self._freeze(key, self._live.pop(key).table)
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "live": len(self._live),
+            "pinned": sum(1 for entry in self._live.values() if entry.pins),
+            "hibernated": len(self._frozen),
+            "hibernated_bytes": sum(len(data) for _, data in self._frozen.values()),
+            "spilled": len(self._spilled),
+            "users": len(self._user_tables),
+        }
+
+    def _freeze(self, key: Key, table: Table) -> None:
+        kind = "ring" if isinstance(table, RingTable) else "hu"
+        data = table.hibernate()
+        if self.spill_dir is None:
+            self._frozen[key] = (kind, data)
+            return
+        path = self.spill_dir / (hashlib.sha1("\0".join(key).encode()).hexdigest() + ".tbl")
+        tmp = path.with_suffix(".tmp")
+        try:
+            with open(tmp, "wb") as fh:
+                pickle.dump((key, kind, data), fh, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except OSError as exc:
+            log.warning("Could not spill table %s to %s: %s", key, path, exc)
+            self._frozen[key] = (kind, data)
+            return
+        self._spilled[key] = path
+
+    def _thaw(self, key: Key) -> Optional[Table]:
+        frozen = self._frozen.pop(key, None)
+        if frozen is None:
+            path = self._spilled.pop(key, None)
+            if path is None:
+                return None
+            try:
+                with open(path, "rb") as fh:
+                    _, *frozen = pickle.load(fh)
+            except (OSError, pickle.UnpicklingError, ValueError) as exc:
+                log.warning("Could not read spilled table %s: %s", path, exc)
+                return None
+            finally:
+                path.unlink(missing_ok=True)
+        kind, data = frozen
+        if kind == "ring":
+            return RingTable.resume(data, store=self.store)
+        return TableManager.resume(data, store=self.store, bot_policy=self.bot_policy() if self.bot_policy else None)
+
+    def _index_spill_dir(self) -> None:
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        for path in sorted(self.spill_dir.glob("*.tbl"), key=lambda p: p.stat().st_mtime):
+            try:
+                with open(path, "rb") as fh:
+                    key, kind, _ = pickle.load(fh)
+            except (OSError, pickle.UnpicklingError, ValueError) as exc:
+                log.warning("Skipping unreadable spilled table %s: %s", path, exc)
+                continue
+            if kind in _KINDS:
+                key = tuple(key)
+                self._spilled[key] = path
+                self._remember(key)
@@ -0,0 +1,90 @@
+"""
+Deterministic hand replay from a hand record (see `TableManager.hand_record`).
+
+A record holds the hand seed, the deck fingerprint, the starting stacks and the compact
+action log, which is enough to rebuild the table state after any number of actions.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .table import TableManager, decode_action
+
+
+class ReplayError(Exception):
+    pass
+
+
+class _Stop(Exception):
+    pass
+
+
+class HandReplay:
+    def __init__(self, record: Dict[str, Any]) -> None:
+        self.record = record
+        self.actions: List[Tuple[str, str, Optional[int]]] = [decode_action(t) for t in (record.get("actions") or "").split()]
+
+    def __len__(self) -> int:
+        return len(self.actions)
+
+    def table_at(self, index: int) -> TableManager:
+        """A fresh table holding the state after the first `index` actions of the hand."""
+        return self._run(index, None)
+
+    def streets(self) -> List[str]:
+        """The street each action was taken on, from a single pass over the hand."""
+        trace: List[str] = []
+        self._run(len(self.actions), lambda table: trace.append(table.street))
+        return trace
+
+    def states(self, hide_bot: bool = False) -> List[Dict[str, Any]]:
+        """`state_at(i)` for every i (before the first action, then after each one), from a single pass."""
+        states: List[Dict[str, Any]] = []
+        table = self._run(len(self.actions), lambda table: states.append(table.snapshot(hide_bot=hide_bot)))
+        states.append(table.snapshot(hide_bot=hide_bot))
+        return states
+
+    def _run(self, index: int, visit: Optional[Callable[[TableManager], None]]) -> TableManager:
+        """Replay the first `index` actions, calling `visit` with the table just before each one."""
+        if not 0 <= index <= len(self.actions):
+            raise IndexError(f"action index {index} out of range 0..{len(self.actions)}")
+        pos = 0
+
+        def scripted_bot(table: TableManager, actor: str) -> Tuple[str, Optional[int]]:
+            nonlocal pos
+            if pos >= index or self.actions[pos][0] != "bot":
+                raise _Stop()
+            _, action, amount = self.actions[pos]
+            pos += 1
+            if visit is not None:
+                visit(table)
+            return action, amount
+
+        table = TableManager(seed=0, bot_policy=scripted_bot)
+        table.hand_id = int(self.record["hand_id"]) - 1
+        table.hero_stack = int(self.record["hero_start_stack"])
+        table.bot_stack = int(self.record["bot_start_stack"])
+        table._init_hand(int(self.record["hand_seed"]))
+        fingerprint = self.record.get("deck_fingerprint")
+        if fingerprint and fingerprint != table.deck_fingerprint:
+            raise ReplayError("deck fingerprint mismatch; shuffle or deck order changed since the hand was recorded")
+
+        while pos < index:
+            actor, action, amount = self.actions[pos]
+            if actor != "hero":
+                raise ReplayError(f"unexpected bot action at index {pos}")
+            pos += 1
+            if visit is not None:
+                visit(table)
+            try:
+                events = table.player_action(action, amount)
+            except _Stop:
+                continue
+            if events and events[0].get("type") == "error":
+                raise ReplayError(f"action {pos - 1} rejected: {events[0].get('message')}")
+        return table
+
+    def state_at(self, index: int, hide_bot: bool = False) -> Dict[str, Any]:
+        return self.table_at(index).snapshot(hide_bot=hide_bot)
+
+    def final_state(self, hide_bot: bool = False) -> Dict[str, Any]:
+        return self.state_at(len(self.actions), hide_bot=hide_bot)
+
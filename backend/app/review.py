@@ -0,0 +1,208 @@
+"""
+Session review queries: a user's sessions, the hands played in one session, and the
+action timeline of one hand.
+
+Both lists page by keyset rather than OFFSET, so page 500 costs the same as page 1:
+sessions walk the `(user_id, started_at, id)` index newest first, hands walk
+`(session_id, id)`. The cursor handed back to the client is the last row's key.
+Timelines are rebuilt from the stored hand history with `HandReplay`; hands without
+one (ring hands, rows from before the format) fall back to the action log.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from .handhistory import FormatError, decode_hand
+from .orm import Action as ActionORM
+from .orm import Hand as HandORM
+from .orm import Session as SessionORM
+from .orm import SessionRollup
+from .replay import HandReplay, ReplayError
+from .rollups import BIG_BLIND
+from .table import ACTION_NAMES, decode_action
+
+
+class ReviewError(ValueError):
+    pass
+
+
+def _session_cursor(started_at: datetime, session_id: int) -> str:
+    return f"{started_at.isoformat()}_{session_id}"
+
+
+def _parse_session_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        started_at, session_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(started_at), int(session_id)
+    except ValueError:
+        raise ReviewError("malformed cursor") from None
+
+
+def _net_bb(start: Optional[int], end: Optional[int]) -> Optional[float]:
+    return (end - start) / BIG_BLIND if start is not None and end is not None else None
+
+
+async def list_sessions(
+    session_factory: async_sessionmaker[AsyncSession], user_id: str, limit: int = 20, cursor: Optional[str] = None
+) -> Dict[str, Any]:
+    """A page of the user's sessions, newest first, with their rollup totals."""
+    query = (
+        select(SessionORM, SessionRollup)
+        .outerjoin(SessionRollup, SessionRollup.session_id == SessionORM.id)
+        .where(SessionORM.user_id == user_id)
+        .order_by(SessionORM.started_at.desc(), SessionORM.id.desc())
+        .limit(limit)
+    )
+    if cursor:
+        started_at, session_id = _parse_session_cursor(cursor)
+        query = query.where(
+            or_(
+                SessionORM.started_at < started_at,
+                and_(SessionORM.started_at == started_at, SessionORM.id < session_id),
+            )
+        )
+    async with session_factory() as db:
+        rows = (await db.execute(query)).all()
+    sessions = [
+        {
+            "id": sess.id,
+            "started_at": sess.started_at.isoformat() if sess.started_at else None,
+            "ended_at": sess.ended_at.isoformat() if sess.ended_at else None,
+            "hands": rollup.hands if rollup else 0,
+            "net_bb": rollup.net_chips / BIG_BLIND if rollup else 0.0,
+        }
+        for sess, rollup in rows
+    ]
+    last = rows[-1][0] if len(rows) == limit else None
+    return {"sessions": sessions, "next_cursor": _session_cursor(last.started_at, last.id) if last else None}
+
+
+async def list_session_hands(
+    session_factory: async_sessionmaker[AsyncSession], user_id: str, session_id: int, limit: int = 50, after: int = 0
+) -> Optional[Dict[str, Any]]:
+    """A page of the hands played in one of the user's sessions, oldest first; None if not theirs."""
+    async with session_factory() as db:
+        owner = await db.scalar(select(SessionORM.user_id).where(SessionORM.id == session_id))
+        if owner != user_id:
+            return None
+        rows = (
+            await db.execute(
+                select(
+                    HandORM.id,
+                    HandORM.hand_number,
+                    HandORM.table_id,
+                    HandORM.created_at,
+                    HandORM.winner,
+                    HandORM.reason,
+                    HandORM.board,
+                    HandORM.hero_hand,
+                    HandORM.hero_start_stack,
+                    HandORM.hero_stack,
+                    HandORM.actions,
+                )
+                .where(HandORM.session_id == session_id, HandORM.id > after)
+                .order_by(HandORM.id)
+                .limit(limit)
+            )
+        ).all()
+    hands = [
+        {
+            "id": row.id,
+            "hand_number": row.hand_number,
+            "table_id": row.table_id,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+            "winner": row.winner,
+            "reason": row.reason,
+            "board": (row.board or "").split(),
+            "hero_hand": (row.hero_hand or "").split(),
+            "net_bb": _net_bb(row.hero_start_stack, row.hero_stack),
+            "actions": len((row.actions or "").split()),
+        }
+        for row in rows
+    ]
+    return {"session_id": session_id, "hands": hands, "next_cursor": rows[-1].id if len(rows) == limit else None}
+
+
+def _token_step(token: str) -> Dict[str, Any]:
+    if token[0].isdigit():  # ring tables log the seat number
+        return {"actor": f"seat {token[0]}", "action": ACTION_NAMES[token[1]], "amount": int(token[2:]) if len(token) > 2 else None}
+    actor, action, amount = decode_action(token)
+    return {"actor": actor, "action": action, "amount": amount}
+
+
+def _replayed_timeline(hand: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """Per-action steps with the table state after each one, or None if the hand no longer replays."""
+    tokens = hand["actions"].split()
+    try:
+        # One pass: states[i] is the table just before action i, states[i + 1] just after it.
+        states = HandReplay(hand).states()
+        return [
+            {"index": i, "street": states[i]["street"], **_token_step(token), "state": states[i + 1]}
+            for i, token in enumerate(tokens)
+        ]
+    except (ReplayError, IndexError):
+        return None
+
+
+async def hand_timeline(
+    session_factory: async_sessionmaker[AsyncSession], user_id: str, hand_id: int
+) -> Optional[Dict[str, Any]]:
+    """One of the user's hands with its full action timeline; None if not theirs."""
+    async with session_factory() as db:
+        row = await db.get(HandORM, hand_id)
+        if row is None or row.user_id != user_id:
+            return None
+        action_rows = []
+        if not row.history and row.hand_seed is not None:
+            action_rows = (
+                await db.scalars(
+                    select(ActionORM)
+                    .where(ActionORM.hand_seed == row.hand_seed, ActionORM.user_id == user_id)
+                    .order_by(ActionORM.action_index, ActionORM.id)
+                )
+            ).all()
+
+    timeline: Optional[List[Dict[str, Any]]] = None
+    if row.history:
+        try:
+            hand = decode_hand(row.history)
+        except FormatError:
+            hand = None
+        if hand is not None:
+            timeline = _replayed_timeline(hand)
+    tokens = (row.actions or "").split()
+    if timeline is None and action_rows and len(action_rows) >= len(tokens):
+        timeline = [
+            {
+                "index": i,
+                "street": a.street,
+                "actor": a.actor,
+                "action": a.action,
+                "amount": a.amount,
+                **({"state": a.state} if a.state else {}),
+            }
+            for i, a in enumerate(action_rows)
+        ]
+    if timeline is None:
+        # No per-action rows (the default): steps from the compact action log, without states.
+        timeline = [{"index": i, **_token_step(token)} for i, token in enumerate(tokens)]
+
+    # The hand seed stays server-side (see export._PRIVATE).
+    return {
+        "id": row.id,
+        "session_id": row.session_id,
+        "hand_number": row.hand_number,
+        "table_id": row.table_id,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "winner": row.winner,
+        "reason": row.reason,
+        "board": (row.board or "").split(),
+        "hero_hand": (row.hero_hand or "").split(),
+        "bot_hand": (row.bot_hand or "").split(),
+        "hero_start_stack": row.hero_start_stack,
+        "hero_stack": row.hero_stack,
+        "net_bb": _net_bb(row.hero_start_stack, row.hero_stack),
+        "timeline": timeline,
+    }
@@ -0,0 +1,488 @@
+"""
+N-seat (2-9) no-limit hold'em table with side pots and a rotating button.
+
+Per-seat state lives in flat arrays indexed by seat (stacks, street bets, chips put in
+this hand, status, hole cards), so a table is a few hundred bytes plus its deck and a
+6-max hand allocates little beyond the events it reports. Betting follows standard
+rules: blinds left of the button (the button posts the small blind heads-up), a full
+raise reopens the action, and side pots are layered by contribution at showdown with
+odd chips going to the first winner left of the button.
+
+The event contract matches `TableManager`: `player_action` returns state_update /
+bot_action / hand_summary / error events and `next_hand` returns one state_update, with
+bots acting until it is the hero's turn. `hero_seat=None` gives an all-bot table for
+simulations (`play_hand`).
+"""
+import hashlib
+import random
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .eval import CARD_STRINGS, describe_hand, evaluate, hand_label
+from .table import Hibernating, action_line, make_int_deck
+
+
+# A seat policy picks (action, amount) for a seat from the table state.
+SeatPolicy = Callable[["RingTable", int], Tuple[str, Optional[int]]]
+
+EMPTY, ACTIVE, FOLDED, ALL_IN = range(4)
+STATUS_NAMES = ("empty", "active", "folded", "all_in")
+STREETS = ("preflop", "flop", "turn", "river")
+MAX_BOT_ACTIONS = 400
+
+
+def rule_based_seat_policy(table: "RingTable", seat: int) -> Tuple[str, Optional[int]]:
+    """`rule_based_policy` for a seat: random aggression that ignores its own cards."""
+    stack = table.stacks[seat]
+    bet = table.bets[seat]
+    to_call = table.current_bet - bet
+    aggressive = table.rng.random() < 0.2
+    if to_call == 0:
+        if aggressive and stack > 0:
+            return "bet", bet + min(stack, max(table.big_blind * 2, int(table.pot * 0.6)))
+        return "check", None
+    pot_odds = to_call / (table.pot + to_call)
+    if to_call > stack * 0.6 and table.rng.random() < 0.4:
+        return "fold", None
+    if pot_odds > 0.3 and table.rng.random() < 0.4:
+        return "fold", None
+    if aggressive and stack > to_call + table.min_raise:
+        return "raise", min(stack + bet, table.current_bet + max(table.min_raise, to_call * 2))
+    return "call", None
+
+
+class RingTable(Hibernating):
+    __slots__ = (
+        "rng",
+        "seats",
+        "starting_stack",
+        "small_blind",
+        "big_blind",
+        "hero_seat",
+        "names",
+        "policies",
+        "store",
+        "hero_id",
+        "table_id",
+        "session_id",
+        "hand_id",
+        "hand_seed",
+        "hand_rng",
+        "deck",
+        "deck_fingerprint",
+        "hero_start_stack",
+        "stacks",
+        "bets",
+        "committed",
+        "status",
+        "acted",
+        "hole",
+        "board_cards",
+        "button",
+        "to_act",
+        "street",
+        "pot",
+        "current_bet",
+        "min_raise",
+        "hand_over",
+        "winners",
+        "last_action",
+        "action_log",
+        "preflop_actions",
+        "pots",
+        "version",
+        "_snapshot",
+    )
+
+    def __init__(
+        self,
+        seats: int = 6,
+        seed: Optional[int] = None,
+        hero_seat: Optional[int] = 0,
+        store: Optional[Any] = None,
+        hero_id: str = "hero",
+        table_id: str = "ring",
+        bot_policy: Optional[SeatPolicy] = None,
+        starting_stack: int = 200,
+        small_blind: int = 1,
+        big_blind: int = 2,
+    ) -> None:
+        if not 2 <= seats <= 9:
+            raise ValueError("seats must be between 2 and 9")
+        self.rng = random.Random(seed)
+        self.seats = seats
+        self.starting_stack = starting_stack
+        self.small_blind = small_blind
+        self.big_blind = big_blind
+        self.hero_seat = hero_seat
+        self.names = tuple("hero" if s == hero_seat else f"bot{s}" for s in range(seats))
+        self.policies: List[SeatPolicy] = [bot_policy or rule_based_seat_policy] * seats
+        self.store = store
+        self.hero_id = hero_id
+        self.table_id = table_id
+        self.session_id: Optional[int] = None
+        self.hand_id = 0
+        self.stacks = array("i", [starting_stack] * seats)
+        self.bets = array("i", [0] * seats)
+        self.committed = array("i", [0] * seats)
+        self.status = bytearray([ACTIVE] * seats)
+        self.acted = bytearray(seats)
+        self.hole = bytearray(2 * seats)
+        self.board_cards: List[int] = []
+        self.button = seats - 1  # advances to seat 0 for the first hand
+        self.version = 0
+        self._snapshot: Optional[Tuple[int, Dict[str, Any]]] = None
+        self._init_hand()
+        self._run_bots(None)
+
+    def _attach(self, bot_policy: Optional[SeatPolicy]) -> None:
+        self.policies = [bot_policy or rule_based_seat_policy] * self.seats
+        self._snapshot = None
+
+    # --- seat helpers -------------------------------------------------------
+
+    def _next_seat(self, seat: int, statuses: Tuple[int, ...] = (ACTIVE,)) -> int:
+        for step in range(1, self.seats + 1):
+            s = (seat + step) % self.seats
+            if self.status[s] in statuses:
+                return s
+        return -1
+
+    def _count(self, *statuses: int) -> int:
+        return sum(1 for s in self.status if s in statuses)
+
+    def cards_of(self, seat: int) -> List[int]:
+        return [self.hole[2 * seat], self.hole[2 * seat + 1]]
+
+    # --- hand lifecycle -----------------------------------------------------
+
+    def _init_hand(self) -> None:
+        self.version += 1
+        self.hand_id += 1
+        n = self.seats
+        for s in range(n):
+            if self.stacks[s] < self.big_blind:
+                self.stacks[s] = self.starting_stack
+            self.bets[s] = self.committed[s] = self.acted[s] = 0
+            self.status[s] = ACTIVE
+        self.button = (self.button + 1) % n
+        self.hero_start_stack = self.stacks[self.hero_seat] if self.hero_seat is not None else 0
+        self.street = 0
+        self.board_cards = []
+        self.pot = 0
+        self.hand_over = False
+        self.winners: List[int] = []
+        self.last_action: Optional[str] = None
+        self.action_log: List[str] = []
+        self.preflop_actions: Optional[int] = None  # tokens logged preflop, set once the flop is dealt
+        self.pots: List[Dict[str, Any]] = []
+
+        self.hand_seed = self.rng.getrandbits(63)
+        self.hand_rng = random.Random(self.hand_seed)
+        self.deck = make_int_deck(self.hand_rng)
+        self.deck_fingerprint = hashlib.blake2b(bytes(self.deck), digest_size=8).hexdigest()
+        for i in range(2 * n):
+            self.hole[i] = self.deck.pop()
+
+        # Heads-up the button posts the small blind and acts first preflop.
+        sb = self.button if n == 2 else self._next_seat(self.button)
+        bb = self._next_seat(sb)
+        self._post(sb, self.small_blind)
+        self._post(bb, self.big_blind)
+        self.current_bet = self.big_blind
+        self.min_raise = self.big_blind
+        self.to_act = self._next_seat(bb)
+
+    def _post(self, seat: int, amount: int) -> None:
+        pay = min(amount, self.stacks[seat])
+        self.stacks[seat] -= pay
+        self.bets[seat] += pay
+        self.committed[seat] += pay
+        self.pot += pay
+        if self.stacks[seat] == 0:
+            self.status[seat] = ALL_IN
+
+    def next_hand(self) -> Dict[str, Any]:
+        self._init_hand()
+        labels = self._run_bots(None)
+        update = {"type": "state_update", "state": self.snapshot(), "bot_actions": labels}
+        if self.hand_over:
+            # Everyone folded to the hero's big blind before the hero had to act.
+            update["summary"] = self.summary()
+        return update
+
+    def play_hand(self) -> None:
+        """Deal and play a full hand with every seat on its policy (hero_seat=None tables)."""
+        if self.hand_over:
+            self._init_hand()
+        self._run_bots(None)
+
+    # --- actions ------------------------------------------------------------
+
+    def _apply_action(self, seat: int, action: str, amount: Optional[int]) -> Optional[str]:
+        """Apply one action for `seat`; returns an error message or None."""
+        bet = self.bets[seat]
+        stack = self.stacks[seat]
+        to_call = self.current_bet - bet
+        all_in = bet + stack
+        min_total = self.current_bet + self.min_raise if self.current_bet > 0 else self.big_blind
+
+        if to_call > 0:
+            if action == "bet":
+                action = "raise"
+            if action == "check":
+                return "Cannot check facing a bet."
+        else:
+            if action == "call":
+                action = "check"
+            if action == "raise":
+                action = "bet"
+        if action in ("bet", "raise"):
+            if stack <= to_call:
+                action = "call"
+            else:
+                target = min(amount if amount is not None else min_total, all_in)
+                if target < min_total and target < all_in:
+                    return f"{'Raise' if action == 'raise' else 'Bet'} must be at least {min_total}."
+
+        self.version += 1
+        name = self.names[seat]
+        if action == "fold":
+            self.status[seat] = FOLDED
+            self.action_log.append(f"{seat}f")
+            self.last_action = f"{name} folded"
+        elif action in ("check", "call"):
+            pay = min(to_call, stack)
+            self._post(seat, pay)
+            self.action_log.append(f"{seat}{'c' if to_call else 'k'}")
+            self.last_action = f"{name} {action}"
+        elif action in ("bet", "raise"):
+            increase = target - self.current_bet
+            self._post(seat, target - bet)
+            if increase >= self.min_raise:
+                # A full raise reopens the action for everyone else.
+                self.min_raise = increase
+                for s in range(self.seats):
+                    self.acted[s] = 0
+            self.current_bet = max(self.current_bet, target)
+            self.action_log.append(f"{seat}{action[0]}{target}")
+            self.last_action = f"{name} {action} to {self.bets[seat]}"
+        else:
+            self.version -= 1
+            return f"Unknown action {action}"
+        self.acted[seat] = 1
+        self._advance(seat)
+        return None
+
+    def _advance(self, seat: int) -> None:
+        if self._count(ACTIVE, ALL_IN) == 1:
+            self._award_uncontested()
+            return
+        pending = [s for s in range(self.seats) if self.status[s] == ACTIVE and (not self.acted[s] or self.bets[s] < self.current_bet)]
+        # A lone player with chips behind has nobody to bet against once they have matched.
+        if pending and (self._count(ACTIVE) > 1 or self.bets[pending[0]] < self.current_bet):
+            nxt = self._next_seat(seat)
+            while nxt not in pending:
+                nxt = self._next_seat(nxt)
+            self.to_act = nxt
+            return
+        self._next_street()
+
+    def _next_street(self) -> None:
+        self.version += 1
+        for s in range(self.seats):
+            self.bets[s] = self.acted[s] = 0
+        self.current_bet = 0
+        self.min_raise = self.big_blind
+        if self.street == 0:
+            self.preflop_actions = len(self.action_log)
+        # With fewer than two players able to bet, run the board out.
+        while self.street < 3:
+            self.street += 1
+            self.board_cards.extend(self.deck.pop() for _ in range(3 if self.street == 1 else 1))
+            if self._count(ACTIVE) >= 2:
+                self.to_act = self._next_seat(self.button)
+                return
+        self._showdown()
+
+    def _award_uncontested(self) -> None:
+        winner = next(s for s in range(self.seats) if self.status[s] in (ACTIVE, ALL_IN))
+        self.stacks[winner] += self.pot
+        pots = [{"amount": self.pot, "winners": [self.names[winner]]}]
+        self._end_hand([winner], f"{self.last_action}; {self.names[winner]} wins uncontested", pots)
+
+    def _showdown(self) -> None:
+        contenders = [s for s in range(self.seats) if self.status[s] in (ACTIVE, ALL_IN)]
+        values = {s: evaluate([*self.cards_of(s), *self.board_cards]) for s in contenders}
+        pots: List[Dict[str, Any]] = []
+        won = set()
+        previous = 0
+        for level in sorted(set(self.committed[s] for s in contenders)):
+            amount = sum(min(c, level) - min(c, previous) for c in self.committed)
+            previous = level
+            eligible = [s for s in contenders if self.committed[s] >= level]
+            best = max(values[s] for s in eligible)
+            winners = [s for s in eligible if values[s] == best]
+            # Odd chips go to the first winner left of the button.
+            winners.sort(key=lambda s: (s - self.button - 1) % self.seats)
+            share, odd = divmod(amount, len(winners))
+            for i, s in enumerate(winners):
+                self.stacks[s] += share + (1 if i < odd else 0)
+            won.update(winners)
+            pots.append({"amount": amount, "winners": [self.names[s] for s in winners]})
+
+        top = max(values[s] for s in won)
+        main = [s for s in won if values[s] == top]
+        if len(main) > 1:
+            reason = f"Split pot ({hand_label(top)})"
+        else:
+            reason = describe_hand([*self.cards_of(main[0]), *self.board_cards], top)
+        self._end_hand(sorted(won), reason, pots)
+
+    def _end_hand(self, winners: List[int], reason: str, pots: List[Dict[str, Any]]) -> None:
+        self.version += 1
+        self.winners = winners
+        self.hand_over = True
+        self.last_action = reason
+        self.pot = 0
+        self.pots = pots
+        if self.store is not None:
+            self.store.log_hand({**self.summary(), **self.hand_record(), "session_id": self.session_id})
+
+    # --- driving ------------------------------------------------------------
+
+    def _run_bots(self, events: Optional[List[Dict[str, Any]]]) -> List[str]:
+        """Let bot seats act until it is the hero's turn or the hand ends."""
+        labels: List[str] = []
+        steps = 0
+        while not self.hand_over and self.to_act != self.hero_seat and steps < MAX_BOT_ACTIONS:
+            seat = self.to_act
+            street = STREETS[self.street]
+            action, amount = self.policies[seat](self, seat)
+            if self._apply_action(seat, action, amount) is not None:
+                action, amount = "call", None
+                self._apply_action(seat, action, amount)
+            self._log_action(seat, action, amount, street)
+            steps += 1
+            labels.append(self.last_action or "")
+            if events is not None and not self.hand_over:
+                label = self.last_action
+                events.append({"type": "state_update", "state": self.snapshot(), "actor": self.names[seat], "bot_action": label})
+                events.append({"type": "bot_action", "action": label, "actor": self.names[seat]})
+        return labels
+
+    def _log_action(self, seat: int, action: str, amount: Optional[int], street: str) -> None:
+        """Log the action just appended to `action_log` (index = its position in the log, as on heads-up tables)."""
+        if self.store is None:
+            return
+        hero = seat == self.hero_seat
+        self.store.log_action(
+            {
+                "actor": self.names[seat],
+                "action": action,
+                "amount": amount,
+                "hand_id": self.hand_id,
+                "hand_seed": self.hand_seed,
+                "street": street,
+                "user_id": self.hero_id,
+                "hero_id": self.hero_id,
+                "table_id": self.table_id,
+                "action_index": len(self.action_log) - 1,
+                # Seat-independent token ("h"/"b" + code) so the opponent model reads it like a heads-up hand.
+                "token": ("h" if hero else "b") + self.action_log[-1][1:],
+            }
+        )
+
+    def player_action(self, action: str, amount: Optional[int] = None) -> List[Dict[str, Any]]:
+        if self.hand_over:
+            return [{"type": "error", "message": "Hand already complete."}]
+        if self.to_act != self.hero_seat:
+            return [{"type": "error", "message": "Not your turn."}]
+        street = STREETS[self.street]
+        error = self._apply_action(self.hero_seat, action, amount)
+        if error:
+            return [{"type": "error", "message": error}]
+        events: List[Dict[str, Any]] = []
+        self._log_action(self.hero_seat, action, amount, street)
+        if not self.hand_over:
+            events.append({"type": "state_update", "state": self.snapshot(), "actor": "hero"})
+            self._run_bots(events)
+        if self.hand_over:
+            events.append(self.summary())
+        return events
+
+    # --- views --------------------------------------------------------------
+
+    def summary(self) -> Dict[str, Any]:
+        snap = self.snapshot()
+        hero = self.hero_seat
+        return {
+            "type": "hand_summary",
+            "winner": snap["winner"],
+            "winners": [self.names[s] for s in self.winners],
+            "reason": self.last_action,
+            "payout": sum(p["amount"] for p in self.pots),
+            "pots": self.pots,
+            "board": snap["board"],
+            "hero_hand": snap["hero_hand"],
+            "hero_stack": self.stacks[hero] if hero is not None else 0,
+            "seats": snap["seats"],
+            "hand_id": self.hand_id,
+            "user_id": self.hero_id,
+        }
+
+    def hand_record(self) -> Dict[str, Any]:
+        return {
+            "hand_id": self.hand_id,
+            "table_id": self.table_id,
+            "hand_seed": self.hand_seed,
+            "deck_fingerprint": self.deck_fingerprint,
+            "hero_start_stack": self.hero_start_stack,
+            "actions": " ".join(self.action_log),
+        }
+
+    def snapshot(self, hide_bots: bool = True) -> Dict[str, Any]:
+        """Public state with the same hero-centric keys as `TableManager.snapshot` plus per-seat detail."""
+        if hide_bots and self._snapshot is not None and self._snapshot[0] == self.version:
+            return self._snapshot[1]
+        hero = self.hero_seat
+        opponents = [s for s in range(self.seats) if s != hero and self.status[s] in (ACTIVE, ALL_IN)]
+        reveal = self.hand_over and self._count(ACTIVE, ALL_IN) > 1
+        seats = []
+        for s in range(self.seats):
+            show = not hide_bots or s == hero or (reveal and self.status[s] != FOLDED)
+            seats.append(
+                {
+                    "seat": s,
+                    "name": self.names[s],
+                    "stack": self.stacks[s],
+                    "bet": self.bets[s],
+                    "status": STATUS_NAMES[self.status[s]],
+                    "hand": [CARD_STRINGS[c] for c in self.cards_of(s)] if show else ["XX", "XX"],
+                }
+            )
+        snap = {
+            "hand_id": self.hand_id,
+            "street": STREETS[self.street],
+            "pot": self.pot,
+            "hero_stack": self.stacks[hero] if hero is not None else 0,
+            "hero_bet": self.bets[hero] if hero is not None else 0,
+            # Largest live opponent, so effective-stack facts stay meaningful multiway.
+            "bot_stack": max((self.stacks[s] for s in opponents), default=0),
+            "bot_bet": max((self.bets[s] for s in opponents), default=0),
+            "current_bet": self.current_bet,
+            "board": [CARD_STRINGS[c] for c in self.board_cards],
+            "hero_hand": [CARD_STRINGS[c] for c in self.cards_of(hero)] if hero is not None else [],
+            "to_act": self.names[self.to_act] if not self.hand_over else None,
+            "last_action": self.last_action,
+            "hand_over": self.hand_over,
+            "winner": self.names[self.winners[0]] if self.winners else None,
+            "button": self.button,
+            "seats": seats,
+            "preflop_line": action_line(
+                (int(token[0]) == hero, token[1]) for token in self.action_log[: self.preflop_actions]
+            ),
+        }
+        if hide_bots:
+            self._snapshot = (self.version, snap)
+        return snap
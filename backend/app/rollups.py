@@ -0,0 +1,209 @@
+"""
+Per-user, per-session and per-day results rollups, maintained on the write path.
+
+`hand_deltas` turns one finished hand into counter increments (hands, hands won, net
+chips split into showdown / non-showdown, streets reached). The write-behind queue
+sums them per rollup key between flushes and applies each key with one
+`INSERT ... ON CONFLICT DO UPDATE SET col = col + excluded.col`, so a stats read is a
+primary-key lookup however many hands a user has played.
+
+Rollups for hands written before this existed (or after a change to the counters)
+are rebuilt with:
+
+    python -m app.rollups backfill
+
+The rebuild runs in one transaction that holds the write lock (SQLite `BEGIN IMMEDIATE`,
+a Postgres table lock on hands and the rollup tables), and the write-behind queue
+commits each batch of hands together with its rollup deltas, so a rebuild against a
+running server neither loses nor double-counts hands. The server's writes wait (and
+retry) meanwhile; on a large history, run it with the server stopped.
+"""
+import argparse
+import asyncio
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from .orm import DailyRollup, Hand, SessionRollup, UserRollup
+
+
+log = logging.getLogger(__name__)
+
+COUNTERS = (
+    "hands",
+    "hands_won",
+    "net_chips",
+    "showdown_chips",
+    "non_showdown_chips",
+    "showdowns",
+    "saw_flop",
+    "saw_turn",
+    "saw_river",
+)
+BIG_BLIND = 2
+# model, key columns
+ROLLUPS = ((UserRollup, ("user_id",)), (SessionRollup, ("session_id",)), (DailyRollup, ("user_id", "day")))
+
+
+def hand_deltas(hand: Dict[str, Any]) -> Optional[Dict[str, int]]:
+    """Counter increments for one finished hand (a `log_hand` payload or a hands row as a dict)."""
+    start, end = hand.get("hero_start_stack"), hand.get("hero_stack")
+    if start is None or end is None:
+        return None
+    net = int(end) - int(start)
+    tokens = (hand.get("actions") or "").split()
+    seats = hand.get("seats")
+    if seats is not None or (tokens and tokens[0][0].isdigit()):
+        # Ring table: the hero sits in seat 0 unless the summary says otherwise.
+        hero = next((s for s in seats or () if s["name"] == "hero"), None)
+        hero_folded = hero["status"] == "folded" if hero else any(t[0] == "0" and t[1] == "f" for t in tokens)
+        won = "hero" in (hand.get("winners") or [hand.get("winner")])
+        showdown = not hero_folded and "uncontested" not in (hand.get("reason") or "")
+    else:
+        won = hand.get("winner") == "hero"
+        showdown = bool(tokens) and tokens[-1][1] != "f"
+    board = hand.get("board") or []
+    if isinstance(board, str):
+        board = board.split()
+    return {
+        "hands": 1,
+        "hands_won": int(won),
+        "net_chips": net,
+        "showdown_chips": net if showdown else 0,
+        "non_showdown_chips": 0 if showdown else net,
+        "showdowns": int(showdown),
+        "saw_flop": int(len(board) >= 3),
+        "saw_turn": int(len(board) >= 4),
+        "saw_river": int(len(board) >= 5),
+    }
+
+
+class RollupBuffer:
+    """Deltas summed per rollup key until the next flush."""
+
+    def __init__(self) -> None:
+        self.pending: Dict[Any, Dict[Tuple[Any, ...], Dict[str, int]]] = {model: {} for model, _ in ROLLUPS}
+
+    def __len__(self) -> int:
+        return sum(len(keys) for keys in self.pending.values())
+
+    def add(self, hand: Dict[str, Any], day: Optional[date] = None) -> bool:
+        deltas = hand_deltas(hand)
+        user_id = hand.get("user_id")
+        if deltas is None or not user_id:
+            return False
+        day = day or datetime.utcnow().date()
+        keys = {UserRollup: (user_id,), DailyRollup: (user_id, day)}
+        if hand.get("session_id") is not None:
+            keys[SessionRollup] = (int(hand["session_id"]), user_id)
+        for model, key in keys.items():
+            totals = self.pending[model].setdefault(key, dict.fromkeys(COUNTERS, 0))
+            for name, value in deltas.items():
+                totals[name] += value
+        return True
+
+    def rows(self) -> Iterable[Tuple[Any, Tuple[str, ...], List[Dict[str, Any]]]]:
+        for model, key_columns in ROLLUPS:
+            rows = []
+            for key, totals in self.pending[model].items():
+                row = dict(zip(key_columns, key), **totals)
+                if model is SessionRollup:
+                    row["user_id"] = key[1]
+                rows.append(row)
+            if rows:
+                yield model, key_columns, rows
+
+
+async def apply_rollups(session: AsyncSession, buffer: RollupBuffer) -> None:
+    """Add the buffered deltas to the rollup tables (one upsert per key, executemany per table)."""
+    insert = pg_insert if session.bind.dialect.name == "postgresql" else sqlite_insert
+    now = datetime.utcnow()
+    for model, key_columns, rows in buffer.rows():
+        stmt = insert(model)
+        table = model.__table__
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key_columns),
+            set_={**{name: table.c[name] + stmt.excluded[name] for name in COUNTERS}, "updated_at": now},
+        )
+        await session.execute(stmt, [{**row, "updated_at": now} for row in rows])
+
+
+def summarize(row: Optional[Any]) -> Dict[str, Any]:
+    """API view of a rollup row, in big blinds."""
+    if row is None:
+        return {"hands": 0}
+    hands = row.hands or 0
+    return {
+        "hands": hands,
+        "hands_won": row.hands_won,
+        "net_bb": row.net_chips / BIG_BLIND,
+        "bb_per_100": round(row.net_chips / BIG_BLIND / hands * 100, 2) if hands else None,
+        "showdown_bb": row.showdown_chips / BIG_BLIND,
+        "non_showdown_bb": row.non_showdown_chips / BIG_BLIND,
+        "showdowns": row.showdowns,
+        "saw_flop": row.saw_flop,
+        "saw_turn": row.saw_turn,
+        "saw_river": row.saw_river,
+    }
+
+
+async def _lock_for_rebuild(session: AsyncSession) -> None:
+    """Keep writers out of hands and the rollup tables until the session commits."""
+    if session.bind.dialect.name == "sqlite":
+        await session.execute(text("BEGIN IMMEDIATE"))
+    elif session.bind.dialect.name == "postgresql":
+        tables = ", ".join(model.__tablename__ for model in (Hand, *(model for model, _ in ROLLUPS)))
+        await session.execute(text(f"LOCK TABLE {tables} IN SHARE ROW EXCLUSIVE MODE"))
+
+
+async def backfill(session_factory: async_sessionmaker[AsyncSession], batch_size: int = 2000) -> int:
+    """Rebuild every rollup from the hands table in one locked transaction (keyset scan). Returns hands counted."""
+    buffer = RollupBuffer()
+    last_id = counted = 0
+    columns = (Hand.id, Hand.user_id, Hand.session_id, Hand.created_at, Hand.hero_start_stack, Hand.hero_stack,
+               Hand.winner, Hand.reason, Hand.board, Hand.actions)
+    async with session_factory() as session:
+        await _lock_for_rebuild(session)
+        while True:
+            rows = (await session.execute(select(*columns).where(Hand.id > last_id).order_by(Hand.id).limit(batch_size))).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            for row in rows:
+                counted += buffer.add(row._asdict(), day=row.created_at.date() if row.created_at else None)
+        for model, _ in ROLLUPS:
+            await session.execute(delete(model))
+        await apply_rollups(session, buffer)
+        await session.commit()
+    return counted
+
+
+def main() -> None:
+    from .db import get_engine, get_session_factory, init_models
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--batch-size", type=int, default=2000)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    engine = get_engine()
+    if engine is None:
+        parser.error("no database configured (set POKER_DB_URL or POKER_SQLITE_PATH)")
+
+    async def run() -> None:
+        await init_models(engine)
+        counted = await backfill(get_session_factory(engine), args.batch_size)
+        log.info("Rebuilt rollups from %d hands", counted)
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
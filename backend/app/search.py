@@ -0,0 +1,182 @@
+"""
+Anytime Monte Carlo search bot with a per-decision wall-clock budget.
+
+Each candidate action (fold, check/call, half pot, pot, all-in) is scored by rollouts
+from a fork of the live table: the opponent's cards and the undealt deck are re-drawn
+from the unseen cards, the candidate is applied and both players finish the hand with
+a rollout policy. After a short round-robin, rollouts go to the candidate with the
+best upper confidence bound until the budget runs out, and the best mean wins. Folding is scored exactly (0 chips
+from here on).
+
+Search is CPU-bound, so `main` runs table actions in a thread executor when the bot is
+in search mode. Each decision draws from its own RNG, seeded from the bot's seed, the
+hand seed and the decision's position in the hand, so concurrent searches never share
+generator state and a decision's rollouts can be reproduced (how many are run still
+depends on the wall-clock budget). Per-decision nodes and timings are aggregated in `SearchBot.stats()`.
+"""
+import logging
+import math
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cfr import POT_FRACTIONS, _raise_to
+from .table import Policy, TableManager, rule_based_policy
+
+
+log = logging.getLogger(__name__)
+
+MAX_ROLLOUT_ACTIONS = 60
+MIN_ROLLOUTS = 8  # per candidate, round-robin, before UCB takes over
+EXPLORATION = 1.0  # UCB1 constant, in units of the current pot
+
+
+def candidates(table: TableManager, actor: str) -> List[Tuple[str, str, Optional[int]]]:
+    """(label, action, amount) for every distinct abstract action available to `actor`."""
+    bet = table.hero_bet if actor == "hero" else table.bot_bet
+    stack = table.hero_stack if actor == "hero" else table.bot_stack
+    current = table.current_bet
+    to_call = current - bet
+    out: List[Tuple[str, str, Optional[int]]] = []
+    if to_call > 0:
+        out.append(("fold", "fold", None))
+    out.append(("call" if to_call > 0 else "check", "call", None))
+    if stack > to_call:
+        all_in = bet + stack
+        for label, fraction in zip(("half_pot", "pot"), POT_FRACTIONS.values()):
+            target = _raise_to(current, to_call, table.pot, fraction)
+            if target < all_in and all(amount != target for _, _, amount in out):
+                out.append((label, "raise", target))
+        out.append(("all_in", "raise", all_in))
+    return out
+
+
+def _finish(sim: TableManager, rollout: Policy) -> None:
+    """Play the hand out with `rollout` for both seats (the fork's bot policy is `rollout`)."""
+    steps = 0
+    while not sim.hand_over and steps < MAX_ROLLOUT_ACTIONS:
+        action, amount = rollout(sim, "hero")
+        events = sim.player_action(action, amount)
+        if events and events[0].get("type") == "error":
+            sim.player_action("call")
+        steps += 1
+
+
+class SearchBot:
+    """Callable policy; one instance can serve many tables (stats are lock-protected)."""
+
+    def __init__(self, budget_ms: float = 50.0, rollout: Policy = rule_based_policy, seed: Optional[int] = None) -> None:
+        self.budget_ms = budget_ms
+        self.rollout = rollout
+        self.seed = seed
+        self.last: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._totals = {"decisions": 0, "nodes": 0, "rollouts": 0, "ms": 0.0, "max_ms": 0.0, "over_budget": 0}
+
+    def __call__(self, table: TableManager, actor: str) -> Tuple[str, Optional[int]]:
+        label, action, amount, report = self.search(table, actor)
+        return action, amount
+
+    def _rollout(
+        self, table: TableManager, actor: str, action: str, amount: Optional[int], start_stack: int, rng: random.Random
+    ) -> Tuple[float, int]:
+        """One determinized playout after `action`; returns (chips won from here on, actions simulated)."""
+        sim = table.fork(rng.getrandbits(32))
+        sim.bot_policy = self.rollout
+        own = sim.hero_cards if actor == "hero" else sim.bot_cards
+        unseen = [c for c in range(52) if c not in own and c not in sim.board_cards]
+        rng.shuffle(unseen)
+        if actor == "hero":
+            sim.bot_cards = [unseen.pop(), unseen.pop()]
+        else:
+            sim.hero_cards = [unseen.pop(), unseen.pop()]
+        sim.deck = unseen
+
+        before = len(sim.action_log)
+        if actor == "hero":
+            sim.player_action(action, amount)
+        else:
+            sim._apply_action("bot", action, amount)
+            if not sim.hand_over and sim.hero_bet == sim.bot_bet and sim.to_act == "hero":
+                sim._progress_street()
+        _finish(sim, self.rollout)
+        end_stack = sim.hero_stack if actor == "hero" else sim.bot_stack
+        return float(end_stack - start_stack), len(sim.action_log) - before
+
+    def search(self, table: TableManager, actor: str) -> Tuple[str, str, Optional[int], Dict[str, Any]]:
+        start = time.perf_counter()
+        deadline = start + self.budget_ms / 1000.0
+        rng = random.Random(f"{self.seed}:{table.hand_seed}:{len(table.action_log)}:{actor}")
+        options = candidates(table, actor)
+        start_stack = table.hero_stack if actor == "hero" else table.bot_stack
+        totals = [0.0] * len(options)
+        counts = [0] * len(options)
+        sampled = [i for i, (label, _, _) in enumerate(options) if label != "fold"]
+        nodes = rollouts = 0
+
+        if len(sampled) > 1:
+            while True:
+                warming = [i for i in sampled if counts[i] < MIN_ROLLOUTS]
+                if warming:
+                    pick = min(warming, key=lambda i: counts[i])
+                else:
+                    scale = EXPLORATION * max(table.pot, table.big_blind) * math.sqrt(math.log(rollouts))
+                    pick = max(sampled, key=lambda i: totals[i] / counts[i] + scale / math.sqrt(counts[i]))
+                _, action, amount = options[pick]
+                value, simulated = self._rollout(table, actor, action, amount, start_stack, rng)
+                totals[pick] += value
+                counts[pick] += 1
+                nodes += simulated
+                rollouts += 1
+                if time.perf_counter() >= deadline:
+                    break
+
+        means = [totals[i] / counts[i] if counts[i] else 0.0 for i in range(len(options))]
+        if len(sampled) <= 1:
+            best = sampled[0]
+        else:
+            best = max(range(len(options)), key=lambda i: (means[i] if counts[i] or options[i][0] == "fold" else -math.inf))
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        label, action, amount = options[best]
+        report = {
+            "actor": actor,
+            "choice": label,
+            "nodes": nodes,
+            "rollouts": rollouts,
+            "elapsed_ms": round(elapsed_ms, 2),
+            "budget_ms": self.budget_ms,
+            "ev": {options[i][0]: {"mean": round(means[i], 2), "n": counts[i]} for i in range(len(options))},
+        }
+        self._record(report)
+        log.debug("search %s: %s", label, report)
+        return label, action, amount, report
+
+    def _record(self, report: Dict[str, Any]) -> None:
+        with self._lock:
+            self.last = report
+            totals = self._totals
+            totals["decisions"] += 1
+            totals["nodes"] += report["nodes"]
+            totals["rollouts"] += report["rollouts"]
+            totals["ms"] += report["elapsed_ms"]
+            totals["max_ms"] = max(totals["max_ms"], report["elapsed_ms"])
+            # Allow one rollout of slack past the deadline before counting an overrun.
+            if report["elapsed_ms"] > self.budget_ms * 1.2:
+                totals["over_budget"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            totals = dict(self._totals)
+            last = dict(self.last)
+        decisions = totals["decisions"]
+        return {
+            "budget_ms": self.budget_ms,
+            "decisions": decisions,
+            "mean_ms": round(totals["ms"] / decisions, 2) if decisions else None,
+            "max_ms": round(totals["max_ms"], 2),
+            "mean_nodes": round(totals["nodes"] / decisions, 1) if decisions else None,
+            "mean_rollouts": round(totals["rollouts"] / decisions, 1) if decisions else None,
+            "over_budget": totals["over_budget"],
+            "last": last,
+        }
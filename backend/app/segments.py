@@ -0,0 +1,112 @@
+"""
+Append-only segment files for records evicted from `MemoryStore`.
+
+Each record kind ("hands", "actions", "facts") gets its own series of JSON-lines
+segments `<kind>-000001.seg`, rolled over at `segment_bytes`. Every segment has a
+small `.idx` sidecar mapping user_id to the byte offsets of that user's lines, written
+when the segment is sealed; only the open segment's index is held in memory. Reading a
+user's history walks the segments newest-first and seeks straight to their lines.
+"""
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+log = logging.getLogger(__name__)
+
+
+class SegmentLog:
+    def __init__(self, directory: Path, kind: str, segment_bytes: int = 4 << 20) -> None:
+        self.directory = directory
+        self.kind = kind
+        self.segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+        directory.mkdir(parents=True, exist_ok=True)
+        existing = self._segments()
+        for seq in existing:
+            if not self._index_path(seq).exists():
+                self._write_index(seq, self._scan(seq))
+        self._seq = (existing[-1] if existing else 0) + 1
+        self._fh = open(self._segment_path(self._seq), "ab")
+        self._size = 0
+        self._index: Dict[str, List[int]] = {}
+
+    def _segment_path(self, seq: int) -> Path:
+        return self.directory / f"{self.kind}-{seq:06d}.seg"
+
+    def _index_path(self, seq: int) -> Path:
+        return self.directory / f"{self.kind}-{seq:06d}.idx"
+
+    def _segments(self) -> List[int]:
+        return sorted(int(p.stem.rsplit("-", 1)[1]) for p in self.directory.glob(f"{self.kind}-*.seg"))
+
+    def _scan(self, seq: int) -> Dict[str, List[int]]:
+        """Rebuild the index of a segment left unsealed by a crash."""
+        index: Dict[str, List[int]] = {}
+        offset = 0
+        with open(self._segment_path(seq), "rb") as fh:
+            for line in fh:
+                try:
+                    user_id = json.loads(line)[0]
+                except (ValueError, IndexError):
+                    break  # torn final line
+                index.setdefault(user_id, []).append(offset)
+                offset += len(line)
+        return index
+
+    def _write_index(self, seq: int, index: Dict[str, List[int]]) -> None:
+        with open(self._index_path(seq), "w") as fh:
+            json.dump(index, fh, separators=(",", ":"))
+
+    def append(self, user_id: str, record: Dict[str, Any]) -> None:
+        line = json.dumps([user_id, record], separators=(",", ":"), default=str).encode() + b"\n"
+        with self._lock:
+            self._index.setdefault(user_id, []).append(self._size)
+            self._fh.write(line)
+            self._size += len(line)
+            if self._size >= self.segment_bytes:
+                self._seal()
+
+    def _seal(self) -> None:
+        self._fh.close()
+        self._write_index(self._seq, self._index)
+        self._seq += 1
+        self._fh = open(self._segment_path(self._seq), "ab")
+        self._size = 0
+        self._index = {}
+
+    def read(self, user_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Up to `limit` of the user's most recent spilled records, oldest first."""
+        with self._lock:
+            self._fh.flush()
+            open_seq, open_offsets = self._seq, list(self._index.get(user_id, ()))
+        out: List[Dict[str, Any]] = []
+        for seq in range(open_seq, 0, -1):
+            if seq == open_seq:
+                offsets = open_offsets
+            else:
+                try:
+                    with open(self._index_path(seq)) as fh:
+                        offsets = json.load(fh).get(user_id, [])
+                except (OSError, ValueError):
+                    continue
+            if not offsets:
+                continue
+            if limit is not None:
+                offsets = offsets[-(limit - len(out)) :]
+            records = []
+            with open(self._segment_path(seq), "rb") as fh:
+                for offset in offsets:
+                    fh.seek(offset)
+                    records.append(json.loads(fh.readline())[1])
+            out = records + out
+            if limit is not None and len(out) >= limit:
+                break
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            self._fh.close()
+            self._write_index(self._seq, self._index)
@@ -0,0 +1,157 @@
+"""
+Headless self-play between hero and bot policies, sharded over worker processes.
+
+No store, sockets or LLM calls are involved; each shard drives its own TableManager
+with a deterministic seed, so a run is reproducible for a given seed and shard count.
+
+    cd backend
+    python -m app.selfplay --hands 1000000 --workers 8 --hero call --bot rule
+"""
+import argparse
+import json
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cfr import cfr_policy
+from .search import SearchBot
+from .table import Policy, TableManager, rule_based_policy
+
+
+STREETS = ("preflop", "flop", "turn", "river", "showdown")
+MAX_ACTIONS_PER_HAND = 200
+
+
+def calling_station(table: TableManager, actor: str) -> Tuple[str, Optional[int]]:
+    return "call", None
+
+
+def random_policy(table: TableManager, actor: str) -> Tuple[str, Optional[int]]:
+    stack = table.hero_stack if actor == "hero" else table.bot_stack
+    bet = table.hero_bet if actor == "hero" else table.bot_bet
+    roll = table.rng.random()
+    if roll < 0.15 and table.current_bet > bet:
+        return "fold", None
+    if roll < 0.3 and stack > 0:
+        return "raise", bet + stack if roll < 0.17 else table.current_bet + max(table.big_blind, table.pot // 2)
+    return "call", None
+
+
+POLICIES: Dict[str, Policy] = {
+    "rule": rule_based_policy,
+    "call": calling_station,
+    "random": random_policy,
+    "cfr": cfr_policy,
+    "search": SearchBot(budget_ms=10.0, seed=0),
+}
+
+
+def register_policy(name: str, policy: Policy) -> None:
+    POLICIES[name] = policy
+
+
+def _play_shard(hands: int, seed: int, hero: str, bot: str) -> Dict[str, Any]:
+    hero_policy = POLICIES[hero]
+    table = TableManager(seed=seed, store=None, bot_policy=POLICIES[bot])
+    big_blind = table.big_blind
+    total = total_sq = 0.0
+    ended = {street: 0 for street in STREETS}
+    illegal = aborted = 0
+    start = time.perf_counter()
+    for _ in range(hands):
+        start_stack = table.hero_stack + table.hero_bet
+        actions = 0
+        while not table.hand_over and actions < MAX_ACTIONS_PER_HAND:
+            action, amount = hero_policy(table, "hero")
+            events = table.player_action(action, amount)
+            if events and events[0].get("type") == "error":
+                illegal += 1
+                table.player_action("call", None)
+            actions += 1
+        if not table.hand_over:
+            aborted += 1
+        else:
+            net = (table.hero_stack - start_stack) / big_blind
+            total += net
+            total_sq += net * net
+            showdown = not (table.last_action or "").endswith("folded")
+            ended["showdown" if showdown else table.street] += 1
+        table.next_hand()
+    return {
+        "hands": hands - aborted,
+        "net_bb": total,
+        "net_bb_sq": total_sq,
+        "ended": ended,
+        "illegal_actions": illegal,
+        "aborted_hands": aborted,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def _merge(results: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    hands = sum(r["hands"] for r in results)
+    total = sum(r["net_bb"] for r in results)
+    total_sq = sum(r["net_bb_sq"] for r in results)
+    ended = {street: sum(r["ended"][street] for r in results) for street in STREETS}
+    mean = total / hands if hands else 0.0
+    variance = (total_sq / hands - mean * mean) * hands / (hands - 1) if hands > 1 else 0.0
+    half_width = 1.96 * math.sqrt(max(variance, 0.0) / hands) if hands else 0.0
+
+    # A hand "reaches" a street if it ended there or later.
+    reached: Dict[str, float] = {}
+    remaining = hands
+    for street in STREETS:
+        reached[street] = round(remaining / hands, 4) if hands else 0.0
+        remaining -= ended[street]
+    return {
+        "hands": hands,
+        "hands_per_sec": round(hands / elapsed, 1) if elapsed > 0 else None,
+        "bb_per_100": round(mean * 100, 3),
+        "bb_per_100_ci95": [round((mean - half_width) * 100, 3), round((mean + half_width) * 100, 3)],
+        "street_reach": reached,
+        "ended_on": ended,
+        "illegal_actions": sum(r["illegal_actions"] for r in results),
+        "aborted_hands": sum(r["aborted_hands"] for r in results),
+    }
+
+
+def run(hands: int, workers: int = 1, seed: int = 0, hero: str = "call", bot: str = "rule") -> Dict[str, Any]:
+    """Play `hands` hands split over `workers` shards (shard i uses seed + i) and aggregate hero's results."""
+    if hero not in POLICIES or bot not in POLICIES:
+        raise ValueError(f"Unknown policy; choose from {sorted(POLICIES)}")
+    shares = [hands // workers + (1 if i < hands % workers else 0) for i in range(workers)]
+    start = time.perf_counter()
+    if workers == 1:
+        results = [_play_shard(shares[0], seed, hero, bot)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_play_shard, shares, [seed + i for i in range(workers)], [hero] * workers, [bot] * workers))
+    report = _merge(results, time.perf_counter() - start)
+    report.update({"hero_policy": hero, "bot_policy": bot, "workers": workers, "seed": seed})
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Headless hero-vs-bot self-play.")
+    parser.add_argument("--hands", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--hero", default="call", choices=sorted(POLICIES))
+    parser.add_argument("--bot", default="rule", choices=sorted(POLICIES))
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+    report = run(args.hands, args.workers, args.seed, args.hero, args.bot)
+    if args.json:
+        print(json.dumps(report))
+        return
+    lo, hi = report["bb_per_100_ci95"]
+    print(f"{report['hands']:,} hands, {report['hands_per_sec']:,} hands/s ({args.hero} vs {args.bot})")
+    print(f"hero: {report['bb_per_100']:+.2f} bb/100 (95% CI {lo:+.2f} .. {hi:+.2f})")
+    print("street reach: " + ", ".join(f"{k} {v:.1%}" for k, v in report["street_reach"].items()))
+    if report["illegal_actions"] or report["aborted_hands"]:
+        print(f"illegal actions: {report['illegal_actions']}, aborted hands: {report['aborted_hands']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,94 +1,393 @@
 import asyncio
-from typing import Any, Dict, List, Optional
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
 
+from sqlalchemy import func, insert, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from .config import settings
+from .handhistory import FormatError, encode_hand
 from .orm import Action as ActionORM
 from .orm import Fact as FactORM
 from .orm import Hand as HandORM
 from .orm import Session as SessionORM
 from .orm import User as UserORM
+from .rollups import RollupBuffer, apply_rollups
+from .segments import SegmentLog
+
+
+log = logging.getLogger(__name__)
+
+
+KINDS = ("hands", "actions", "facts")
+
 
 class MemoryStore:
-    def __init__(self) -> None:
-        self.hands: List[Dict[str, Any]] = []
-        self.actions: List[Dict[str, Any]] = []
-        self.facts: List[Dict[str, Any]] = []
+    """
+    Recent records per user in fixed-size ring buffers (`caps` per kind), for at most
+    `max_users` users (least recently active evicted first). Records pushed out of a
+    buffer go to append-only `SegmentLog` files under `spill_dir` when one is set and
+    are discarded otherwise, so resident size is bounded by caps x max_users.
+    """
+
+    def __init__(
+        self,
+        caps: Optional[Dict[str, int]] = None,
+        max_users: int = 1000,
+        spill_dir: Optional[Path] = None,
+        segment_bytes: int = 4 << 20,
+    ) -> None:
+        self.caps = {"hands": 200, "actions": 2000, "facts": 200, **(caps or {})}
+        self.max_users = max_users
+        self._users: "OrderedDict[str, Dict[str, Deque[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.spilled = {kind: 0 for kind in KINDS}
+        self.segments: Optional[Dict[str, SegmentLog]] = None
+        if spill_dir is not None:
+            self.segments = {kind: SegmentLog(spill_dir, kind, segment_bytes) for kind in KINDS}
+
+    def _append(self, kind: str, payload: Dict[str, Any]) -> None:
+        user_id = str(payload.get("user_id") or "")
+        evicted: List[Tuple[str, str, Dict[str, Any]]] = []
+        with self._lock:
+            buffers = self._users.get(user_id)
+            if buffers is None:
+                buffers = self._users[user_id] = {k: deque() for k in KINDS}
+                if len(self._users) > self.max_users:
+                    old_id, old = self._users.popitem(last=False)
+                    evicted.extend((k, old_id, record) for k in KINDS for record in old[k])
+            else:
+                self._users.move_to_end(user_id)
+            buf = buffers[kind]
+            buf.append(payload)
+            if len(buf) > self.caps[kind]:
+                evicted.append((kind, user_id, buf.popleft()))
+        for k, uid, record in evicted:
+            self.spilled[k] += 1
+            if self.segments is not None:
+                self.segments[k].append(uid, record)
 
     def log_action(self, payload: Dict[str, Any]) -> None:
-        self.actions.append(payload)
+        self._append("actions", payload)
 
     def log_hand(self, payload: Dict[str, Any]) -> None:
-        self.hands.append(payload)
+        self._append("hands", payload)
 
     def log_fact(self, payload: Dict[str, Any]) -> None:
-        self.facts.append(payload)
+        self._append("facts", payload)
+
+    def recent(self, kind: str, user_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """The user's resident records of `kind`, oldest first."""
+        with self._lock:
+            buffers = self._users.get(user_id)
+            records = list(buffers[kind]) if buffers is not None else []
+        return records[-limit:] if limit else records
+
+    def history(self, kind: str, user_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """The user's last `limit` records of `kind`, reading back into spilled segments if needed."""
+        records = self.recent(kind, user_id, limit)
+        if len(records) < limit and self.segments is not None:
+            records = self.segments[kind].read(user_id, limit - len(records)) + records
+        return records
 
     def dump(self) -> Dict[str, List[Dict[str, Any]]]:
-        return {"hands": self.hands, "actions": self.actions, "facts": self.facts}
+        with self._lock:
+            return {kind: [r for buffers in self._users.values() for r in buffers[kind]] for kind in KINDS}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            resident = {kind: sum(len(b[kind]) for b in self._users.values()) for kind in KINDS}
+            users = len(self._users)
+        return {"users": users, "resident": resident, "spilled": dict(self.spilled), "caps": self.caps}
+
+    def close(self) -> None:
+        if self.segments is not None:
+            for segment in self.segments.values():
+                segment.close()
+
+
+class WriteBehindQueue:
+    """
+    Bounded write-behind buffer: rows are grouped per ORM table and written as one
+    multi-row INSERT per table when `batch_rows` are pending or every `flush_ms`.
+    `put` never blocks the caller; past `max_rows` pending the row is dropped and
+    counted, which together with the depth/high-water numbers in `stats()` is the
+    backpressure signal. Transient DB errors are retried with backoff.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        batch_rows: int = 500,
+        flush_ms: float = 250.0,
+        max_rows: int = 50_000,
+        retries: int = 3,
+    ) -> None:
+        self.session_factory = session_factory
+        self.batch_rows = batch_rows
+        self.flush_ms = flush_ms
+        self.max_rows = max_rows
+        self.retries = retries
+        self._pending: Dict[Any, List[Dict[str, Any]]] = {}
+        self._depth = 0
+        self._rollups = RollupBuffer()
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # put() is also called from executor threads (search-mode table actions).
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "failed": 0,
+            "batches": 0,
+            "retries": 0,
+            "high_water": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    def put(self, model: Any, row: Dict[str, Any], rollup: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Queue a row; False if the queue is full and the row was dropped. `rollup` (a
+        finished hand) is counted towards the rollups only if its row was queued, in the
+        same critical section, so both land in the same flush.
+        """
+        with self._lock:
+            if self._depth >= self.max_rows:
+                self._stats["dropped"] += 1
+                return False
+            self._pending.setdefault(model, []).append(row)
+            if rollup is not None:
+                self._rollups.add(rollup)
+            self._depth += 1
+            self._stats["enqueued"] += 1
+            if self._depth > self._stats["high_water"]:
+                self._stats["high_water"] = self._depth
+            full = self._depth == self.batch_rows
+        if full and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        return True
+
+    def start(self) -> None:
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._loop = asyncio.get_running_loop()
+            self._task = self._loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_ms / 1000.0)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Write everything pending now; returns rows written."""
+        with self._lock:
+            if not self._depth and not len(self._rollups):
+                return 0
+            pending, self._pending, self._depth = self._pending, {}, 0
+            rollups, self._rollups = self._rollups, RollupBuffer()
+        start = time.perf_counter()
+        written = 0
+        hands = pending.pop(HandORM, [])
+        if hands or len(rollups):
+            # Hands and the rollups they feed commit together, so a rollup rebuild (which locks
+            # both) sees either neither or both and never double-counts a hand.
+            async def hands_and_rollups(session: AsyncSession) -> None:
+                for i in range(0, len(hands), self.batch_rows):
+                    await session.execute(insert(HandORM), hands[i : i + self.batch_rows])
+                if len(rollups):
+                    await apply_rollups(session, rollups)
+
+            written += await self._write(HandORM.__tablename__, len(hands), hands_and_rollups)
+        for model, rows in pending.items():
+            for i in range(0, len(rows), self.batch_rows):
+                batch = rows[i : i + self.batch_rows]
+                written += await self._write(model.__tablename__, len(batch), lambda session: session.execute(insert(model), batch))
+        self._stats["last_flush_ms"] = round((time.perf_counter() - start) * 1000.0, 2)
+        return written
+
+    async def _write(self, label: str, count: int, statement: Callable[[AsyncSession], Awaitable[Any]]) -> int:
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.session_factory() as session:
+                    await statement(session)
+                    await session.commit()
+            except OperationalError as exc:
+                # Locked/busy database or a dropped connection: back off and try the batch again.
+                if attempt == self.retries:
+                    log.error("Dropping %d %s rows after %d retries: %s", count, label, attempt, exc)
+                    break
+                self._stats["retries"] += 1
+                await asyncio.sleep(0.05 * 2**attempt)
+            except Exception as exc:
+                log.error("Dropping %d %s rows: %s", count, label, exc)
+                break
+            else:
+                self._stats["batches"] += 1
+                self._stats["written"] += count
+                return count
+        self._stats["failed"] += count
+        return 0
+
+    async def drain(self) -> int:
+        """Stop the flusher and write out every pending row (application shutdown)."""
+        self._closing = True
+        if self._task is not None:
+            # Let the flusher finish its current batch rather than cancelling it mid-write.
+            self._wake.set()
+            await self._task
+            self._task = None
+        return await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"pending": self._depth, "max_rows": self.max_rows, **self._stats}
+
+
+def _hand_row(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "session_id": payload.get("session_id"),
+        "user_id": payload.get("user_id"),
+        "hand_number": payload.get("hand_id", 0),
+        "table_id": payload.get("table_id"),
+        "board": " ".join(payload.get("board") or []),
+        "hero_hand": " ".join(payload.get("hero_hand") or []),
+        "bot_hand": " ".join(payload.get("bot_hand") or []),
+        "winner": payload.get("winner"),
+        "reason": payload.get("reason"),
+        "hero_stack": payload.get("hero_stack", 0),
+        "bot_stack": payload.get("bot_stack", 0),
+        "hand_seed": payload.get("hand_seed"),
+        "deck_fingerprint": payload.get("deck_fingerprint"),
+        "hero_start_stack": payload.get("hero_start_stack"),
+        "bot_start_stack": payload.get("bot_start_stack"),
+        "actions": payload.get("actions"),
+        "history": _encode_history(payload),
+    }
+
+
+def _encode_history(payload: Dict[str, Any]) -> Optional[bytes]:
+    # Ring (multiway) hands have no compact encoding yet; they keep the readable columns only.
+    if "bot_hand" not in payload or payload.get("hand_seed") is None:
+        return None
+    try:
+        return encode_hand(payload)
+    except FormatError as exc:
+        log.warning("Could not encode hand %s: %s", payload.get("hand_id"), exc)
+        return None
+
+
+def _action_row(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "hand_id": payload.get("hand_id"),
+        "hand_seed": payload.get("hand_seed"),
+        "user_id": payload.get("user_id"),
+        "actor": payload.get("actor", ""),
+        "action": payload.get("action", ""),
+        "amount": payload.get("amount"),
+        "street": payload.get("street"),
+        "action_index": payload.get("action_index"),
+        # Full snapshots are optional: any state can be rebuilt from the hand's replay record.
+        "state": payload.get("state") if settings.store_action_state else None,
+    }
+
+
+def _fact_row(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "hand_id": payload.get("hand_id"),
+        "user_id": payload.get("user_id"),
+        "facts": payload.get("facts") or {},
+        "summary": "\n".join(payload.get("summary_lines") or []),
+    }
 
 
 class DbStore:
-    def __init__(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession], writer: Optional[WriteBehindQueue] = None) -> None:
         self.session_factory = session_factory
+        self.writer = writer or WriteBehindQueue(session_factory)
+        # user_id -> (email, name) last upserted by this process, LRU-bounded.
+        self.known_users: "OrderedDict[str, Tuple[Optional[str], Optional[str]]]" = OrderedDict()
+        self.known_users_max = settings.known_users_cache_size
 
-    async def log_user(self, user_id: str, email: Optional[str], name: Optional[str]) -> None:
-        async with self.session_factory() as session:
-            existing = await session.get(UserORM, user_id)
-            if existing:
-                return
-            session.add(UserORM(id=user_id, email=email, name=name))
-            await session.commit()
+    async def log_user(self, user_id: str, email: Optional[str], name: Optional[str]) -> bool:
+        """
+        Upsert the user row in one statement, unless this process already wrote the same
+        profile. Returns whether the database was touched.
+        """
+        profile = (email or None, name or None)
+        known = self.known_users.get(user_id)
+        if known is not None and profile in (known, (None, None)):
+            self.known_users.move_to_end(user_id)
+            return False
+        # Claimed before the await, so a burst of logins for one user writes once.
+        self.known_users[user_id] = profile
+        self.known_users.move_to_end(user_id)
+        while len(self.known_users) > self.known_users_max:
+            self.known_users.popitem(last=False)
+        try:
+            async with self.session_factory() as session:
+                upsert = pg_insert if session.bind.dialect.name == "postgresql" else sqlite_insert
+                stmt = upsert(UserORM).values(id=user_id, email=profile[0], name=profile[1])
+                table = UserORM.__table__
+                # A login without a profile (dev login, token refresh) keeps the stored one.
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["id"],
+                    set_={
+                        "email": func.coalesce(stmt.excluded.email, table.c.email),
+                        "name": func.coalesce(stmt.excluded.name, table.c.name),
+                    },
+                )
+                await session.execute(stmt)
+                await session.commit()
+        except Exception:
+            self.known_users.pop(user_id, None)
+            raise
+        return True
 
     async def log_session(self, user_id: str) -> int:
         async with self.session_factory() as session:
-            sess = SessionORM(user_id=user_id)
-            session.add(sess)
-            await session.flush()
-            await session.commit()
-            return sess.id
-
-    async def log_hand(self, payload: Dict[str, Any]) -> None:
-        async with self.session_factory() as session:
-            hand = HandORM(
-                session_id=payload.get("session_id"),
-                user_id=payload.get("user_id"),
-                hand_number=payload.get("hand_id", 0),
-                board=" ".join(payload.get("board") or []),
-                hero_hand=" ".join(payload.get("hero_hand") or []),
-                bot_hand=" ".join(payload.get("bot_hand") or []),
-                winner=payload.get("winner"),
-                reason=payload.get("reason"),
-                hero_stack=payload.get("hero_stack", 0),
-                bot_stack=payload.get("bot_stack", 0),
+            session_id = await session.scalar(
+                insert(SessionORM).values(user_id=user_id, started_at=datetime.utcnow()).returning(SessionORM.id)
             )
-            session.add(hand)
             await session.commit()
+            return session_id
 
-    async def log_action(self, payload: Dict[str, Any]) -> None:
+    async def end_session(self, session_id: int) -> None:
         async with self.session_factory() as session:
-            action = ActionORM(
-                hand_id=payload.get("hand_id"),
-                user_id=payload.get("user_id"),
-                actor=payload.get("actor", ""),
-                action=payload.get("action", ""),
-                amount=payload.get("amount"),
-                street=payload.get("street"),
-                state=payload.get("state"),
+            await session.execute(
+                update(SessionORM)
+                .where(SessionORM.id == session_id, SessionORM.ended_at.is_(None))
+                .values(ended_at=datetime.utcnow())
             )
-            session.add(action)
             await session.commit()
 
-    async def log_fact(self, payload: Dict[str, Any]) -> None:
-        async with self.session_factory() as session:
-            fact = FactORM(
-                hand_id=payload.get("hand_id"),
-                user_id=payload.get("user_id"),
-                facts=payload.get("facts") or {},
-                summary="\n".join(payload.get("summary_lines") or []),
-            )
-            session.add(fact)
-            await session.commit()
+    # Gameplay rows go through the write-behind queue.
+
+    def log_hand(self, payload: Dict[str, Any]) -> None:
+        # The rollup delta rides with the row, so a dropped hand is never counted.
+        self.writer.put(HandORM, _hand_row(payload), rollup=payload)
+
+    def log_action(self, payload: Dict[str, Any]) -> None:
+        # The hand's history blob already holds every action; per-action rows are opt-in.
+        if settings.store_action_rows:
+            self.writer.put(ActionORM, _action_row(payload))
+
+    def log_fact(self, payload: Dict[str, Any]) -> None:
+        if settings.store_facts:
+            self.writer.put(FactORM, _fact_row(payload))
 
 
 class StoreWrapper:
@@ -96,36 +395,80 @@ class StoreWrapper:
     Provides a unified interface that can wrap async DB store or memory store.
     """
 
-    def __init__(self, db_store: Optional[DbStore] = None, memory_store: Optional[MemoryStore] = None) -> None:
+    def __init__(
+        self,
+        db_store: Optional[DbStore] = None,
+        memory_store: Optional[MemoryStore] = None,
+        opponent_model: Optional[Any] = None,
+    ) -> None:
         self.db_store = db_store
         self.memory_store = memory_store or MemoryStore()
+        self.opponent_model = opponent_model
+
+        self._tasks: Set[asyncio.Task] = set()
 
     def _fire_and_forget(self, coro) -> None:
         try:
-            asyncio.get_running_loop().create_task(coro)
+            task = asyncio.get_running_loop().create_task(coro)
         except RuntimeError:
-            pass
+            coro.close()
+            return
+        # Held until done so drain() can wait for it and it is not garbage-collected mid-flight.
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def start(self) -> None:
+        if self.db_store:
+            self.db_store.writer.start()
+
+    async def drain(self) -> None:
+        """Finish in-flight user/session writes and flush the write-behind queue."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.db_store:
+            written = await self.db_store.writer.drain()
+            log.info("Drained %d queued rows on shutdown", written)
+        self.memory_store.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "db": {**self.db_store.writer.stats(), "known_users": len(self.db_store.known_users)} if self.db_store else None,
+            "memory": self.memory_store.stats(),
+        }
 
     def log_user(self, user_id: str, email: Optional[str], name: Optional[str]) -> None:
         if self.db_store:
             self._fire_and_forget(self.db_store.log_user(user_id, email, name))
-        self.memory_store.log_action({"actor": "system", "action": "user_seen", "user_id": user_id})
 
-    def log_session(self, user_id: str) -> None:
-        if self.db_store:
-            self._fire_and_forget(self.db_store.log_session(user_id))
+    async def start_session(self, user_id: str) -> Optional[int]:
+        """Open a DB session row for a connection; its id is stamped on the hands played in it."""
+        if not self.db_store:
+            return None
+        try:
+            # Socket tokens outlive a restart, so make sure the user row exists (free once cached).
+            await self.db_store.log_user(user_id, None, None)
+            return await self.db_store.log_session(user_id)
+        except Exception as exc:
+            log.warning("Could not record session start for %s: %s", user_id, exc)
+            return None
+
+    def end_session(self, session_id: Optional[int]) -> None:
+        if self.db_store and session_id is not None:
+            self._fire_and_forget(self.db_store.end_session(session_id))
 
     def log_hand(self, payload: Dict[str, Any]) -> None:
         if self.db_store:
-            self._fire_and_forget(self.db_store.log_hand(payload))
+            self.db_store.log_hand(payload)
         self.memory_store.log_hand(payload)
 
     def log_action(self, payload: Dict[str, Any]) -> None:
         if self.db_store:
-            self._fire_and_forget(self.db_store.log_action(payload))
+            self.db_store.log_action(payload)
         self.memory_store.log_action(payload)
+        if self.opponent_model is not None:
+            self.opponent_model.observe(payload)
 
     def log_fact(self, payload: Dict[str, Any]) -> None:
         if self.db_store:
-            self._fire_and_forget(self.db_store.log_fact(payload))
+            self.db_store.log_fact(payload)
         self.memory_store.log_fact(payload)
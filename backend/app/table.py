@@ -1,20 +1,172 @@
+import copy
+import hashlib
 import json
+import pickle
 import random
-from typing import Any, Dict, List, Optional
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
-from .eval import decide_winner
+from .eval import CARD_INDEX, CARD_STRINGS, showdown
+
+
+DEFAULT_TABLE_ID = "main"
+
+# A policy picks (action, amount) for `actor` ("hero" or "bot") from the table state.
+Policy = Callable[["TableManager", str], Tuple[str, Optional[int]]]
+
+
+RANKS = ["2", "3", "4", "5", "6", "7", "8", "9", "T", "J", "Q", "K", "A"]
+SUITS = ["h", "d", "c", "s"]
+# Unshuffled deck order as eval ints; shuffling it deals the same cards as make_deck for a seed.
+_DECK_ORDER = [CARD_INDEX[r + s] for s in SUITS for r in RANKS]
 
 
 def make_deck(rng: random.Random) -> List[str]:
-    ranks = ["2", "3", "4", "5", "6", "7", "8", "9", "T", "J", "Q", "K", "A"]
-    suits = ["h", "d", "c", "s"]
-    deck = [r + s for s in suits for r in ranks]
+    deck = [r + s for s in SUITS for r in RANKS]
     rng.shuffle(deck)
     return deck
 
 
-class TableManager:
-    def __init__(self, seed: Optional[int] = None, store: Optional[Any] = None, hero_id: str = "hero", bot_id: str = "bot") -> None:
+def make_int_deck(rng: random.Random) -> List[int]:
+    deck = _DECK_ORDER.copy()
+    rng.shuffle(deck)
+    return deck
+
+
+def rule_based_policy(table: "TableManager", actor: str) -> Tuple[str, Optional[int]]:
+    """The original bot: random aggression that ignores its own cards."""
+    stack = table.hero_stack if actor == "hero" else table.bot_stack
+    bet = table.hero_bet if actor == "hero" else table.bot_bet
+    to_call = table.current_bet - bet
+    aggressive = table.rng.random() < 0.25
+    pot_odds = to_call / (table.pot + to_call) if to_call > 0 else 0
+    if to_call == 0:
+        if aggressive and stack > 0:
+            return "bet", min(stack, max(4, int(table.pot * 0.6)))
+        return "check", None
+    # Facing a bet/raise.
+    if to_call > stack * 0.6 and table.rng.random() < 0.4:
+        return "fold", None
+    if pot_odds < 0.22 and table.rng.random() < 0.3:
+        # Fold some vs large pot-odds (tighten up)
+        return "fold", None
+    if aggressive and stack > to_call + 4:
+        return "raise", min(stack + bet, table.current_bet + max(4, to_call * 2))
+    return "call", None
+
+
+ACTION_CODES = {"fold": "f", "check": "k", "call": "c", "bet": "b", "raise": "r"}
+ACTION_NAMES = {code: name for name, code in ACTION_CODES.items()}
+
+
+def encode_action(actor: str, action: str, amount: Optional[int]) -> str:
+    """Compact token such as 'hc' (hero calls) or 'br20' (bot raises, requested 20)."""
+    return f"{actor[0]}{ACTION_CODES[action]}{'' if amount is None else amount}"
+
+
+def decode_action(token: str) -> Tuple[str, str, Optional[int]]:
+    actor = "hero" if token[0] == "h" else "bot"
+    return actor, ACTION_NAMES[token[1]], int(token[2:]) if len(token) > 2 else None
+
+
+def action_line(actions: Iterable[Tuple[bool, str]]) -> str:
+    """
+    Hero-relative line such as 'HrVcHc' from (is_hero, action code) pairs. Folds and
+    checks are left out and a run of villain calls counts once, so multiway lines stay few.
+    """
+    parts: List[str] = []
+    for hero, code in actions:
+        if code in "bcr":
+            part = ("H" if hero else "V") + ("c" if code == "c" else "r")
+            if part != "Vc" or not parts or parts[-1] != "Vc":
+                parts.append(part)
+    return "".join(parts)
+
+
+# Attributes rebuilt on resume rather than serialized.
+_TRANSIENT = {"store", "bot_policy", "policies", "_snapshot", "_snapshot_full"}
+
+
+class Hibernating(ABC):
+    """`hibernate` / `resume` for the slotted table classes (heads-up and ring)."""
+
+    __slots__ = ()
+
+    def hibernate(self) -> bytes:
+        """Compact serialized table (hand in progress included) without its store, bot policies or caches."""
+        state = {name: getattr(self, name) for name in self.__slots__ if name not in _TRANSIENT}
+        # A Mersenne Twister state is ~2.5 KB of noise; keep seeds and rebuild the generators instead.
+        state["rng"] = self.rng.getrandbits(63)
+        del state["hand_rng"]
+        return zlib.compress(pickle.dumps(state, pickle.HIGHEST_PROTOCOL))
+
+    @classmethod
+    def resume(cls, data: bytes, store: Optional[Any] = None, bot_policy: Optional[Callable] = None) -> Any:
+        table = cls.__new__(cls)
+        for name, value in pickle.loads(zlib.decompress(data)).items():
+            setattr(table, name, value)
+        table.rng = random.Random(table.rng)
+        # Re-shuffling from the hand seed leaves hand_rng where the live table had it (showdown ties only draw later).
+        table.hand_rng = random.Random(table.hand_seed)
+        make_int_deck(table.hand_rng)
+        table.store = store
+        table._attach(bot_policy)
+        return table
+
+    @abstractmethod
+    def _attach(self, bot_policy: Optional[Callable]) -> None:
+        """Rebuild the transient attributes after `resume`."""
+
+
+class TableManager(Hibernating):
+    __slots__ = (
+        "rng",
+        "starting_stack",
+        "small_blind",
+        "big_blind",
+        "hand_id",
+        "hero_stack",
+        "bot_stack",
+        "store",
+        "hero_id",
+        "bot_id",
+        "table_id",
+        "session_id",
+        "bot_policy",
+        "street",
+        "deck",
+        "hero_cards",
+        "bot_cards",
+        "board_cards",
+        "pot",
+        "hero_bet",
+        "bot_bet",
+        "hand_over",
+        "winner",
+        "last_action",
+        "to_act",
+        "hand_seed",
+        "hand_rng",
+        "deck_fingerprint",
+        "hero_start_stack",
+        "bot_start_stack",
+        "action_log",
+        "preflop_actions",
+        "version",
+        "_snapshot",
+        "_snapshot_full",
+    )
+
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        store: Optional[Any] = None,
+        hero_id: str = "hero",
+        bot_id: str = "bot",
+        bot_policy: Optional[Policy] = None,
+        table_id: str = DEFAULT_TABLE_ID,
+    ) -> None:
         self.rng = random.Random(seed)
         self.starting_stack = 200
         self.small_blind = 1
@@ -25,19 +177,36 @@ class TableManager:
         self.store = store
         self.hero_id = hero_id
         self.bot_id = bot_id
+        self.table_id = table_id
+        self.session_id: Optional[int] = None  # the connection's DB session, stamped on logged hands
+        self.bot_policy: Policy = bot_policy or rule_based_policy
+        # Bumped on every state change; snapshots are cached per version.
+        self.version = 0
+        self._snapshot: Optional[Tuple[int, Dict[str, Any]]] = None
+        self._snapshot_full: Optional[Tuple[int, Dict[str, Any]]] = None
         self._init_hand()
 
-    def _init_hand(self) -> None:
+    def _init_hand(self, hand_seed: Optional[int] = None) -> None:
+        self.version += 1
         self.hand_id += 1
         if self.hero_stack < self.big_blind:
             self.hero_stack = self.starting_stack
         if self.bot_stack < self.big_blind:
             self.bot_stack = self.starting_stack
         self.street = "preflop"
-        self.deck = make_deck(self.rng)
-        self.hero_hand = [self.deck.pop(), self.deck.pop()]
-        self.bot_hand = [self.deck.pop(), self.deck.pop()]
-        self.board: List[str] = []
+        # Each hand gets its own seed so it can be replayed from (seed, start stacks, action log);
+        # hand_rng only shuffles the deck and breaks showdown ties.
+        self.hand_seed = self.rng.getrandbits(63) if hand_seed is None else hand_seed
+        self.hand_rng = random.Random(self.hand_seed)
+        self.deck = make_int_deck(self.hand_rng)
+        self.deck_fingerprint = hashlib.blake2b(bytes(self.deck), digest_size=8).hexdigest()
+        self.hero_start_stack = self.hero_stack
+        self.bot_start_stack = self.bot_stack
+        self.action_log: List[str] = []
+        self.preflop_actions: Optional[int] = None  # tokens logged preflop, set once the flop is dealt
+        self.hero_cards = [self.deck.pop(), self.deck.pop()]
+        self.bot_cards = [self.deck.pop(), self.deck.pop()]
+        self.board_cards: List[int] = []
         self.pot = 0
         self.hero_bet = 0
         self.bot_bet = 0
@@ -53,12 +222,52 @@ class TableManager:
         self.pot = self.small_blind + self.big_blind
         self.to_act = "hero"  # hero acts first preflop in HU as button/SB
 
+    def fork(self, seed: Optional[int] = None) -> "TableManager":
+        """Independent copy of the current hand for simulation: no store, fresh RNGs, own card lists."""
+        other = copy.copy(self)
+        other.store = None
+        other.rng = random.Random(seed)
+        other.hand_rng = random.Random(seed)
+        other.deck = list(self.deck)
+        other.hero_cards = list(self.hero_cards)
+        other.bot_cards = list(self.bot_cards)
+        other.board_cards = list(self.board_cards)
+        other.action_log = list(self.action_log)
+        return other
+
+    def _attach(self, bot_policy: Optional[Policy]) -> None:
+        self.bot_policy = bot_policy or rule_based_policy
+        self._snapshot = self._snapshot_full = None
+
     @property
     def current_bet(self) -> int:
         return max(self.hero_bet, self.bot_bet)
 
+    @property
+    def hero_hand(self) -> List[str]:
+        return [CARD_STRINGS[c] for c in self.hero_cards]
+
+    @property
+    def bot_hand(self) -> List[str]:
+        return [CARD_STRINGS[c] for c in self.bot_cards]
+
+    @property
+    def board(self) -> List[str]:
+        return [CARD_STRINGS[c] for c in self.board_cards]
+
+    @property
+    def preflop_line(self) -> str:
+        return action_line((token[0] == "h", token[1]) for token in self.action_log[: self.preflop_actions])
+
     def snapshot(self, hide_bot: bool = True) -> Dict[str, Any]:
-        return {
+        """
+        Current public state. The dict is cached until the next state change and shared
+        between callers, so treat it as read-only.
+        """
+        cached = self._snapshot if hide_bot else self._snapshot_full
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        snap = {
             "hand_id": self.hand_id,
             "street": self.street,
             "pot": self.pot,
@@ -67,33 +276,41 @@ class TableManager:
             "hero_bet": self.hero_bet,
             "bot_bet": self.bot_bet,
             "current_bet": self.current_bet,
-            "board": self.board.copy(),
-            "hero_hand": self.hero_hand.copy(),
-            "bot_hand": ["XX", "XX"] if hide_bot else self.bot_hand.copy(),
+            "board": self.board,
+            "hero_hand": self.hero_hand,
+            "bot_hand": ["XX", "XX"] if hide_bot else self.bot_hand,
             "to_act": self.to_act,
             "last_action": self.last_action,
             "hand_over": self.hand_over,
             "winner": self.winner,
+            "preflop_line": self.preflop_line,
         }
+        if hide_bot:
+            self._snapshot = (self.version, snap)
+        else:
+            self._snapshot_full = (self.version, snap)
+        return snap
 
     def _progress_street(self) -> Optional[Dict[str, Any]]:
+        self.version += 1
         self.hero_bet = 0
         self.bot_bet = 0
         if self.street == "preflop":
-            if len(self.board) < 3:
-                self.board.extend([self.deck.pop(), self.deck.pop(), self.deck.pop()])
+            self.preflop_actions = len(self.action_log)
+            if len(self.board_cards) < 3:
+                self.board_cards.extend([self.deck.pop(), self.deck.pop(), self.deck.pop()])
             self.street = "flop"
             self.to_act = "hero"
             return None
         elif self.street == "flop":
-            if len(self.board) < 4:
-                self.board.append(self.deck.pop())
+            if len(self.board_cards) < 4:
+                self.board_cards.append(self.deck.pop())
             self.street = "turn"
             self.to_act = "hero"
             return None
         elif self.street == "turn":
-            if len(self.board) < 5:
-                self.board.append(self.deck.pop())
+            if len(self.board_cards) < 5:
+                self.board_cards.append(self.deck.pop())
             self.street = "river"
             self.to_act = "hero"
             return None
@@ -102,9 +319,10 @@ class TableManager:
 
     def _resolve_showdown(self) -> Dict[str, Any]:
         # If an all-in happened early, run out the remaining board cards before scoring.
-        while len(self.board) < 5:
-            self.board.append(self.deck.pop())
-        result = decide_winner(self.hero_hand, self.bot_hand, self.board, self.rng)
+        self.version += 1
+        while len(self.board_cards) < 5:
+            self.board_cards.append(self.deck.pop())
+        result = showdown(self.hero_cards, self.bot_cards, self.board_cards, self.hand_rng)
         return self._end_hand(winner=result["winner"], reason=result["reason"])
 
     def _award_pot(self) -> None:
@@ -115,6 +333,7 @@ class TableManager:
         self.pot = 0
 
     def _end_hand(self, winner: str, reason: str) -> Dict[str, Any]:
+        self.version += 1
         pot_awarded = self.pot
         self.winner = winner
         self.last_action = reason
@@ -125,18 +344,31 @@ class TableManager:
             "winner": winner,
             "reason": reason,
             "payout": pot_awarded,
-            "board": self.board.copy(),
-            "hero_hand": self.hero_hand.copy(),
-            "bot_hand": self.bot_hand.copy(),
+            "board": self.board,
+            "hero_hand": self.hero_hand,
+            "bot_hand": self.bot_hand,
             "hero_stack": self.hero_stack,
             "bot_stack": self.bot_stack,
             "hand_id": self.hand_id,
             "user_id": self.hero_id,
         }
         if self.store is not None:
-            self.store.log_hand(summary)
+            # The replay record stays server-side: hand seeds must not reach the client.
+            self.store.log_hand({**summary, **self.hand_record(), "session_id": self.session_id})
         return summary
 
+    def hand_record(self) -> Dict[str, Any]:
+        """Everything needed to rebuild the current hand with `replay.HandReplay`."""
+        return {
+            "hand_id": self.hand_id,
+            "table_id": self.table_id,
+            "hand_seed": self.hand_seed,
+            "deck_fingerprint": self.deck_fingerprint,
+            "hero_start_stack": self.hero_start_stack,
+            "bot_start_stack": self.bot_start_stack,
+            "actions": " ".join(self.action_log),
+        }
+
     def _apply_action(self, actor: str, action: str, amount: Optional[int]) -> Dict[str, Any]:
         other = "bot" if actor == "hero" else "hero"
         actor_bet = self.hero_bet if actor == "hero" else self.bot_bet
@@ -165,15 +397,19 @@ class TableManager:
             if action in ("bet",) and (amount is None or amount < self.big_blind):
                 return {"type": "error", "message": f"Bet must be at least {self.big_blind}."}
 
+        requested = amount
         max_total_bet = actor_bet + actor_stack
         if action in ("bet", "raise") and amount is not None:
             # Allow oversize inputs; we’ll cap the actual contribution to the stack below.
             amount = min(amount, max_total_bet)
 
         if action == "fold":
+            self.action_log.append(encode_action(actor, action, None))
             summary = self._end_hand(winner=other, reason=f"{actor} folded")
             return summary
 
+        self.version += 1
+
         if action in ("call", "check"):
             to_call = max(0, current - actor_bet)
             pay = min(to_call, actor_stack)
@@ -193,12 +429,22 @@ class TableManager:
             self.last_action = f"{actor} {action} to {actor_bet}"
         else:
             return {"type": "error", "message": f"Unknown action {action}"}
+        self.action_log.append(encode_action(actor, action, requested))
 
         if actor == "hero":
             self.hero_stack, self.hero_bet = actor_stack, actor_bet
         else:
             self.bot_stack, self.bot_bet = actor_stack, actor_bet
 
+        if action == "call" and actor_stack == 0 and actor_bet < self.current_bet:
+            # Called all-in for less: return the uncalled part of the bet so the street can close.
+            excess = self.current_bet - actor_bet
+            if other == "hero":
+                self.hero_stack, self.hero_bet = self.hero_stack + excess, self.hero_bet - excess
+            else:
+                self.bot_stack, self.bot_bet = self.bot_stack + excess, self.bot_bet - excess
+            self.pot -= excess
+
         # Decide next actor.
         if action in ("bet", "raise"):
             self.to_act = other
@@ -212,6 +458,7 @@ class TableManager:
 
     def player_action(self, action: str, amount: Optional[int] = None) -> List[Dict[str, Any]]:
         events: List[Dict[str, Any]] = []
+        logged = len(self.action_log)
         res = self._apply_action("hero", action, amount)
         if self.store is not None and isinstance(res, dict):
             self.store.log_action(
@@ -221,9 +468,14 @@ class TableManager:
                     "amount": amount,
                     "state": self.snapshot(),
                     "hand_id": self.hand_id,
+                    "hand_seed": self.hand_seed,
                     "street": self.street,
                     "user_id": self.hero_id,
-                    "hand_id": self.hand_id,
+                    "hero_id": self.hero_id,
+                    "table_id": self.table_id,
+                    "action_index": logged,  # position of the action's token in action_log
+                    # Normalised action token (None if the action was rejected).
+                    "token": self.action_log[-1] if len(self.action_log) > logged else None,
                 }
             )
         events.append(res)
@@ -248,6 +500,7 @@ class TableManager:
 
         # Bot acts if it's their turn and hand still live.
         if self.to_act == "bot" and not self.hand_over:
+            logged = len(self.action_log)
             bot_event = self._bot_action()
             bot_action_label = bot_event.get("bot_action") or self.last_action or bot_event.get("type") or "bot acted"
             if self.store is not None and isinstance(bot_event, dict):
@@ -257,9 +510,13 @@ class TableManager:
                         "action": bot_action_label,
                         "state": self.snapshot(),
                         "hand_id": self.hand_id,
+                        "hand_seed": self.hand_seed,
                         "street": self.street,
                         "user_id": self.bot_id,
-                        "hand_id": self.hand_id,
+                        "hero_id": self.hero_id,
+                        "table_id": self.table_id,
+                        "action_index": logged,
+                        "token": self.action_log[-1] if len(self.action_log) > logged else None,
                     }
                 )
             # Ensure bot event carries actor/action metadata for UI.
@@ -301,27 +558,8 @@ class TableManager:
         return events
 
     def _bot_action(self) -> Dict[str, Any]:
-        to_call = self.current_bet - self.bot_bet
-        aggressive = self.rng.random() < 0.25
-        pot_odds = to_call / (self.pot + to_call) if to_call > 0 else 0
-        if to_call == 0:
-            if aggressive and self.bot_stack > 0:
-                size = min(self.bot_stack, max(4, int(self.pot * 0.6)))
-                result = self._apply_action("bot", "bet", size)
-            else:
-                result = self._apply_action("bot", "check", None)
-        else:
-            # Facing a bet/raise.
-            if to_call > self.bot_stack * 0.6 and self.rng.random() < 0.4:
-                result = self._apply_action("bot", "fold", None)
-            elif pot_odds < 0.22 and self.rng.random() < 0.3:
-                # Fold some vs large pot-odds (tighten up)
-                result = self._apply_action("bot", "fold", None)
-            elif aggressive and self.bot_stack > to_call + 4:
-                raise_to = min(self.bot_stack + self.bot_bet, self.current_bet + max(4, to_call * 2))
-                result = self._apply_action("bot", "raise", raise_to)
-            else:
-                result = self._apply_action("bot", "call", None)
+        action, amount = self.bot_policy(self, "bot")
+        result = self._apply_action("bot", action, amount)
 
         if result.get("type") == "state_update":
             result["actor"] = "bot"
@@ -0,0 +1,180 @@
+"""
+Board texture and per-hand draw features.
+
+Board textures are computed once per suit-isomorphism class of the board (every flop,
+turn and river maps onto its canonical form) and then served from the cache. Per-hand
+outs come from 13-bit rank-mask tables and 52-bit card masks, so a decision costs a few
+table lookups.
+"""
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .canonical import iso_cached
+from .eval import CARD_STRINGS, HAND_LABELS, RANKS, cards_to_ints, evaluate, evaluate_batch, hand_category, straight_high
+from .preflop import COMBO_CARDS
+
+
+def _completers(mask: int) -> int:
+    """Ranks not in `mask` that would complete a straight (0 if `mask` already has one)."""
+    if straight_high(mask) >= 0:
+        return 0
+    out = 0
+    for r in range(13):
+        if not mask >> r & 1 and straight_high(mask | 1 << r) >= 0:
+            out |= 1 << r
+    return out
+
+
+STRAIGHT_COMPLETERS: List[int] = [_completers(m) for m in range(8192)]
+
+
+def _ace_low(mask: int) -> int:
+    """14-bit mask with the ace at both ends: bit 0 is ace-low, bit r+1 is rank r."""
+    return (mask << 1) | (mask >> 12 & 1)
+
+
+def _open_ended(mask: int, completers: int) -> bool:
+    """Four consecutive ranks in `mask` with a completer directly below and above (not a double gutshot)."""
+    ranks, outs = _ace_low(mask), _ace_low(completers)
+    for low in range(1, 10):
+        run = 0xF << low
+        if ranks & run == run and outs >> (low - 1) & 1 and outs >> (low + 4) & 1:
+            return True
+    return False
+
+# The 10 five-rank straight windows (wheel first) as 13-bit masks.
+STRAIGHT_WINDOWS: List[int] = [0x100F] + [0x1F << low for low in range(9)]
+
+# 52-bit card mask of every card of a rank / suit.
+RANK_CARDS: List[int] = [0xF << (r * 4) for r in range(13)]
+SUIT_CARDS: List[int] = [sum(1 << (r * 4 + s) for r in range(13)) for s in range(4)]
+
+
+def _rank_mask(cards: Sequence[int]) -> int:
+    mask = 0
+    for c in cards:
+        mask |= 1 << (c >> 2)
+    return mask
+
+
+def _suit_counts(cards: Sequence[int]) -> List[int]:
+    counts = [0, 0, 0, 0]
+    for c in cards:
+        counts[c & 3] += 1
+    return counts
+
+
+def _nut_value(board: Sequence[int]) -> int:
+    live = COMBO_CARDS[~np.isin(COMBO_CARDS, list(board)).any(axis=1)]
+    rows = np.hstack([live, np.broadcast_to(np.array(board, dtype=np.int64), (len(live), len(board)))])
+    return int(evaluate_batch(rows).max())
+
+
+@iso_cached(maxsize=200_000)
+def _texture(hole: Sequence[str], board: Sequence[str]) -> Dict:
+    cards = cards_to_ints(board)
+    ranks = [c >> 2 for c in cards]
+    mask = _rank_mask(cards)
+    suits = _suit_counts(cards)
+    max_suit = max(suits)
+    draws_left = 0 < len(cards) < 5
+
+    # Distinct board ranks inside the best straight window: 3+ means two hole cards can make a straight.
+    window_hits = max(bin(mask & w).count("1") for w in STRAIGHT_WINDOWS) if cards else 0
+    straight_possible = window_hits >= 3
+    straight_draw_possible = draws_left and window_hits >= 2
+    connectedness = round(window_hits / min(len(set(ranks)), 5), 2) if cards else 0.0
+
+    flush_score = 1.0 if max_suit >= 3 else (0.5 if draws_left and max_suit == 2 else 0.0)
+    straight_score = 1.0 if straight_possible else (0.5 if straight_draw_possible else 0.0)
+    paired = len(ranks) != len(set(ranks))
+    wetness = round((flush_score + straight_score) / 2 * (0.75 if paired else 1.0), 2)
+
+    nut_value = _nut_value(cards) if len(cards) >= 3 else 0
+    return {
+        "paired_board": paired,
+        "trips_board": any(ranks.count(r) >= 3 for r in set(ranks)),
+        "flush_draw_possible": max_suit >= 3,  # 3+ to one suit on board
+        "straight_draw_possible": straight_draw_possible,
+        "straight_possible": straight_possible,
+        "monotone_board": len(cards) > 0 and max_suit == len(cards),
+        "two_tone_board": max_suit == 2,
+        "rainbow_board": len(cards) > 0 and max_suit == 1,
+        "high_card": RANKS[max(ranks)] if ranks else None,
+        "connectedness": connectedness,
+        "wetness": wetness,
+        "nut_hand": HAND_LABELS[hand_category(nut_value)] if nut_value else None,
+        "nut_value": nut_value,
+    }
+
+
+def board_texture(board: Sequence[str]) -> Dict:
+    """Texture fields for a 0/3/4/5-card board (cached per isomorphism class)."""
+    texture = dict(_texture((), tuple(board)))
+    texture.pop("nut_value")
+    return texture
+
+
+def warm_flops() -> int:
+    """Fill the texture cache for every flop (1,755 classes); turns and rivers fill on demand."""
+    for flop in combinations(CARD_STRINGS, 3):
+        _texture((), flop)
+    return _texture.cache_info().currsize  # type: ignore[attr-defined]
+
+
+def hand_features(hole: Sequence[str], board: Sequence[str]) -> Dict:
+    """Hero's made hand, draws and outs on this board. Outs are unseen cards completing a straight or flush."""
+    hole_cards = cards_to_ints(hole)
+    board_cards = cards_to_ints(board)
+    features: Dict = {"made_hand": None, "has_nuts": False, "flush_draw": False, "straight_draw": None, "outs": 0}
+    if len(hole_cards) != 2 or len(board_cards) < 3:
+        return features
+
+    value = evaluate(hole_cards + board_cards)
+    features["made_hand"] = HAND_LABELS[hand_category(value)]
+    features["has_nuts"] = value >= _texture((), tuple(board))["nut_value"]
+    if len(board_cards) == 5:
+        return features
+    # Draws are reported whatever hero has made already (a made straight can still draw to a flush).
+
+    known = 0
+    for c in hole_cards + board_cards:
+        known |= 1 << c
+    out_cards = 0
+
+    # Straight outs: ranks completing a straight with hero's cards that would not complete one on the board alone.
+    out_ranks = STRAIGHT_COMPLETERS[_rank_mask(hole_cards + board_cards)] & ~STRAIGHT_COMPLETERS[_rank_mask(board_cards)]
+    for r in range(13):
+        if out_ranks >> r & 1:
+            out_cards |= RANK_CARDS[r]
+    n_ranks = bin(out_ranks).count("1")
+    if n_ranks >= 2:
+        features["straight_draw"] = "open_ended" if _open_ended(_rank_mask(hole_cards + board_cards), out_ranks) else "double_gutshot"
+    elif n_ranks == 1:
+        features["straight_draw"] = "gutshot"
+
+    # Flush outs: four to a suit using at least one hole card.
+    board_suits = _suit_counts(board_cards)
+    for suit, count in enumerate(_suit_counts(hole_cards + board_cards)):
+        if count == 4 and board_suits[suit] < 4:
+            out_cards |= SUIT_CARDS[suit]
+            features["flush_draw"] = True
+
+    features["outs"] = bin(out_cards & ~known).count("1")
+    return features
+
+
+def summarize(texture: Dict, hand: Optional[Dict] = None) -> str:
+    parts = [
+        f"paired={texture['paired_board']}",
+        f"flush_draw={texture['flush_draw_possible']}",
+        f"straight_draw={texture['straight_draw_possible']}",
+        f"wetness={texture['wetness']}",
+    ]
+    if texture.get("nut_hand"):
+        parts.append(f"nuts={texture['nut_hand']}")
+    if hand and hand.get("made_hand"):
+        parts.append(f"hero={hand['made_hand']}{' (nuts)' if hand['has_nuts'] else ''}, outs={hand['outs']}")
+    return ", ".join(parts)
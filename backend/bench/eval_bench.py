@@ -0,0 +1,115 @@
+"""
+Micro-benchmark and pokerkit differential check for the built-in hand evaluator.
+
+    cd backend
+    python -m bench.eval_bench                  # timings
+    python -m bench.eval_bench --verify 2000000 # compare against pokerkit on random deals
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from app.eval import (
+    CARD_STRINGS,
+    HAND_LABELS,
+    decide_winner,
+    decide_winners_batch,
+    describe_hand,
+    evaluate,
+    hand_category,
+    lookup_tables,
+)
+
+
+def _random_deals(n: int, seed: int):
+    rng = random.Random(seed)
+    deck = list(range(52))
+    for _ in range(n):
+        cards = rng.sample(deck, 9)
+        yield cards[:2], cards[2:4], cards[4:]
+
+
+def bench(n: int, seed: int) -> None:
+    start = time.perf_counter()
+    lookup_tables()
+    print(f"table build: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    deals = list(_random_deals(n, seed))
+    start = time.perf_counter()
+    for hero, bot, board in deals:
+        evaluate(hero + board)
+        evaluate(bot + board)
+    elapsed = time.perf_counter() - start
+    print(f"evaluate: {2 * n / elapsed:,.0f} hands/s ({elapsed / (2 * n) * 1e9:.0f} ns/hand)")
+
+    as_strings = [([CARD_STRINGS[c] for c in h], [CARD_STRINGS[c] for c in b], [CARD_STRINGS[c] for c in d]) for h, b, d in deals]
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    for hero, bot, board in as_strings:
+        decide_winner(hero, bot, board, rng)
+    elapsed = time.perf_counter() - start
+    print(f"decide_winner: {n / elapsed:,.0f} showdowns/s ({elapsed / n * 1e6:.1f} us/showdown)")
+
+    arr = np.array([hero + bot + board for hero, bot, board in deals])
+    decide_winners_batch(arr[:1, :2], arr[:1, 2:4], arr[:1, 4:])
+    start = time.perf_counter()
+    decide_winners_batch(arr[:, :2], arr[:, 2:4], arr[:, 4:])
+    elapsed = time.perf_counter() - start
+    print(f"decide_winners_batch: {n / elapsed:,.0f} showdowns/s ({elapsed / n * 1e9:.0f} ns/showdown)")
+
+    try:
+        from pokerkit import Card, StandardHighHand
+    except ImportError:
+        return
+    sample = as_strings[: max(1, n // 20)]
+    start = time.perf_counter()
+    for hero, bot, board in sample:
+        board_cards = tuple(Card.parse("".join(board)))
+        StandardHighHand.from_game(tuple(Card.parse("".join(hero))), board_cards)
+        StandardHighHand.from_game(tuple(Card.parse("".join(bot))), board_cards)
+    elapsed = time.perf_counter() - start
+    print(f"pokerkit showdown: {len(sample) / elapsed:,.0f} showdowns/s ({elapsed / len(sample) * 1e6:.1f} us/showdown)")
+
+
+def verify(n: int, seed: int) -> int:
+    from pokerkit import Card, StandardHighHand
+
+    mismatches = 0
+    for i, (hero, bot, board) in enumerate(_random_deals(n, seed)):
+        hero_value = evaluate(hero + board)
+        bot_value = evaluate(bot + board)
+        board_cards = tuple(Card.parse("".join(CARD_STRINGS[c] for c in board)))
+        hero_hand = StandardHighHand.from_game(tuple(Card.parse("".join(CARD_STRINGS[c] for c in hero))), board_cards)
+        bot_hand = StandardHighHand.from_game(tuple(Card.parse("".join(CARD_STRINGS[c] for c in bot))), board_cards)
+        expected = (hero_hand > bot_hand) - (hero_hand < bot_hand)
+        got = (hero_value > bot_value) - (hero_value < bot_value)
+        ok = (
+            expected == got
+            and HAND_LABELS[hand_category(hero_value)] == hero_hand.entry.label.value
+            and describe_hand(hero + board, hero_value) == str(hero_hand)
+        )
+        if not ok:
+            mismatches += 1
+            if mismatches <= 10:
+                print("mismatch:", [CARD_STRINGS[c] for c in hero + bot + board], str(hero_hand), str(bot_hand))
+        if (i + 1) % 100_000 == 0:
+            print(f"{i + 1:,} deals checked, {mismatches} mismatches")
+    print(f"done: {n:,} deals, {mismatches} mismatches")
+    return mismatches
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=200_000, help="deals to time")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verify", type=int, metavar="N", help="check N random deals against pokerkit instead")
+    args = parser.parse_args()
+    if args.verify:
+        raise SystemExit(1 if verify(args.verify, args.seed) else 0)
+    bench(args.n, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Benchmark suite for the engine, facts and websocket hot paths.
+
+Every case runs a fixed, seeded workload for several rounds and reports the best and
+median ns/op, so numbers are comparable between commits on the same machine. A
+separate tracemalloc pass reports the peak bytes allocated per op.
+
+    cd backend
+    python -m bench.suite --out bench.json
+    python -m bench.suite --compare bench.json     # print ratios against an earlier run
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from app.eval import CARD_STRINGS, decide_winner
+from app.facts import build_fact_block
+from app.models import parse_client_message
+from app.ring import RingTable
+from app.table import TableManager
+
+
+class Bench(NamedTuple):
+    """One operation per call of `op(i)`; `after(i)` does untimed upkeep, `close()` tears down."""
+
+    op: Callable[[int], Any]
+    after: Optional[Callable[[int], None]] = None
+    close: Optional[Callable[[], None]] = None
+
+
+Case = Callable[[], Bench]
+
+
+def _snapshot() -> Bench:
+    table = TableManager(seed=1)
+    return Bench(lambda i: table.snapshot())
+
+
+def _player_action() -> Bench:
+    table = TableManager(seed=2)
+    actions = [("call", None), ("check", None), ("bet", 6), ("call", None), ("raise", 20), ("call", None)]
+
+    def op(i: int) -> None:
+        action, amount = actions[i % len(actions)]
+        table.player_action(action, amount)
+
+    def after(i: int) -> None:
+        if table.hand_over:
+            table.next_hand()
+
+    return Bench(op, after)
+
+
+def _next_hand() -> Bench:
+    table = TableManager(seed=3)
+    return Bench(lambda i: table.next_hand())
+
+
+def _ring_hand() -> Bench:
+    table = RingTable(seats=6, seed=6, hero_seat=None)
+    return Bench(lambda i: table.play_hand())
+
+
+def _decide_winner() -> Bench:
+    rng = random.Random(4)
+    deals = []
+    for _ in range(1000):
+        cards = [CARD_STRINGS[c] for c in rng.sample(range(52), 9)]
+        deals.append((cards[:2], cards[2:4], cards[4:]))
+
+    def op(i: int) -> None:
+        hero, bot, board = deals[i % len(deals)]
+        decide_winner(hero, bot, board, rng)
+
+    return Bench(op)
+
+
+def _build_fact_block() -> Bench:
+    table = TableManager(seed=5)
+    states: List[Dict[str, Any]] = []
+    while len(states) < 500:
+        states.append(table.snapshot())
+        table.player_action("call")
+        if table.hand_over:
+            table.next_hand()
+    return Bench(lambda i: build_fact_block(states[i % len(states)]))
+
+
+def _parse_client_message() -> Bench:
+    raws = ['{"action": "call"}', '{"action": "raise", "amount": 24}', '{"action": "bogus"}', "not json"]
+    return Bench(lambda i: parse_client_message(raws[i % len(raws)]))
+
+
+def _ws_round_trip() -> Bench:
+    from fastapi.testclient import TestClient
+
+    from app.llm import coaching_service
+    from app.main import app
+    from app.security import issue_ws_token
+
+    coaching_service.enabled = False
+    client = TestClient(app)
+    client.__enter__()
+    ws_cm = client.websocket_connect(f"/ws/table?token={issue_ws_token('bench-user')}")
+    ws = ws_cm.__enter__()
+    ws.receive_json()  # session_joined
+    ws.receive_json()  # facts_update
+    state = {"hand_over": False}
+
+    def op(i: int) -> None:
+        ws.send_json({"action": "call"})
+        while True:
+            msg = ws.receive_json()
+            if msg.get("type") == "hand_summary":
+                state["hand_over"] = True
+            if msg.get("type") in ("coaching_update", "error"):
+                return
+
+    def after(i: int) -> None:
+        if state["hand_over"]:
+            state["hand_over"] = False
+            ws.send_json({"action": "next_hand"})
+            ws.receive_json()
+            ws.receive_json()
+
+    def close() -> None:
+        ws_cm.__exit__(None, None, None)
+        client.__exit__(None, None, None)
+
+    return Bench(op, after, close)
+
+
+def _time(case: Case, ops: int) -> float:
+    bench = case()
+    elapsed = 0
+    try:
+        for i in range(ops):
+            start = time.perf_counter_ns()
+            bench.op(i)
+            elapsed += time.perf_counter_ns() - start
+            if bench.after:
+                bench.after(i)
+    finally:
+        if bench.close:
+            bench.close()
+    return elapsed / ops
+
+
+def _alloc(case: Case, ops: int) -> float:
+    """Mean peak bytes allocated while one op runs (transient allocations included)."""
+    bench = case()
+    total = 0
+    tracemalloc.start()
+    try:
+        for i in range(ops):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            bench.op(i)
+            total += tracemalloc.get_traced_memory()[1] - before
+            if bench.after:
+                bench.after(i)
+    finally:
+        tracemalloc.stop()
+        if bench.close:
+            bench.close()
+    return total / ops
+
+
+CASES: Dict[str, Case] = {
+    "table.snapshot": _snapshot,
+    "table.player_action": _player_action,
+    "table.next_hand": _next_hand,
+    "ring.hand_6max": _ring_hand,
+    "eval.decide_winner": _decide_winner,
+    "facts.build_fact_block": _build_fact_block,
+    "models.parse_client_message": _parse_client_message,
+    "ws.table_round_trip": _ws_round_trip,
+}
+
+DEFAULT_OPS = {
+    "table.snapshot": 200_000,
+    "table.player_action": 50_000,
+    "table.next_hand": 50_000,
+    "ring.hand_6max": 5_000,
+    "eval.decide_winner": 50_000,
+    "facts.build_fact_block": 20_000,
+    "models.parse_client_message": 100_000,
+    "ws.table_round_trip": 2_000,
+}
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_suite(names: List[str], rounds: int, scale: float) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for name in names:
+        ops = max(1, int(DEFAULT_OPS[name] * scale))
+        _time(CASES[name], max(1, ops // 10))  # warm caches and lookup tables
+        per_op = [_time(CASES[name], ops) for _ in range(rounds)]
+        best = min(per_op)
+        alloc = _alloc(CASES[name], max(1, ops // 10))
+        results[name] = {
+            "ops": ops,
+            "rounds": rounds,
+            "ns_per_op_min": round(best, 1),
+            "ns_per_op_median": round(statistics.median(per_op), 1),
+            "ops_per_sec": round(1e9 / best, 1),
+            "alloc_bytes_per_op": round(alloc, 1),
+        }
+        print(f"{name:32s} {best:12,.0f} ns/op  {1e9 / best:12,.0f} ops/s  {alloc:10,.0f} B/op", file=sys.stderr)
+    return {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "timestamp": int(time.time()),
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    print(f"{'case':32s} {'baseline':>12s} {'current':>12s} {'speedup':>8s} {'B/op':>16s}")
+    for name, res in current["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            continue
+        ratio = old["ns_per_op_min"] / res["ns_per_op_min"]
+        alloc = f"{old.get('alloc_bytes_per_op', 0):,.0f} -> {res['alloc_bytes_per_op']:,.0f}"
+        print(f"{name:32s} {old['ns_per_op_min']:12,.0f} {res['ns_per_op_min']:12,.0f} {ratio:7.2f}x {alloc:>16s}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cases", nargs="*", help=f"subset of: {', '.join(CASES)}")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every case's op count")
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    names = args.cases or list(CASES)
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}")
+    report = run_suite(names, args.rounds, args.scale)
+    if args.compare:
+        with open(args.compare) as fh:
+            compare(report, json.load(fh))
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(report, fh, indent=2)
+    elif not args.compare:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
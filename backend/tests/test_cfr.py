@@ -0,0 +1,40 @@
+import pytest
+
+from app.cfr import ALL_IN, CALL, FOLD, HALF_POT, POT, GameTree, get_strategy
+from app.selfplay import run
+
+
+def test_fold_terminals_pay_the_folders_contribution():
+    tree = GameTree(stack=10)
+    # Hero (SB) folds: loses the small blind.
+    assert tree.terminal([FOLD]) == (False, -1)
+    # Hero pot-raises to 6 (or half-pot to 4), bot folds: hero wins the bot's big blind.
+    assert tree.terminal([POT, FOLD]) == (False, 2)
+    assert tree.terminal([HALF_POT, FOLD]) == (False, 2)
+    # Hero raises to 6, bot shoves, hero folds: hero loses its 6.
+    assert tree.terminal([POT, ALL_IN, FOLD]) == (False, -6)
+    # Hero limps (closing preflop), bets the flop, bot folds: hero wins the bot's 2.
+    assert tree.terminal([CALL, POT, FOLD]) == (False, 2)
+    # Hero shoves, bot calls: a showdown for the whole stack.
+    assert tree.terminal([ALL_IN, CALL]) == (True, 10)
+
+
+def test_every_fold_terminal_matches_the_folders_contribution():
+    tree = GameTree(stack=10)
+    for node, kids in enumerate(tree.children):
+        fold = kids[FOLD]
+        if fold == -1:
+            continue
+        value = tree.terminal_value[~fold]
+        if tree.player[node] == 0:
+            assert value < 0
+        else:
+            assert value > 0
+
+
+@pytest.mark.skipif(get_strategy() is None, reason="no trained strategy (python -m app.cfr train)")
+def test_trained_bot_beats_a_calling_station():
+    # Stacks carry over between hands, so this also covers effective stacks far from STACK.
+    report = run(2000, seed=0, hero="call", bot="cfr")
+    assert report["aborted_hands"] == 0
+    assert report["bb_per_100_ci95"][1] < 0